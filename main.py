@@ -6,10 +6,13 @@ import argparse
 import sys
 from pathlib import Path
 from datetime import datetime
+from dataclasses import asdict
 
 from src.database import PostgresRepository
 from src.scraper import HabrApiClient, SalaryScraper
-from src.config_parser import CsvConfigParser, DefaultConfigParser
+from src.sharded import ShardedSalaryScraper
+from src.config_parser import CsvConfigParser, DefaultConfigParser, SpecConfigParser
+from src.preflight import preflight
 from src.settings import Settings
 
 
@@ -26,6 +29,7 @@ def parse_arguments():
 Examples:
   python main.py                    # Scrape all reference types individually
   python main.py config.csv         # Use CSV file for configuration
+  python main.py --spec "skills[top 200] x regions[all]"   # Lazily expanded combinations
   
 CSV file format:
   First row should contain headers: specializations,skills,regions,companies
@@ -39,6 +43,30 @@ CSV file format:
         help="CSV configuration file (optional). If not provided, scrapes all reference types individually",
     )
 
+    parser.add_argument(
+        "--spec",
+        default=None,
+        help="Combination spec expanded lazily, e.g. 'skills[top 200] x regions[all]' (selectors: all, top N, a,b)",
+    )
+    parser.add_argument(
+        "--no-prune",
+        action="store_true",
+        help="With --spec: also scrape children of references and combinations whose last report had zero vacancies",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of threads fetching references in parallel (default: settings.workers)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Split the plan into shards executed by N worker processes (needs report_staging table)",
+    )
+
     return parser.parse_args()
 
 
@@ -53,30 +81,42 @@ def main():
 
         print(f"Salary scraper started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
+        # Initialize components
+        if args.processes:
+            repository = PostgresRepository(asdict(settings.database), shared_staging=True)
+            scraper = ShardedSalaryScraper(repository, settings.api, args.processes)
+        else:
+            repository = settings.create_repository()
+            workers = args.workers or settings.workers
+            api_client = HabrApiClient.from_settings(settings.api, workers)
+            scraper = SalaryScraper(
+                repository, api_client, workers=workers, commit_per_type=settings.commit_per_reference_type
+            )
+
         # Parse scraping configuration
-        if args.config_file:
+        if args.spec:
+            print(f"Using combination spec: {args.spec}")
+            parser = SpecConfigParser(repository, prune=not args.no_prune, catalog=scraper.catalog)
+            scraping_config = parser.parse(args.spec)
+        elif args.config_file:
             if not args.config_file.endswith('.csv'):
                 print(f"Error: Configuration file must be a CSV file, got: {args.config_file}")
                 sys.exit(1)
 
             print(f"Using configuration from: {args.config_file}")
             config_parser = CsvConfigParser()
-            scraping_config = config_parser.parse(args.config_file)
+            report = preflight(config_parser.parse(args.config_file), repository)
+            scraping_config = report.config
+            print(f"Resolved {report.resolved_rows}/{report.total_rows} rows")
+            for ref_type, values in report.unresolved.items():
+                print(f"  Unknown {ref_type}: {', '.join(values)}")
+            if report.duplicate_rows:
+                print(f"  Skipped {len(report.duplicate_rows)} duplicate rows")
         else:
             print("Using default configuration (all reference types)")
             config_parser = DefaultConfigParser()
             scraping_config = config_parser.parse()
 
-        # Initialize components
-        repository = PostgresRepository(settings.database.model_dump())
-        api_client = HabrApiClient(
-            url=settings.api.url,
-            delay_min=settings.api.delay_min,
-            delay_max=settings.api.delay_max,
-            retry_attempts=settings.api.retry_attempts,
-        )
-        scraper = SalaryScraper(repository, api_client)
-
         # Execute scraping
         print(f"Configuration: {scraping_config.reference_types}")
         if scraping_config.combinations:
@@ -0,0 +1,113 @@
+"""
+Benchmark server-side prepared statements on the staging insert path.
+
+Runs the same ingest twice, once with plain statements and once with PREPARE/EXECUTE:
+1. the raw staging INSERT on one connection (isolates the parse/plan cost per statement)
+2. PostgresRepository.save_report end to end (one transaction per row, as the scrapers do)
+
+Staged rows are rolled back, so nothing is written to report_rows.
+
+Usage: python -m scripts.benchmark_prepared [--rows 10000] [--config config.yaml]
+"""
+
+import argparse
+import random
+import sys
+import time
+import uuid
+from dataclasses import asdict
+from datetime import datetime
+
+from psycopg2.extras import Json
+
+from src.core import SalaryData
+from src.database import PostgresRepository, execute_prepared
+from src.settings import Settings
+
+
+def _payload(i: int) -> dict:
+    return {
+        "groups": [
+            {"name": level, "title": level.title(), "total": random.randint(0, 500), "median": 100000 + i}
+            for level in ("junior", "middle", "senior")
+        ]
+    }
+
+
+def bench_statements(repo: PostgresRepository, rows: int, prepared: bool) -> float:
+    """Seconds for ``rows`` staging INSERTs on one connection inside one transaction"""
+    query = "INSERT INTO bench_staging (skills_1, region_id, data, fetched_at) VALUES (%s, %s, %s, %s)"
+    with repo.get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "CREATE TEMP TABLE bench_staging (skills_1 INTEGER, region_id INTEGER, data JSONB, fetched_at TIMESTAMP)"
+            )
+            now = datetime.now()
+            started = time.perf_counter()
+            for i in range(rows):
+                params = (i % 50, i % 7, Json(_payload(i)), now)
+                if prepared:
+                    execute_prepared(cursor, "bench_staging_insert", query, params)
+                else:
+                    cursor.execute(query, params)
+            return time.perf_counter() - started
+        finally:
+            conn.rollback()
+            if prepared:
+                cursor.execute("DEALLOCATE bench_staging_insert")
+                conn.prepared.discard("bench_staging_insert")
+                conn.commit()
+            cursor.close()
+
+
+def bench_save_report(config: dict, rows: int, prepared: bool) -> float:
+    """Seconds for ``rows`` save_report calls into one staged transaction (rolled back)"""
+    repo = PostgresRepository(config, prepare_statements=prepared)
+    repo.warmup()
+    transaction_id = str(uuid.uuid4())
+    timestamp = datetime.now()
+    started = time.perf_counter()
+    try:
+        for i in range(rows):
+            combination = {"skills": i % 50 + 1, "regions": i % 7 + 1} if i % 2 else {}
+            data = SalaryData(
+                data=_payload(i), reference_id=i % 50 + 1, reference_type="skills", combination=combination
+            )
+            if not repo.save_report(data, transaction_id, timestamp):
+                raise RuntimeError("save_report failed, see log")
+        return time.perf_counter() - started
+    finally:
+        repo.rollback_transaction(transaction_id)
+
+
+def _report(name: str, rows: int, plain: float, prepared: float) -> None:
+    print(f"{name}:")
+    print(f"  plain     {plain:8.2f}s  {rows / plain:9.0f} rows/s  {plain / rows * 1e6:8.1f} us/row")
+    print(f"  prepared  {prepared:8.2f}s  {rows / prepared:9.0f} rows/s  {prepared / rows * 1e6:8.1f} us/row")
+    print(f"  saved     {(plain - prepared) / rows * 1e6:8.1f} us/row ({(1 - prepared / plain) * 100:.1f}%)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark prepared statements on the staging insert path")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--config", default="config.yaml")
+    args = parser.parse_args()
+
+    config = asdict(Settings.load(args.config).database)
+    random.seed(0)
+
+    repo = PostgresRepository(config, prepare_statements=True)
+    bench_statements(repo, min(args.rows, 500), prepared=True)  # Warm caches on both paths
+    plain = bench_statements(repo, args.rows, prepared=False)
+    prepared = bench_statements(repo, args.rows, prepared=True)
+    _report(f"Staging INSERT x {args.rows} (one connection)", args.rows, plain, prepared)
+
+    plain = bench_save_report(config, args.rows, prepared=False)
+    prepared = bench_save_report(config, args.rows, prepared=True)
+    _report(f"save_report x {args.rows} (commit per row)", args.rows, plain, prepared)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,55 +5,92 @@ import psycopg2
 
 
 SQL_REPORT = """
-SELECT
-    rg.title AS "Регион",
-    sk.title AS "Навык",
-    group_data->>'name'  AS "Уровень",
-    group_data->>'title' AS "Описание",
-    (group_data->>'total')::INTEGER  AS "Всего вакансий",
-    (group_data->>'median')::INTEGER AS "Медианная зарплата",
-    (group_data->>'min')::INTEGER    AS "Мин зарплата",
-    (group_data->>'max')::INTEGER    AS "Макс зарплата",
-    (group_data->'salary'->>'value')::INTEGER AS "Базовая зарплата",
-    (group_data->'salary'->>'bonus')::INTEGER AS "Бонус",
-    r.fetched_at                      AS "Собрано в",
-
-    FIRST_VALUE((group_data->>'median')::INTEGER) OVER (
-        PARTITION BY group_data->>'name'
-        ORDER BY CASE WHEN rg.title = 'Москва' THEN 0 ELSE 1 END
+WITH region_rows AS (
+    SELECT
+        rg.title AS region,
+        NULL::text AS skill,
+        r.level,
+        r.period_start AS day,
+        r.reports,
+        r.total,
+        r.median,
+        r.min_salary,
+        r.max_salary,
+        r.moscow_median,
+        COALESCE(r.moscow_delta_pct, 0) AS moscow_delta_pct
+    FROM salary_rollups r
+    JOIN regions rg ON rg.id = r.reference_id
+    WHERE r.dimension = 'regions'
+      AND r.period = 'day'
+      AND r.period_start >= %(start_ts)s::timestamp::date
+      AND r.period_start <  %(end_ts)s::timestamp
+      AND r.total > 0
+),
+-- salary_rollups only holds single-reference reports: skill x region rows come from salary_facts
+combination_facts AS (
+    SELECT
+        rg.title AS region,
+        sk.title AS skill,
+        f.level,
+        f.fetched_at::date AS day,
+        COUNT(*) AS reports,
+        ROUND(AVG(f.total))::int AS total,
+        ROUND(percentile_cont(0.5) WITHIN GROUP (ORDER BY f.median))::int AS median,
+        MIN(f.min_salary) AS min_salary,
+        MAX(f.max_salary) AS max_salary
+    FROM completed_salary_facts f
+    JOIN regions rg ON rg.id = f.region_id
+    JOIN skills sk ON sk.id = f.skills_1
+    WHERE f.level IS NOT NULL
+      AND f.fetched_at >= %(start_ts)s
+      AND f.fetched_at <  %(end_ts)s
+    GROUP BY rg.title, sk.title, f.level, f.fetched_at::date
+    HAVING AVG(f.total) > 0
+),
+combination_rows AS (
+    SELECT
+        c.*,
+        FIRST_VALUE(c.median) OVER moscow_first AS moscow_median,
+        CASE
+            WHEN c.region != 'Москва' AND FIRST_VALUE(c.region) OVER moscow_first = 'Москва'
+                THEN ROUND((c.median - FIRST_VALUE(c.median) OVER moscow_first) * 100.0
+                           / NULLIF(FIRST_VALUE(c.median) OVER moscow_first, 0), 1)
+            ELSE 0
+        END AS moscow_delta_pct
+    FROM combination_facts c
+    WINDOW moscow_first AS (
+        PARTITION BY c.skill, c.level, c.day
+        ORDER BY CASE WHEN c.region = 'Москва' THEN 0 ELSE 1 END
         ROWS UNBOUNDED PRECEDING
-    ) AS "Медиана в Москве",
-
-    CASE
-        WHEN rg.title != 'Москва' THEN
-            ROUND(
-                (((group_data->>'median')::INTEGER - 
-                  FIRST_VALUE((group_data->>'median')::INTEGER) OVER (
-                      PARTITION BY group_data->>'name'
-                      ORDER BY CASE WHEN rg.title = 'Москва' THEN 0 ELSE 1 END
-                      ROWS UNBOUNDED PRECEDING
-                  )) * 100.0 /
-                  FIRST_VALUE((group_data->>'median')::INTEGER) OVER (
-                      PARTITION BY group_data->>'name'
-                      ORDER BY CASE WHEN rg.title = 'Москва' THEN 0 ELSE 1 END
-                      ROWS UNBOUNDED PRECEDING
-                  )), 1
-            )
-        ELSE 0
-    END AS "Разница с Москвой (%)"
-
-FROM reports r
-JOIN regions rg ON r.region_id = rg.id
-LEFT JOIN skills  sk ON r.skills_1 = sk.id
-CROSS JOIN jsonb_array_elements(r.data->'groups') AS group_data
-WHERE r.region_id IS NOT NULL
-  AND r.fetched_at >= %(start_ts)s
-  AND r.fetched_at <  %(end_ts)s
-  AND (group_data->>'total')::INTEGER > 0
+    )
+)
+SELECT
+    region AS "Регион",
+    skill  AS "Навык",
+    level  AS "Уровень",
+    day    AS "День",
+    reports AS "Отчётов",
+    total   AS "Всего вакансий",
+    median  AS "Медианная зарплата",
+    min_salary AS "Мин зарплата",
+    max_salary AS "Макс зарплата",
+    moscow_median AS "Медиана в Москве",
+    moscow_delta_pct AS "Разница с Москвой (%%)"
+FROM (
+    SELECT region, skill, level, day, reports, total, median, min_salary, max_salary,
+           moscow_median, moscow_delta_pct
+    FROM region_rows
+    UNION ALL
+    SELECT region, skill, level, day, reports, total, median, min_salary, max_salary,
+           moscow_median, moscow_delta_pct
+    FROM combination_rows
+) report
 ORDER BY
-    group_data->>'name',
-    CASE WHEN rg.title = 'Москва' THEN 0 ELSE 1 END,
-    (group_data->>'median')::INTEGER DESC
+    level,
+    day,
+    skill NULLS FIRST,
+    CASE WHEN region = 'Москва' THEN 0 ELSE 1 END,
+    median DESC
 LIMIT 200;
 """
 
@@ -89,9 +126,12 @@ def main() -> int:
     cur = conn.cursor()
 
     # Diagnostics
-    cur.execute("SELECT current_setting('TimeZone'), NOW()::timestamp, MIN(fetched_at), MAX(fetched_at) FROM reports")
-    tz, now_ts, min_ts, max_ts = cur.fetchone()
-    print(f"TimeZone={tz}, now={now_ts}, reports range=[{min_ts} .. {max_ts}]\n")
+    cur.execute(
+        "SELECT current_setting('TimeZone'), NOW()::timestamp, "
+        "(SELECT fetched_at FROM rollup_watermarks WHERE name = 'salary_rollups')"
+    )
+    tz, now_ts, watermark = cur.fetchone()
+    print(f"TimeZone={tz}, now={now_ts}, rollups up to {watermark} (python -m src.cli refresh-rollups)\n")
 
     params = {"start_ts": start_raw, "end_ts": end_raw}
     cur.execute(SQL_REPORT, params)
@@ -1,86 +1,45 @@
 """
-Utility script to update reference tables from Excel files
+Utility script to update reference tables from Excel or CSV files
 """
 
 import argparse
-import pandas as pd
-import psycopg2
-from datetime import datetime
 import sys
 from dataclasses import asdict
 
+from src.database import PostgresRepository
+from src.reference_import import ReferenceImporter
 from src.settings import Settings
 
+VALID_TABLES = ["specializations", "skills", "regions", "companies"]
 
-def update_reference(table_name: str, file_path: str):
-    """Update reference table from Excel file"""
-    valid_tables = ["specializations", "skills", "regions", "companies"]
 
-    if table_name not in valid_tables:
+def update_reference(table_name: str, file_path: str) -> bool:
+    """Upsert a reference table from a file with 'title' and 'alias' columns"""
+    if table_name not in VALID_TABLES:
         print(f"Invalid table: {table_name}")
-        print(f"Valid tables: {', '.join(valid_tables)}")
+        print(f"Valid tables: {', '.join(VALID_TABLES)}")
         return False
 
     try:
-        # Load database configuration
         settings = Settings.load("config.yaml")
-        db_config = asdict(settings.database)
-
-        # Read Excel file
-        df = pd.read_excel(file_path, header=0)
-        print(f"Read {len(df)} rows from {file_path}")
-
-        # Validate columns
-        required_columns = {"title", "alias"}
-        if not required_columns.issubset(df.columns):
-            missing = required_columns - set(df.columns)
-            print(f"Missing columns: {missing}")
-            return False
-
-        # Clean data
-        df = df[["title", "alias"]].dropna()
-        df = df[df["title"].str.strip() != ""]
-        df = df[df["alias"].str.strip() != ""]
-        print(f"After cleaning: {len(df)} rows")
-
-        # Connect to database
-        conn = psycopg2.connect(**db_config)
-        cursor = conn.cursor()
-
-        # Insert data
-        inserted = 0
-        current_time = datetime.now()
-
-        for _, row in df.iterrows():
-            try:
-                cursor.execute(
-                    f"INSERT INTO {table_name} (title, alias, created_at) VALUES (%s, %s, %s)",
-                    (row["title"], row["alias"], current_time),
-                )
-                inserted += 1
-            except Exception as e:
-                print(f"Warning: Error inserting {row['title']}: {e}")
-
-        conn.commit()
-        cursor.close()
-        conn.close()
-
-        print(f"Updated {table_name}: {inserted} records added")
-        return True
-
+        importer = ReferenceImporter(PostgresRepository(asdict(settings.database)))
+        result = importer.import_file(table_name, file_path)
     except Exception as e:
         print(f"Error: {e}")
         return False
 
+    print(
+        f"Updated {table_name} from {file_path}: {result.inserted} inserted, {result.updated} updated, "
+        f"{result.unchanged} unchanged ({result.rows} rows read, {result.skipped} skipped, "
+        f"{result.duplicates} duplicate aliases)"
+    )
+    return True
+
 
 def main():
-    parser = argparse.ArgumentParser(description="Update reference tables from Excel files")
-    parser.add_argument(
-        "table",
-        choices=["specializations", "skills", "regions", "companies"],
-        help="Reference table to update",
-    )
-    parser.add_argument("file", help="Excel file with reference data (must have 'title' and 'alias' columns)")
+    parser = argparse.ArgumentParser(description="Update reference tables from Excel or CSV files")
+    parser.add_argument("table", choices=VALID_TABLES, help="Reference table to update")
+    parser.add_argument("file", help="XLSX or CSV file with reference data (must have 'title' and 'alias' columns)")
 
     args = parser.parse_args()
     success = update_reference(args.table, args.file)
@@ -53,7 +53,10 @@ moscow = cur.fetchone()[0]
 log(f"Записей по Москве: {moscow}")
 
 # Проверка качества данных (не generic)
-cur.execute("SELECT COUNT(*) FROM reports r JOIN regions rg ON rg.id = r.region_id WHERE r.fetched_at >= NOW() - INTERVAL '1 hour' AND NOT (r.data->'groups'->0->>'title' LIKE 'По всем%')")
+cur.execute(
+    "SELECT COUNT(*) FROM salary_facts f WHERE f.region_id IS NOT NULL "
+    "AND f.fetched_at >= NOW() - INTERVAL '1 hour' AND f.group_index = 1 AND NOT (f.title LIKE 'По всем%')"
+)
 specific = cur.fetchone()[0]
 log(f"Специфичных записей: {specific}")
 
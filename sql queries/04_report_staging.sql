@@ -0,0 +1,16 @@
+-- Общая staging-таблица для транзакций, которые пишут несколько процессов/узлов.
+-- Временные таблицы видны только своей сессии, поэтому шардированный и распределённый
+-- скрапинг складывает строки сюда (по transaction_id), а коммит выполняется один раз.
+-- UNLOGGED: данные staging не нужны после сбоя, зато запись не генерирует WAL.
+CREATE UNLOGGED TABLE IF NOT EXISTS report_staging (
+    id BIGSERIAL PRIMARY KEY,
+    transaction_id VARCHAR(64) NOT NULL,
+    specialization_id INTEGER,
+    skills_1 INTEGER,
+    region_id INTEGER,
+    company_id INTEGER,
+    data JSONB NOT NULL,
+    fetched_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_report_staging_transaction ON report_staging(transaction_id);
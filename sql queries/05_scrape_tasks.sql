@@ -0,0 +1,31 @@
+-- Распределённая очередь задач скрапинга: несколько API/worker-реплик забирают задачи
+-- пачками через SELECT ... FOR UPDATE SKIP LOCKED, продлевают аренду heartbeat'ом,
+-- просроченные аренды возвращаются в очередь. Строки складываются в report_staging
+-- (04_report_staging.sql) под transaction_id = run_id и коммитятся один раз в конце.
+
+CREATE TABLE IF NOT EXISTS scrape_runs (
+    run_id VARCHAR(64) PRIMARY KEY,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',  -- running | completed | failed
+    run_timestamp TIMESTAMP NOT NULL DEFAULT NOW(), -- единая fetched_at для всех воркеров
+    total_tasks INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS scrape_tasks (
+    id BIGSERIAL PRIMARY KEY,
+    run_id VARCHAR(64) NOT NULL REFERENCES scrape_runs(run_id) ON DELETE CASCADE,
+    payload JSONB NOT NULL,                          -- [{"ref_type": ..., "id": ..., "title": ..., "alias": ...}]
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',   -- pending | leased | done | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    success BOOLEAN,
+    leased_by VARCHAR(128),
+    lease_expires_at TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_scrape_tasks_claim ON scrape_tasks(run_id, status, id);
+CREATE INDEX IF NOT EXISTS idx_scrape_runs_status ON scrape_runs(status);
+
+-- Не более одного активного прогона одновременно (замена /tmp/scraper.lock для всех реплик)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_scrape_runs_single_running ON scrape_runs((status)) WHERE status = 'running';
@@ -0,0 +1,11 @@
+-- Функциональные индексы для регистронезависимого поиска справочников
+-- (пакетное разрешение значений CSV: lower(alias) = ANY(...) OR lower(title) = ANY(...))
+
+CREATE INDEX IF NOT EXISTS idx_specializations_lower_alias ON specializations(lower(alias));
+CREATE INDEX IF NOT EXISTS idx_specializations_lower_title ON specializations(lower(title));
+CREATE INDEX IF NOT EXISTS idx_skills_lower_alias ON skills(lower(alias));
+CREATE INDEX IF NOT EXISTS idx_skills_lower_title ON skills(lower(title));
+CREATE INDEX IF NOT EXISTS idx_regions_lower_alias ON regions(lower(alias));
+CREATE INDEX IF NOT EXISTS idx_regions_lower_title ON regions(lower(title));
+CREATE INDEX IF NOT EXISTS idx_companies_lower_alias ON companies(lower(alias));
+CREATE INDEX IF NOT EXISTS idx_companies_lower_title ON companies(lower(title));
@@ -0,0 +1,59 @@
+-- Схлопывание дублей комбинированных отчётов.
+-- Раньше строка CSV (например, skills,regions) сохранялась несколькими строками reports с одинаковыми
+-- data и fetched_at — по одной на каждый тип справочника, с одним заполненным FK.
+-- Теперь такая комбинация пишется одной строкой со всеми FK; миграция приводит старые данные к этому виду.
+--
+-- Группа — подряд идущие (по id) строки с одним FK, одинаковыми fetched_at и data, где каждый
+-- столбец FK встречается не больше одного раза. Первая строка группы получает все FK, остальные удаляются.
+-- Строки, перемешанные параллельной записью, не соседствуют и остаются как есть.
+
+DO $$
+DECLARE
+    r RECORD;
+    head_id BIGINT;
+    head_fetched_at TIMESTAMP;
+    head_data JSONB;
+    group_columns TEXT[];
+    merged INTEGER := 0;
+    row_column TEXT;
+BEGIN
+    FOR r IN
+        SELECT id, specialization_id, skills_1, region_id, company_id, data, fetched_at
+        FROM reports
+        ORDER BY id
+    LOOP
+        IF num_nonnulls(r.specialization_id, r.skills_1, r.region_id, r.company_id) <> 1 THEN
+            head_id := NULL;
+            CONTINUE;
+        END IF;
+
+        row_column := CASE
+            WHEN r.specialization_id IS NOT NULL THEN 'specialization_id'
+            WHEN r.skills_1 IS NOT NULL THEN 'skills_1'
+            WHEN r.region_id IS NOT NULL THEN 'region_id'
+            ELSE 'company_id'
+        END;
+
+        IF head_id IS NOT NULL
+           AND r.fetched_at = head_fetched_at
+           AND r.data = head_data
+           AND NOT row_column = ANY(group_columns) THEN
+            UPDATE reports SET
+                specialization_id = COALESCE(specialization_id, r.specialization_id),
+                skills_1 = COALESCE(skills_1, r.skills_1),
+                region_id = COALESCE(region_id, r.region_id),
+                company_id = COALESCE(company_id, r.company_id)
+            WHERE id = head_id;
+            DELETE FROM reports WHERE id = r.id;
+            group_columns := group_columns || row_column;
+            merged := merged + 1;
+        ELSE
+            head_id := r.id;
+            head_fetched_at := r.fetched_at;
+            head_data := r.data;
+            group_columns := ARRAY[row_column];
+        END IF;
+    END LOOP;
+
+    RAISE NOTICE 'Collapsed % duplicate combination rows', merged;
+END $$;
@@ -0,0 +1,38 @@
+-- Контентно-адресуемое хранение ответов API.
+-- Многие справочники возвращают побайтно одинаковые графики от запуска к запуску, поэтому JSONB
+-- хранится один раз в report_payloads (ключ — md5 канонического текста jsonb), а строки отчётов
+-- ссылаются на него по хешу. Для совместимости отчётные запросы продолжают читать представление reports.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS report_payloads (
+    hash UUID PRIMARY KEY,  -- md5(data::text)::uuid, 16 байт
+    data JSONB NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE reports RENAME TO report_rows;
+ALTER TABLE report_rows ADD COLUMN payload_hash UUID;
+
+-- Перенос существующих ответов: каждый уникальный JSONB сохраняется один раз
+INSERT INTO report_payloads (hash, data)
+SELECT DISTINCT md5(data::text)::uuid, data
+FROM report_rows
+ON CONFLICT (hash) DO NOTHING;
+
+UPDATE report_rows SET payload_hash = md5(data::text)::uuid;
+
+ALTER TABLE report_rows
+    ALTER COLUMN payload_hash SET NOT NULL,
+    ADD CONSTRAINT report_rows_payload_hash_fkey FOREIGN KEY (payload_hash) REFERENCES report_payloads(hash),
+    DROP COLUMN data;
+
+CREATE INDEX IF NOT EXISTS idx_report_rows_payload_hash ON report_rows(payload_hash);
+
+-- Прежняя форма таблицы reports для существующих отчётов и скриптов (только чтение)
+CREATE VIEW reports AS
+SELECT r.id, r.specialization_id, r.skills_1, r.region_id, r.company_id, p.data, r.fetched_at
+FROM report_rows r
+JOIN report_payloads p ON p.hash = r.payload_hash;
+
+COMMIT;
@@ -0,0 +1,40 @@
+-- Нормализованные факты зарплат: по строке на отчёт и элемент data->'groups'.
+-- Заполняется при коммите транзакции скрапинга (см. insert_reports в src/database.py), исторические
+-- строки переносятся командой `python -m src.cli backfill-facts`. Отчёты читают типизированные
+-- столбцы по индексам вместо jsonb_array_elements и приведения типов на каждом запросе.
+
+-- Целое число из JSON (NULL для отсутствующих и нечисловых значений, дробные округляются)
+CREATE OR REPLACE FUNCTION salary_int(value JSONB) RETURNS INTEGER AS $$
+    SELECT CASE
+        WHEN jsonb_typeof(value) = 'number' THEN round((value #>> '{}')::numeric)::integer
+        WHEN jsonb_typeof(value) = 'string' AND value #>> '{}' ~ '^-?\d+(\.\d+)?$'
+            THEN round((value #>> '{}')::numeric)::integer
+    END
+$$ LANGUAGE SQL IMMUTABLE;
+
+CREATE TABLE IF NOT EXISTS salary_facts (
+    report_id BIGINT NOT NULL REFERENCES report_rows(id) ON DELETE CASCADE,
+    group_index SMALLINT NOT NULL,  -- позиция в data->'groups', начиная с 1
+    specialization_id INTEGER,
+    skills_1 INTEGER,
+    region_id INTEGER,
+    company_id INTEGER,
+    level TEXT,         -- groups[].name
+    title TEXT,         -- groups[].title
+    total INTEGER,
+    median INTEGER,
+    min_salary INTEGER,
+    max_salary INTEGER,
+    salary_value INTEGER,
+    salary_bonus INTEGER,
+    fetched_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (report_id, group_index)
+);
+
+CREATE INDEX IF NOT EXISTS idx_salary_facts_fetched_at ON salary_facts(fetched_at);
+CREATE INDEX IF NOT EXISTS idx_salary_facts_region ON salary_facts(region_id, fetched_at) WHERE region_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_salary_facts_skills ON salary_facts(skills_1, fetched_at) WHERE skills_1 IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_salary_facts_specialization ON salary_facts(specialization_id, fetched_at)
+    WHERE specialization_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_salary_facts_company ON salary_facts(company_id, fetched_at) WHERE company_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_salary_facts_level ON salary_facts(level, fetched_at);
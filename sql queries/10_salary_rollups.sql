@@ -0,0 +1,33 @@
+-- Предагрегированные отчёты по дням и неделям.
+-- Ключ: тип справочника, id, уровень (groups[].name), период. Строятся из salary_facts по отчётам
+-- с одним справочником и обновляются инкрементально от водяного знака по fetched_at
+-- (PostgresRepository.refresh_salary_rollups, команда `python -m src.cli refresh-rollups`).
+
+CREATE TABLE IF NOT EXISTS salary_rollups (
+    dimension VARCHAR(20) NOT NULL,   -- specializations / skills / regions / companies
+    reference_id INTEGER NOT NULL,
+    level TEXT NOT NULL,              -- groups[].name
+    period VARCHAR(10) NOT NULL CHECK (period IN ('day', 'week')),
+    period_start DATE NOT NULL,
+    reports INTEGER NOT NULL,         -- число отчётов за период
+    total INTEGER,                    -- среднее число вакансий
+    median INTEGER,                   -- медиана медиан
+    min_salary INTEGER,
+    max_salary INTEGER,
+    moscow_median INTEGER,            -- только для regions: медиана Москвы того же уровня и периода
+    moscow_delta_pct NUMERIC(7, 1),
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (dimension, reference_id, level, period, period_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_salary_rollups_period ON salary_rollups(dimension, period, period_start);
+
+-- Водяной знак: до какого fetched_at факты уже учтены в агрегатах
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    name VARCHAR(50) PRIMARY KEY,
+    fetched_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO rollup_watermarks (name, fetched_at) VALUES ('salary_rollups', '-infinity')
+ON CONFLICT (name) DO NOTHING;
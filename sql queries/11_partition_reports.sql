@@ -0,0 +1,148 @@
+-- Помесячное секционирование report_rows и salary_facts по fetched_at.
+-- Запросы за период читают одну-две секции, удаление старых данных — DROP секций
+-- (drop_report_partitions), вместо B-tree по fetched_at в каждой секции BRIN.
+-- Будущие секции создаёт ensure_report_partitions(): миграция создаёт их на 2 месяца вперёд,
+-- дальше функцию вызывает каждый коммит скрапинга (insert_reports) и команда
+-- `python -m src.cli ensure-partitions`. Строки вне существующих секций попадают в *_default.
+--
+-- Существующие данные переносятся в новую схему внутри одной транзакции.
+
+BEGIN;
+
+DROP VIEW IF EXISTS reports;
+
+ALTER TABLE salary_facts RENAME TO salary_facts_old;
+ALTER TABLE salary_facts_old RENAME CONSTRAINT salary_facts_pkey TO salary_facts_old_pkey;
+ALTER TABLE report_rows RENAME TO report_rows_old;
+ALTER SEQUENCE reports_id_seq OWNED BY NONE;
+
+CREATE TABLE report_rows (
+    id BIGINT NOT NULL DEFAULT nextval('reports_id_seq'),
+    specialization_id INTEGER REFERENCES specializations(id),
+    skills_1 INTEGER REFERENCES skills(id),
+    region_id INTEGER REFERENCES regions(id),
+    company_id INTEGER REFERENCES companies(id),
+    fetched_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    payload_hash UUID NOT NULL REFERENCES report_payloads(hash),
+    PRIMARY KEY (id, fetched_at)
+) PARTITION BY RANGE (fetched_at);
+
+CREATE TABLE report_rows_default PARTITION OF report_rows DEFAULT;
+
+CREATE TABLE salary_facts (
+    report_id BIGINT NOT NULL,
+    group_index SMALLINT NOT NULL,
+    specialization_id INTEGER,
+    skills_1 INTEGER,
+    region_id INTEGER,
+    company_id INTEGER,
+    level TEXT,
+    title TEXT,
+    total INTEGER,
+    median INTEGER,
+    min_salary INTEGER,
+    max_salary INTEGER,
+    salary_value INTEGER,
+    salary_bonus INTEGER,
+    fetched_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (report_id, group_index, fetched_at),
+    FOREIGN KEY (report_id, fetched_at) REFERENCES report_rows(id, fetched_at) ON DELETE CASCADE
+) PARTITION BY RANGE (fetched_at);
+
+CREATE TABLE salary_facts_default PARTITION OF salary_facts DEFAULT;
+
+-- Создаёт недостающие месячные секции обеих таблиц от from_month до текущего месяца + months_ahead.
+-- Возвращает число созданных секций.
+CREATE OR REPLACE FUNCTION ensure_report_partitions(months_ahead INTEGER DEFAULT 2, from_month DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE := date_trunc('month', COALESCE(from_month, CURRENT_DATE));
+    last_month DATE := date_trunc('month', CURRENT_DATE) + make_interval(months => months_ahead);
+    parent TEXT;
+    partition TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        FOREACH parent IN ARRAY ARRAY['report_rows', 'salary_facts'] LOOP
+            partition := format('%s_y%sm%s', parent, to_char(month_start, 'YYYY'), to_char(month_start, 'MM'));
+            IF to_regclass(partition) IS NULL THEN
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                    partition, parent, month_start, (month_start + INTERVAL '1 month')::date
+                );
+                created := created + 1;
+            END IF;
+        END LOOP;
+        month_start := (month_start + INTERVAL '1 month')::date;
+    END LOOP;
+    RETURN created;
+END
+$$ LANGUAGE plpgsql;
+
+-- Удаляет месячные секции, целиком лежащие до before. Сначала факты, затем строки отчётов;
+-- секцию report_rows нужно отсоединить (DETACH проверяет внешний ключ фактов), после чего DROP.
+-- Возвращает число удалённых секций.
+CREATE OR REPLACE FUNCTION drop_report_partitions(before DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    part RECORD;
+    dropped INTEGER := 0;
+BEGIN
+    FOR part IN
+        SELECT c.relname, p.relname AS parent
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname IN ('salary_facts', 'report_rows')
+          AND c.relname ~ '_y\d{4}m\d{2}$'
+          AND make_date(substring(c.relname FROM '_y(\d{4})m\d{2}$')::int,
+                        substring(c.relname FROM '_y\d{4}m(\d{2})$')::int, 1) + INTERVAL '1 month' <= before
+        ORDER BY p.relname = 'report_rows', c.relname
+    LOOP
+        IF part.parent = 'report_rows' THEN
+            EXECUTE format('ALTER TABLE report_rows DETACH PARTITION %I', part.relname);
+        END IF;
+        EXECUTE format('DROP TABLE %I', part.relname);
+        dropped := dropped + 1;
+    END LOOP;
+    RETURN dropped;
+END
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_report_partitions(2, (SELECT MIN(fetched_at)::date FROM report_rows_old));
+
+INSERT INTO report_rows (id, specialization_id, skills_1, region_id, company_id, fetched_at, payload_hash)
+SELECT id, specialization_id, skills_1, region_id, company_id, fetched_at, payload_hash
+FROM report_rows_old;
+
+INSERT INTO salary_facts
+SELECT report_id, group_index, specialization_id, skills_1, region_id, company_id, level, title,
+       total, median, min_salary, max_salary, salary_value, salary_bonus, fetched_at
+FROM salary_facts_old;
+
+DROP TABLE salary_facts_old;
+DROP TABLE report_rows_old;
+ALTER SEQUENCE reports_id_seq OWNED BY report_rows.id;
+
+-- Индексы создаются на родительских таблицах и наследуются каждой секцией
+CREATE INDEX IF NOT EXISTS idx_reports_fetched_at_brin ON report_rows USING brin (fetched_at);
+CREATE INDEX IF NOT EXISTS idx_reports_specialization ON report_rows(specialization_id);
+CREATE INDEX IF NOT EXISTS idx_reports_skills ON report_rows(skills_1);
+CREATE INDEX IF NOT EXISTS idx_reports_region ON report_rows(region_id);
+CREATE INDEX IF NOT EXISTS idx_reports_company ON report_rows(company_id);
+CREATE INDEX IF NOT EXISTS idx_report_rows_payload_hash ON report_rows(payload_hash);
+
+CREATE INDEX IF NOT EXISTS idx_salary_facts_fetched_at_brin ON salary_facts USING brin (fetched_at);
+CREATE INDEX IF NOT EXISTS idx_salary_facts_region ON salary_facts(region_id, fetched_at) WHERE region_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_salary_facts_skills ON salary_facts(skills_1, fetched_at) WHERE skills_1 IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_salary_facts_specialization ON salary_facts(specialization_id, fetched_at)
+    WHERE specialization_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_salary_facts_company ON salary_facts(company_id, fetched_at) WHERE company_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_salary_facts_level ON salary_facts(level, fetched_at);
+
+CREATE VIEW reports AS
+SELECT r.id, r.specialization_id, r.skills_1, r.region_id, r.company_id, p.data, r.fetched_at
+FROM report_rows r
+JOIN report_payloads p ON p.hash = r.payload_hash;
+
+COMMIT;
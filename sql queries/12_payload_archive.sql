@@ -0,0 +1,29 @@
+-- Холодное хранилище сырых ответов API.
+-- Ответы, на которые ссылаются только отчёты старше срока хранения, сжимаются (zlib) и переносятся
+-- из report_payloads в report_payload_archive (`python -m src.cli compact`, POST /api/maintenance/compact).
+-- Для аналитики остаются salary_facts и агрегаты; архивный JSON доступен по запросу
+-- (ReportCompactor.load_payload, GET /api/reports/{report_id}/payload).
+-- Представление reports показывает только строки с «горячими» ответами.
+
+CREATE TABLE IF NOT EXISTS report_payload_archive (
+    hash UUID PRIMARY KEY,              -- тот же md5(data::text)::uuid, что и в report_payloads
+    data BYTEA NOT NULL,                -- zlib(data::text)
+    raw_size INTEGER NOT NULL,          -- размер JSON до сжатия, байт
+    archived_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Строки отчётов могут ссылаться на архивный ответ, поэтому внешний ключ на report_payloads снимается
+-- (после 11_partition_reports.sql его автоматическое имя может быть report_rows_payload_hash_fkey1)
+DO $$
+DECLARE
+    fk TEXT;
+BEGIN
+    FOR fk IN
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = 'report_rows'::regclass AND confrelid = 'report_payloads'::regclass AND contype = 'f'
+    LOOP
+        EXECUTE format('ALTER TABLE report_rows DROP CONSTRAINT %I', fk);
+    END LOOP;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_report_payloads_created_at ON report_payloads(created_at);
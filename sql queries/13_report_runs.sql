@@ -0,0 +1,43 @@
+-- Запуски скрапинга и порционные коммиты.
+-- Транзакция скрапинга может переносить данные из staging в report_rows частями (каждые N строк
+-- или после каждого типа справочника), чтобы не держать всё до конца запуска в одной большой
+-- транзакции. Все части одного запуска связаны через report_rows.run_id; запуск считается
+-- завершённым только когда status = 'complete' (последний коммит), при откате — 'failed',
+-- уже перенесённые части при этом остаются.
+-- Не путать со scrape_runs из 05_scrape_tasks.sql: там прогоны очереди задач, здесь — коммиты в report_rows.
+
+CREATE TABLE IF NOT EXISTS report_runs (
+    id SERIAL PRIMARY KEY,
+    transaction_id VARCHAR(64) NOT NULL UNIQUE,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',   -- running / complete / failed
+    chunks INTEGER NOT NULL DEFAULT 0,               -- сколько раз данные переносились в report_rows
+    rows_committed INTEGER NOT NULL DEFAULT 0,
+    started_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMP
+);
+
+-- Строки, записанные до этой миграции, остаются без запуска (NULL)
+ALTER TABLE report_rows ADD COLUMN IF NOT EXISTS run_id INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_report_rows_run ON report_rows(run_id) WHERE run_id IS NOT NULL;
+
+-- Читатели видят только завершённые запуски (и строки, записанные до появления запусков):
+-- части ещё идущего или упавшего запуска в отчёты, выгрузки и агрегаты не попадают.
+-- Колонки reports не меняются, поэтому представление заменяется на месте.
+CREATE OR REPLACE VIEW reports AS
+SELECT r.id, r.specialization_id, r.skills_1, r.region_id, r.company_id, p.data, r.fetched_at
+FROM report_rows r
+JOIN report_payloads p ON p.hash = r.payload_hash
+LEFT JOIN report_runs s ON s.id = r.run_id
+WHERE r.run_id IS NULL OR s.status = 'complete';
+
+-- То же для salary_facts: факты строк завершённых запусков
+CREATE OR REPLACE VIEW completed_salary_facts AS
+SELECT f.*
+FROM salary_facts f
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM report_rows r
+    JOIN report_runs s ON s.id = r.run_id
+    WHERE r.id = f.report_id AND r.fetched_at = f.fetched_at AND s.status <> 'complete'
+);
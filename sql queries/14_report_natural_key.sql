@@ -0,0 +1,44 @@
+-- Естественный ключ строк отчётов: одна строка на комбинацию справочников в пределах запуска.
+-- Все строки запуска получают одну и ту же fetched_at (единая дата транзакции, run_timestamp
+-- у очереди задач), поэтому повторы того же запуска (повторный коммит, возобновлённый запуск
+-- очереди, воркер, дважды обработавший задачу) попадают в тот же ключ, и коммит пропускает их
+-- через ON CONFLICT DO NOTHING. Новый запуск с новой fetched_at — это новый срез, он не
+-- считается дубликатом. fetched_at обязателен в ключе: это ключ секционирования.
+-- Пустые колонки справочников сравниваются как 0 (COALESCE в уникальном индексе вместо
+-- NULLS NOT DISTINCT, которого нет до PostgreSQL 15), так что миграция работает с PostgreSQL 13.
+
+BEGIN;
+
+-- Дубликаты, записанные до появления ключа: остаётся самая ранняя строка,
+-- salary_facts удалённых строк удаляются каскадом
+DO $$
+DECLARE
+    removed BIGINT;
+BEGIN
+    DELETE FROM report_rows r
+    USING (
+        SELECT id, fetched_at
+        FROM (
+            SELECT id, fetched_at,
+                   row_number() OVER (
+                       PARTITION BY fetched_at, specialization_id, skills_1, region_id, company_id ORDER BY id
+                   ) AS n
+            FROM report_rows
+        ) ranked
+        WHERE n > 1
+    ) dup
+    WHERE r.id = dup.id AND r.fetched_at = dup.fetched_at;
+    GET DIAGNOSTICS removed = ROW_COUNT;
+    RAISE NOTICE 'Removed % duplicate report rows', removed;
+
+    -- Агрегаты считались с дубликатами: пересчитать всё при следующем refresh-rollups
+    IF removed > 0 AND to_regclass('rollup_watermarks') IS NOT NULL THEN
+        UPDATE rollup_watermarks SET fetched_at = '-infinity' WHERE name = 'salary_rollups';
+    END IF;
+END $$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS report_rows_natural_key ON report_rows (
+    fetched_at, COALESCE(specialization_id, 0), COALESCE(skills_1, 0), COALESCE(region_id, 0), COALESCE(company_id, 0)
+);
+
+COMMIT;
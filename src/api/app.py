@@ -14,13 +14,23 @@ from dataclasses import asdict
 import concurrent.futures
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
 import uvicorn
 
 from src.settings import Settings
 from src.database import PostgresRepository
 from src.scraper import HabrApiClient, SalaryScraper
-from src.config_parser import CsvConfigParser, DefaultConfigParser
+from src.async_api import AsyncHabrApiClient
+from src.async_scraper import AsyncSalaryScraper
+from src.async_database import AsyncPostgresRepository
+from src.pipeline import PipelinedSalaryScraper
+from src.sharded import ShardedSalaryScraper
+from src.task_queue import PostgresTaskQueue, QueuedSalaryScraper
+from src.reference_catalog import ReferenceCatalog
+from src.config_parser import CsvConfigParser, DefaultConfigParser, SpecConfigParser, StaticConfigParser
+from src.preflight import PreflightReport, preflight
+from src.compaction import ReportCompactor
+from src.export import DATASETS, ParquetExporter, resolve_filters
 from src.core import ScrapingConfig
 
 app = FastAPI(
@@ -35,6 +45,33 @@ keep_alive_active = False
 # Configuration: use SQLite for temporary storage (set via env var)
 USE_SQLITE_TEMP = os.environ.get("USE_SQLITE_TEMP", "true").lower() == "true"
 
+# Configuration: scraping engine for API jobs - sync, async (aiohttp), pipeline or process (set via env var)
+SCRAPER_ENGINE = os.environ.get("SCRAPER_ENGINE", "sync").lower()
+
+# Configuration: coordinate replicas through the scrape_tasks queue instead of the local lock file
+USE_TASK_QUEUE = os.environ.get("USE_TASK_QUEUE", "false").lower() == "true"
+
+# Configuration: refresh salary_rollups after every successful run (needs sql queries/10_salary_rollups.sql)
+REFRESH_ROLLUPS = os.environ.get("REFRESH_ROLLUPS", "false").lower() == "true"
+
+# Configuration: default age (days) after which /api/maintenance/compact archives raw payloads
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "90"))
+
+# Configuration: seconds before cached reference tables are re-validated against the database
+REFERENCE_CATALOG_TTL = float(os.environ.get("REFERENCE_CATALOG_TTL", "600"))
+
+# Reference catalog shared by all jobs of this process (created on first use)
+reference_catalog: Optional[ReferenceCatalog] = None
+reference_catalog_lock = threading.Lock()
+shared_repository: Optional[PostgresRepository] = None
+shared_repository_lock = threading.Lock()
+task_queue: Optional[PostgresTaskQueue] = None
+task_queue_lock = threading.Lock()
+
+# Configuration: uploads larger than this are streamed into the job instead of pre-resolved
+CSV_PREFLIGHT_MAX_BYTES = int(os.environ.get("CSV_PREFLIGHT_MAX_BYTES", str(5 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 # Thread pool for blocking operations
 executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
 
@@ -77,8 +114,42 @@ def stop_keep_alive():
         print("[KEEP-ALIVE] Stopped background pinger")
 
 
+def get_shared_repository(settings: Settings) -> PostgresRepository:
+    """Process-wide repository, so catalog reloads and health checks share one warm pool"""
+    global shared_repository
+    with shared_repository_lock:
+        if shared_repository is None:
+            shared_repository = PostgresRepository(asdict(settings.database))
+        return shared_repository
+
+
+def get_reference_catalog(settings: Settings) -> ReferenceCatalog:
+    """Process-wide reference catalog, so consecutive jobs skip reloading reference tables"""
+    global reference_catalog
+    with reference_catalog_lock:
+        if reference_catalog is None:
+            reference_catalog = ReferenceCatalog(get_shared_repository(settings), ttl=REFERENCE_CATALOG_TTL)
+        return reference_catalog
+
+
+def get_task_queue(settings: Settings) -> PostgresTaskQueue:
+    """Process-wide task queue on the shared report_staging table (one shared-staging pool)"""
+    global task_queue
+    with task_queue_lock:
+        if task_queue is None:
+            task_queue = PostgresTaskQueue(PostgresRepository(asdict(settings.database), shared_staging=True))
+        return task_queue
+
+
+def _task_queue() -> PostgresTaskQueue:
+    """Shared task queue, settings are only loaded to create it"""
+    return task_queue or get_task_queue(Settings.load("config.yaml"))
+
+
 def is_scraping_running() -> bool:
     """Check if scraping is currently running"""
+    if USE_TASK_QUEUE:
+        return _task_queue().active_run_id() is not None
     return os.path.exists(LOCK_FILE)
 
 
@@ -94,13 +165,14 @@ def remove_lock() -> None:
         os.remove(LOCK_FILE)
 
 
-async def run_scraper_task(config_parser, job_id: str):
-    """Background task to run the scraper in separate thread"""
+async def run_scraper_task(config_parser, job_id: str, cleanup_path: Optional[str] = None):
+    """Background task to run the scraper in separate thread (removes cleanup_path when done)"""
     global current_job_id
     current_job_id = job_id
 
     print(f"[{job_id}] Received scraping task at {datetime.now()}")
     print(f"[{job_id}] Storage type: {'SQLite' if USE_SQLITE_TEMP else 'PostgreSQL temp tables'}")
+    print(f"[{job_id}] Engine: {SCRAPER_ENGINE}")
 
     # Start keep-alive to prevent Render.com sleep during long-running tasks
     start_keep_alive()
@@ -112,6 +184,8 @@ async def run_scraper_task(config_parser, job_id: str):
 
         if success:
             print(f"[{job_id}] Scraping completed successfully")
+            if REFRESH_ROLLUPS:
+                await loop.run_in_executor(executor, refresh_rollups_sync, job_id)
         else:
             print(f"[{job_id}] Scraping failed")
 
@@ -121,6 +195,8 @@ async def run_scraper_task(config_parser, job_id: str):
         stop_keep_alive()  # Stop keep-alive when task completes
         remove_lock()
         current_job_id = None
+        if cleanup_path and os.path.exists(cleanup_path):
+            os.remove(cleanup_path)
 
 
 def run_scraper_sync(config_parser, job_id: str) -> bool:
@@ -129,28 +205,47 @@ def run_scraper_sync(config_parser, job_id: str) -> bool:
         # Load settings
         settings = Settings.load("config.yaml")
 
+        if USE_TASK_QUEUE:
+            return _run_queue_sync(settings, config_parser, job_id)
+
         # Choose repository implementation
-        if USE_SQLITE_TEMP:
+        if SCRAPER_ENGINE == "process":
+            # Worker processes need the shared report_staging table
+            repository = PostgresRepository(asdict(settings.database), shared_staging=True)
+        elif USE_SQLITE_TEMP:
             from src.sqlite_storage import PostgresRepositoryWithSQLite
 
             repository = PostgresRepositoryWithSQLite(asdict(settings.database))
         else:
-            repository = PostgresRepository(asdict(settings.database))
-
-        # Create API client and scraper
-        api_client = HabrApiClient(
-            url=settings.api.url,
-            delay_min=settings.api.delay_min,
-            delay_max=settings.api.delay_max,
-            retry_attempts=settings.api.retry_attempts,
-        )
-        scraper = SalaryScraper(repository, api_client)
+            repository = settings.create_repository()
 
-        # Parse configuration
+        # Parse configuration (combination specs are expanded lazily against the run's repository)
+        catalog = get_reference_catalog(settings)
+        if isinstance(config_parser, SpecConfigParser):
+            config_parser.repository = repository
+            config_parser.catalog = catalog
         config = config_parser.parse()
 
         print(f"[{job_id}] Starting scraping with config: {config.reference_types}")
 
+        if SCRAPER_ENGINE == "async":
+            return asyncio.run(_scrape_async(repository, settings, config, catalog))
+        if SCRAPER_ENGINE == "process":
+            return ShardedSalaryScraper(repository, settings.api, catalog=catalog).scrape(config)
+
+        # Create API client and scraper
+        api_client = HabrApiClient.from_settings(settings.api, settings.workers)
+        if SCRAPER_ENGINE == "pipeline":
+            scraper = PipelinedSalaryScraper(repository, api_client, catalog=catalog)
+        else:
+            scraper = SalaryScraper(
+                repository,
+                api_client,
+                workers=settings.workers,
+                catalog=catalog,
+                commit_per_type=settings.commit_per_reference_type,
+            )
+
         # Run scraping
         return scraper.scrape(config)
 
@@ -162,6 +257,44 @@ def run_scraper_sync(config_parser, job_id: str) -> bool:
         return False
 
 
+def refresh_rollups_sync(job_id: str) -> None:
+    """Bring salary_rollups up to date with the committed run (failures only logged)"""
+    try:
+        watermark = get_shared_repository(Settings.load("config.yaml")).refresh_salary_rollups()
+        print(f"[{job_id}] Salary rollups refreshed up to {watermark}")
+    except Exception as e:
+        print(f"[{job_id}] Rollup refresh failed: {str(e)}")
+
+
+def _run_queue_sync(settings: Settings, config_parser, job_id: str) -> bool:
+    """Publish a run to the task queue (or join the active one) and work on it"""
+    queue = get_task_queue(settings)
+    catalog = get_reference_catalog(settings)
+    scraper = QueuedSalaryScraper(queue, HabrApiClient.from_settings(settings.api), catalog=catalog)
+    if config_parser is None:
+        return scraper.join(job_id)
+    if isinstance(config_parser, SpecConfigParser):
+        config_parser.repository = queue.repository
+        config_parser.catalog = catalog
+    return scraper.join(scraper.enqueue(config_parser.parse(), run_id=job_id))
+
+
+async def _scrape_async(repository, settings: Settings, config: ScrapingConfig, catalog: ReferenceCatalog) -> bool:
+    """Run async engine inside the executor thread's own event loop (writes go through asyncpg)"""
+    api_client = AsyncHabrApiClient(
+        url=settings.api.url,
+        delay_min=settings.api.delay_min,
+        delay_max=settings.api.delay_max,
+        retry_attempts=settings.api.retry_attempts,
+    )
+    async_repository = AsyncPostgresRepository(asdict(settings.database))
+    scraper = AsyncSalaryScraper(repository, api_client, catalog=catalog, async_repository=async_repository)
+    try:
+        return await scraper.scrape(config)
+    finally:
+        await async_repository.close()
+
+
 @app.get("/")
 async def root():
     """Root endpoint with API documentation"""
@@ -179,6 +312,10 @@ async def root():
             "GET /api/status": "Current scraping status",
             "POST /api/scrape": "Start default scraping (all references)",
             "POST /api/scrape/upload": "Start custom scraping with CSV config file upload",
+            "POST /api/scrape/spec": "Start scraping a combination spec, e.g. ?spec=skills[top 200] x regions[all]",
+            "POST /api/scrape/join": "Join the active queued run as an extra worker (USE_TASK_QUEUE)",
+            "POST /api/maintenance/compact": "Archive raw payloads of old reports, e.g. ?days=90",
+            "GET /api/reports/{report_id}/payload": "Raw API payload of a report (hot or archived)",
         },
         "examples": {
             "health_check": "curl https://habr-career-salaries-scrapper.onrender.com/health",
@@ -207,7 +344,7 @@ async def health_check():
     try:
         # Test database connection
         settings = Settings.load("config.yaml")
-        repository = PostgresRepository(asdict(settings.database))
+        repository = get_shared_repository(settings)
 
         # Simple connection test
         with repository.get_connection() as conn:
@@ -216,11 +353,13 @@ async def health_check():
             cursor.close()
 
         storage_type = "SQLite" if USE_SQLITE_TEMP else "PostgreSQL temp tables"
+        pool_stats = repository.pool_stats()
 
         return {
             "status": "healthy",
             "database": "connected",
             "temp_storage": storage_type,
+            "pool": pool_stats.summary() if pool_stats else None,
             "timestamp": datetime.now().isoformat(),
         }
     except Exception as e:
@@ -234,6 +373,26 @@ async def get_status():
     """Get current scraping status"""
     storage_type = "SQLite" if USE_SQLITE_TEMP else "PostgreSQL temp tables"
 
+    if USE_TASK_QUEUE:
+        queue = _task_queue()
+        run_id = queue.active_run_id()
+        if run_id is not None:
+            run = queue.get_run(run_id)
+            return {
+                "status": "running",
+                "job_id": run_id,
+                "temp_storage": "PostgreSQL report_staging",
+                "progress": {
+                    "total": run.total_tasks,
+                    "pending": run.pending,
+                    "leased": run.leased,
+                    "done": run.done,
+                    "failed": run.failed,
+                },
+                "message": "Scraping in progress",
+            }
+        return {"status": "idle", "temp_storage": "PostgreSQL report_staging", "message": "No scraping in progress"}
+
     if is_scraping_running():
         return {
             "status": "running",
@@ -275,9 +434,16 @@ async def start_full_scraping(background_tasks: BackgroundTasks):
 
 @app.post("/api/scrape/upload")
 async def start_custom_scraping(
-    background_tasks: BackgroundTasks, config: UploadFile = File(..., description="CSV configuration file")
+    background_tasks: BackgroundTasks,
+    config: UploadFile = File(..., description="CSV configuration file"),
+    strict: bool = False,
 ):
-    """Start scraping with uploaded CSV configuration"""
+    """Start scraping with uploaded CSV configuration
+
+    Small CSVs are resolved against the reference tables before the job starts: unknown values
+    and duplicate rows are reported in the response (``strict=true`` rejects such files).
+    Files above CSV_PREFLIGHT_MAX_BYTES are streamed: the job reads rows while scraping.
+    """
     if is_scraping_running():
         raise HTTPException(status_code=409, detail="Scraping already in progress")
 
@@ -287,49 +453,206 @@ async def start_custom_scraping(
 
     job_id = str(uuid.uuid4())
     print(f"[API] Received custom scraping request with file: {config.filename}, job_id: {job_id}")
-    create_lock(job_id)
 
+    temp_file_path = None
+    streamed = False
     try:
-        # Save uploaded file to temporary location
+        # Copy uploaded file to a temporary location chunk by chunk
+        size = 0
         with tempfile.NamedTemporaryFile(mode='wb', suffix='.csv', delete=False) as temp_file:
-            content = await config.read()
-            temp_file.write(content)
             temp_file_path = temp_file.name
+            while True:
+                chunk = await config.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                temp_file.write(chunk)
+                size += len(chunk)
+
+        loop = asyncio.get_event_loop()
+        if size > CSV_PREFLIGHT_MAX_BYTES:
+            # Only headers are checked here; the job deletes the file when it is done
+            config_parser = await loop.run_in_executor(None, _streaming_csv_parser, temp_file_path)
+            report = None
+            streamed = True
+        else:
+            # Parse and pre-resolve before taking the lock
+            report = await loop.run_in_executor(None, _preflight_csv, temp_file_path)
+            config_parser = StaticConfigParser(report.config)
+
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid configuration file: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to process configuration file: {str(e)}")
+    finally:
+        # Pre-resolved configs live in memory from here on
+        if not streamed and temp_file_path and os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
 
-        # Create CSV config parser
-        config_parser = CsvConfigParser()
-        config_parser.csv_path = temp_file_path  # Set the path
+    if strict and report is not None and not report.ok:
+        raise HTTPException(status_code=422, detail={"message": "Configuration has problems", **report.summary()})
 
-        # Start background task
-        background_tasks.add_task(run_scraper_task, config_parser, job_id)
-        print(f"[API] Background task started for job {job_id} with CSV config")
+    create_lock(job_id)
 
-        # Schedule cleanup of temp file
-        background_tasks.add_task(cleanup_temp_file, temp_file_path)
+    # Start background task
+    background_tasks.add_task(run_scraper_task, config_parser, job_id, temp_file_path if streamed else None)
+    print(f"[API] Background task started for job {job_id} with {'streamed ' if streamed else ''}CSV config")
 
-        storage_type = "SQLite" if USE_SQLITE_TEMP else "PostgreSQL temp tables"
+    storage_type = "SQLite" if USE_SQLITE_TEMP else "PostgreSQL temp tables"
 
-        return {
-            "status": "started",
-            "job_id": job_id,
-            "temp_storage": storage_type,
-            "message": f"Custom scraping initiated with {config.filename}",
-            "timestamp": datetime.now().isoformat(),
-        }
+    return {
+        "status": "started",
+        "job_id": job_id,
+        "temp_storage": storage_type,
+        "message": f"Custom scraping initiated with {config.filename}",
+        "preflight": report.summary() if report is not None else "skipped (streamed upload)",
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+def _streaming_csv_parser(csv_path: str) -> StaticConfigParser:
+    """Validate CSV headers and return a config that reads rows lazily"""
+    return StaticConfigParser(CsvConfigParser(csv_path, stream=True).parse())
+
+
+def _preflight_csv(csv_path: str) -> PreflightReport:
+    """Parse CSV config and resolve all of its values in batched queries"""
+    settings = Settings.load("config.yaml")
+    config = CsvConfigParser(csv_path).parse()
+    return preflight(config, get_reference_catalog(settings).repository)
+
+
+@app.post("/api/scrape/join")
+async def join_scraping(background_tasks: BackgroundTasks):
+    """Attach this replica as an extra worker to the active queued run"""
+    if not USE_TASK_QUEUE:
+        raise HTTPException(status_code=400, detail="Task queue is disabled (set USE_TASK_QUEUE=true)")
+
+    run_id = _task_queue().active_run_id()
+    if run_id is None:
+        raise HTTPException(status_code=404, detail="No scraping run to join")
+    if current_job_id is not None:
+        raise HTTPException(status_code=409, detail="This replica is already working on a run")
+
+    print(f"[API] Joining run {run_id}")
+    background_tasks.add_task(run_scraper_task, None, run_id)
+
+    return {
+        "status": "joined",
+        "job_id": run_id,
+        "message": "Worker attached to active run",
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+@app.post("/api/scrape/spec")
+async def start_spec_scraping(background_tasks: BackgroundTasks, spec: str, prune: bool = True):
+    """Start scraping combinations generated from a spec such as ``skills[top 200] x regions[all]``"""
+    if is_scraping_running():
+        raise HTTPException(status_code=409, detail="Scraping already in progress")
+
+    # Validate syntax up front; references are resolved when the job runs
+    try:
+        SpecConfigParser.parse_dimensions(spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job_id = str(uuid.uuid4())
+    print(f"[API] Received spec scraping request: {spec}, job_id: {job_id}")
+    create_lock(job_id)
 
+    background_tasks.add_task(run_scraper_task, SpecConfigParser(spec=spec, prune=prune), job_id)
+
+    return {
+        "status": "started",
+        "job_id": job_id,
+        "temp_storage": "SQLite" if USE_SQLITE_TEMP else "PostgreSQL temp tables",
+        "message": f"Spec scraping initiated: {spec}",
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+def _report_compactor(retention_days: int = ARCHIVE_AFTER_DAYS) -> ReportCompactor:
+    settings = Settings.load("config.yaml")
+    return ReportCompactor(get_shared_repository(settings), retention_days=retention_days)
+
+
+@app.post("/api/maintenance/compact")
+async def compact_reports(days: Optional[int] = None):
+    """Archive raw payloads of reports older than ``days`` (default ARCHIVE_AFTER_DAYS)"""
+    if days is not None and days < 1:
+        raise HTTPException(status_code=400, detail="days must be positive")
+
+    compactor = _report_compactor(days or ARCHIVE_AFTER_DAYS)
+    loop = asyncio.get_event_loop()
+    try:
+        # Default pool: compaction must not queue behind a running scrape
+        result = await loop.run_in_executor(None, compactor.run)
     except Exception as e:
-        remove_lock()  # Remove lock on error
-        raise HTTPException(status_code=500, detail=f"Failed to process configuration file: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Compaction failed: {str(e)}")
+
+    return {"status": "completed", **result.summary(), "timestamp": datetime.now().isoformat()}
+
 
+@app.get("/api/reports/{report_id}/payload")
+async def get_report_payload(report_id: int):
+    """Raw API payload of a report, decompressed from the archive if needed"""
+    loop = asyncio.get_event_loop()
+    payload = await loop.run_in_executor(None, _report_compactor().load_payload, report_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail=f"Report {report_id} not found")
+    return payload
+
+
+def _export_parquet(dataset: str, since, until, filters: dict) -> str:
+    repository = get_shared_repository(Settings.load("config.yaml"))
+    fd, path = tempfile.mkstemp(suffix=".parquet", prefix=f"export_{dataset}_")
+    os.close(fd)
+    try:
+        ParquetExporter(repository).export(
+            dataset, path, since, until, resolve_filters(repository, filters), partitioned=False
+        )
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+@app.get("/api/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    background_tasks: BackgroundTasks,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    specializations: Optional[str] = None,
+    skills: Optional[str] = None,
+    regions: Optional[str] = None,
+    companies: Optional[str] = None,
+):
+    """Parquet file of salary facts or reports (``since <= fetched_at < until``, comma-separated reference filters)"""
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset {dataset}. Available: {list(DATASETS)}")
+    filters = {
+        table: values.split(",")
+        for table, values in (
+            ("specializations", specializations),
+            ("skills", skills),
+            ("regions", regions),
+            ("companies", companies),
+        )
+        if values
+    }
 
-async def cleanup_temp_file(file_path: str):
-    """Clean up temporary file after some delay"""
-    await asyncio.sleep(10)  # Wait 10 seconds
+    loop = asyncio.get_event_loop()
     try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-    except OSError:
-        pass  # Ignore cleanup errors
+        path = await loop.run_in_executor(None, _export_parquet, dataset, since, until, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+
+    # Written to a temp file with bounded memory, removed once the response is sent
+    background_tasks.add_task(os.remove, path)
+    return FileResponse(path, media_type="application/vnd.apache.parquet", filename=f"{dataset}.parquet")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,217 @@
+"""
+Non-blocking PostgreSQL repository for the async engine (asyncpg)
+"""
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from src.core import IAsyncRepository, SalaryData
+from src.database import (
+    REFERENCE_COLUMNS,
+    RUN_PROGRESS,
+    numbered_placeholders,
+    report_insert_statements,
+    run_progress_params,
+)
+
+# Staged record layout, in the order passed to copy_records_to_table
+_STAGING_COLUMNS = [*REFERENCE_COLUMNS.values(), "data", "fetched_at"]
+
+
+@dataclass
+class _Staging:
+    """Rows of one transaction: buffered in memory, flushed to a temp table on a pinned connection"""
+
+    table: str
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    buffer: List[Tuple[Any, ...]] = field(default_factory=list)
+    conn: Optional[asyncpg.Connection] = None
+    staged: int = 0
+
+
+class AsyncPostgresRepository(IAsyncRepository):
+    """Async PostgreSQL repository on an asyncpg pool
+
+    Reports are buffered per transaction and written ``batch_size`` at a time with
+    ``copy_records_to_table`` into a temp table on a connection pinned to the transaction
+    (temp tables are per-session). Commit moves them into report_rows/salary_facts with the
+    same statements as PostgresRepository, so both engines store identical data. The pool is
+    created on first use and belongs to the running event loop; call ``close()`` before it ends.
+    """
+
+    def __init__(self, config: Dict[str, Any], batch_size: int = 200, min_size: int = 1, max_size: int = 10):
+        self.config = config
+        self.batch_size = batch_size
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+        self._stagings: Dict[str, _Staging] = {}
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        async with self._pool_lock:
+            if self._pool is None:
+                self._pool = await asyncpg.create_pool(min_size=self.min_size, max_size=self.max_size, **self.config)
+        return self._pool
+
+    async def close(self) -> None:
+        """Close the pool (staged transactions are discarded with their connections)"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        self._stagings.clear()
+
+    async def save_report(self, data: SalaryData, transaction_id: str, timestamp: Optional[datetime] = None) -> bool:
+        """Buffer report for the transaction, flushing a full batch to the staging table"""
+        reference_ids = data.reference_ids
+        if not reference_ids or any(ref_type not in REFERENCE_COLUMNS for ref_type in reference_ids):
+            logging.error(f"Unknown reference type: {data.reference_type}")
+            return False
+
+        staging = self._stagings.get(transaction_id)
+        if staging is None:
+            staging = self._stagings[transaction_id] = _Staging(f"temp_scraping_{transaction_id.replace('-', '_')}")
+        row = (
+            *(reference_ids.get(ref_type) for ref_type in REFERENCE_COLUMNS),
+            json.dumps(data.data),
+            timestamp or datetime.now(),
+        )
+        staging.buffer.append(row)
+        if len(staging.buffer) < self.batch_size:
+            return True
+
+        try:
+            async with staging.lock:
+                rejected = await self._flush(staging)
+        except Exception as e:
+            # Earlier rows were accepted and stay buffered for the next flush; this one is dropped
+            staging.buffer = [buffered for buffered in staging.buffer if buffered is not row]
+            logging.error(f"Error saving report to staging: {e}")
+            return False
+        return not any(rejected_row is row for rejected_row in rejected)
+
+    async def _flush(self, staging: _Staging) -> List[Tuple[Any, ...]]:
+        """Copy buffered rows into the temp table (staging.lock must be held); returns the dropped rows.
+
+        As in Psycopg3Repository, a batch rejected for its data is split until the offending
+        rows are isolated and dropped; on any other error the rows not copied yet go back to
+        the buffer and the error is raised.
+        """
+        if not staging.buffer:
+            return []
+        if staging.conn is None:
+            pool = await self._get_pool()
+            conn = await pool.acquire()
+            try:
+                await conn.execute(
+                    f"""
+                    CREATE TEMPORARY TABLE {staging.table} (
+                        id SERIAL PRIMARY KEY,
+                        specialization_id INTEGER,
+                        skills_1 INTEGER,
+                        region_id INTEGER,
+                        company_id INTEGER,
+                        data JSONB NOT NULL,
+                        fetched_at TIMESTAMP DEFAULT NOW()
+                    )
+                """
+                )
+            except Exception:
+                await pool.release(conn)
+                raise
+            staging.conn = conn
+        records, staging.buffer = staging.buffer, []
+        rejected: List[Tuple[Any, ...]] = []
+        pending = [records]  # Batches still to copy, next one last
+        while pending:
+            batch = pending.pop()
+            try:
+                # A failed COPY copies nothing, there is nothing to roll back
+                await staging.conn.copy_records_to_table(staging.table, records=batch, columns=_STAGING_COLUMNS)
+            except asyncpg.DataError as e:
+                if len(batch) == 1:
+                    logging.error(f"Report rejected by the database, dropped: {e}")
+                    rejected.extend(batch)
+                else:
+                    middle = len(batch) // 2
+                    pending.extend([batch[middle:], batch[:middle]])
+                continue
+            except Exception:
+                # Keep them for a retry or the commit
+                staging.buffer = [row for part in (batch, *reversed(pending)) for row in part] + staging.buffer
+                raise
+            staging.staged += len(batch)
+        return rejected
+
+    async def commit_transaction(self, transaction_id: str) -> None:
+        """Flush remaining rows and move the transaction's reports to the permanent tables"""
+        staging = self._stagings.get(transaction_id)
+        if staging is None:
+            logging.warning(f"No temporary table found for transaction {transaction_id}")
+            return
+
+        async with staging.lock:
+            try:
+                await self._flush(staging)  # Dropped rows were logged and are not committed
+                if staging.staged == 0:
+                    logging.info("No data to commit")
+                    return
+                async with staging.conn.transaction():
+                    await staging.conn.execute(
+                        numbered_placeholders(RUN_PROGRESS),
+                        *run_progress_params(transaction_id, staging.staged, complete=True),
+                    )
+                    await staging.conn.execute("SELECT ensure_report_partitions()")
+                    for statement in report_insert_statements(staging.table):
+                        await staging.conn.execute(statement)
+                    await staging.conn.execute(
+                        """
+                        INSERT INTO report_log (report_date, report_type, total_variants, success_count, duration_seconds, status)
+                        VALUES ($1, $2, $3, $3, 0, 'success')
+                    """,
+                        datetime.now(),
+                        'batch_import',
+                        staging.staged,
+                    )
+                logging.info(f"Successfully committed {staging.staged} reports from temporary storage")
+            except Exception as e:
+                logging.error(f"Error committing transaction: {e}")
+                raise
+            finally:
+                await self._release(transaction_id, staging)
+
+    async def rollback_transaction(self, transaction_id: str) -> None:
+        """Discard buffered and staged rows of the transaction"""
+        staging = self._stagings.get(transaction_id)
+        if staging is None:
+            logging.warning(f"No temp table to rollback for transaction {transaction_id}")
+            return
+
+        async with staging.lock:
+            await self._release(transaction_id, staging)
+            logging.info(f"Rolled back transaction {transaction_id} (dropped staged rows)")
+
+    async def _release(self, transaction_id: str, staging: _Staging) -> None:
+        """Forget the transaction, drop its temp table and return the pinned connection"""
+        self._stagings.pop(transaction_id, None)
+        staging.buffer.clear()
+        if staging.conn is None or self._pool is None:
+            return
+        conn, staging.conn = staging.conn, None
+        try:
+            # Pooled sessions are reused, so a failed commit must not leave the table behind
+            await conn.execute(f"DROP TABLE IF EXISTS {staging.table}")
+        except Exception as e:
+            logging.error(f"Error dropping staging table {staging.table}: {e}")
+        finally:
+            await self._pool.release(conn)
+
+    def transaction_exists(self, transaction_id: str) -> bool:
+        """Check if transaction has buffered or staged rows"""
+        return transaction_id in self._stagings
@@ -1,49 +1,140 @@
 """Async version of SalaryScraper"""
 
 import asyncio
-from typing import List
-from src.core import IRepository, ScrapingConfig, Reference, SalaryData
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from src.core import IAsyncRepository, IRepository, ScrapingConfig, Reference, SalaryData, ScrapeTask
 from src.async_api import AsyncHabrApiClient
+from src.reference_catalog import ReferenceCatalog
+from src.scraper import build_params, build_task_params, build_task_reports
 
 
 class AsyncSalaryScraper:
-    """Асинхронный скрапер с параллельными запросами"""
+    """Асинхронный скрапер с параллельными запросами
 
-    def __init__(self, repository: IRepository, api_client: AsyncHabrApiClient, concurrency: int = 10):
+    With an ``async_repository`` (e.g. AsyncPostgresRepository) reports are staged and
+    committed without blocking the event loop; ``repository`` is then only used to load
+    references. Without it writes go through the synchronous repository.
+    """
+
+    def __init__(
+        self,
+        repository: IRepository,
+        api_client: AsyncHabrApiClient,
+        concurrency: int = 10,
+        catalog: Optional[ReferenceCatalog] = None,
+        async_repository: Optional[IAsyncRepository] = None,
+    ):
         self.repository = repository
+        self.async_repository = async_repository
         self.api_client = api_client
+        self.catalog = catalog or ReferenceCatalog(repository)
+        self.concurrency = concurrency
         self.semaphore = asyncio.Semaphore(concurrency)
 
     async def scrape(self, config: ScrapingConfig) -> bool:
-        transaction_id = "async-transaction"
-        tasks: List[asyncio.Task] = []
+        transaction_id = str(uuid.uuid4())
+        transaction_timestamp = datetime.now()  # Единая дата для всей транзакции
+
+        try:
+            if config.combinations:
+                logging.info("Scraping combinations (async)")
+                tasks = self._plan_combinations(config.combinations)
+            else:
+                logging.info(f"Scraping individual references (async): {config.reference_types}")
+                tasks = (
+                    ScrapeTask(references=[(ref_type, ref)])
+                    for ref_type in config.reference_types
+                    for ref in self.catalog.get_references(ref_type)
+                )
+
+            total_count, success_count = await self._run_bounded(tasks, transaction_id, transaction_timestamp)
+
+            if total_count == 0:
+                logging.info("No data to scrape")
+                return True
+
+            await self._commit(transaction_id)
+            logging.info(f"Async scraping completed: {success_count}/{total_count} successful")
+            return True
+
+        except Exception as e:
+            await self._rollback(transaction_id)
+            logging.error(f"Critical error during async scraping: {e}")
+            return False
+
+    async def _save(self, data: SalaryData, transaction_id: str, timestamp: datetime) -> bool:
+        if self.async_repository is not None:
+            return await self.async_repository.save_report(data, transaction_id, timestamp)
+        return self.repository.save_report(data, transaction_id, timestamp)
+
+    async def _commit(self, transaction_id: str) -> None:
+        if self.async_repository is not None:
+            await self.async_repository.commit_transaction(transaction_id)
+        else:
+            self.repository.commit_transaction(transaction_id)
+
+    async def _rollback(self, transaction_id: str) -> None:
+        if self.async_repository is not None:
+            await self.async_repository.rollback_transaction(transaction_id)
+        else:
+            self.repository.rollback_transaction(transaction_id)
 
-        for ref_type in config.reference_types:
-            refs = self.repository.get_references(ref_type)
-            for ref in refs:
-                tasks.append(asyncio.create_task(self._process_ref(ref_type, ref, transaction_id)))
+    async def _run_bounded(
+        self, tasks: Iterable[ScrapeTask], transaction_id: str, timestamp: datetime
+    ) -> Tuple[int, int]:
+        """Process tasks with at most ``concurrency`` in flight, pulling the plan lazily"""
+        pending = set()
+        total = 0
+        success = 0
+        for task in tasks:
+            if len(pending) >= self.concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                success += sum(1 for future in done if future.result())
+            pending.add(asyncio.ensure_future(self._process_task(task, transaction_id, timestamp)))
+            total += 1
+        if pending:
+            done, _ = await asyncio.wait(pending)
+            success += sum(1 for future in done if future.result())
+        return total, success
 
-        if tasks:
-            await asyncio.gather(*tasks)
+    def _plan_combinations(self, combinations) -> Iterator[ScrapeTask]:
+        """Resolve CSV rows to tasks lazily through the reference catalog"""
+        for combination in combinations:
+            task = self._resolve_combination(combination)
+            if task is not None:
+                yield task
 
-        self.repository.commit_transaction(transaction_id)
-        return True
+    def _resolve_combination(self, combination: tuple) -> Optional[ScrapeTask]:
+        resolved: List[Tuple[str, Reference]] = []
+        try:
+            for ref_type, value in combination:
+                if isinstance(value, Reference):  # Already resolved by a CombinationSpec
+                    resolved.append((ref_type, value))
+                    continue
+                found_ref = self.catalog.find(ref_type, value)
+                if not found_ref:
+                    logging.warning(f"Reference not found: {ref_type}={value}")
+                    return None
+                resolved.append((ref_type, found_ref))
+        except ValueError as e:
+            logging.error(f"Error processing combination {combination}: {e}")
+            return None
+        return ScrapeTask(references=resolved)
 
-    async def _process_ref(self, ref_type: str, ref: Reference, transaction_id: str):
+    async def _process_task(self, task: ScrapeTask, transaction_id: str, timestamp: datetime) -> bool:
         async with self.semaphore:
-            params = self._build_params(ref_type, ref)
-            data = await self.api_client.fetch_salary_data(**params)
-            if data:
-                salary_data = SalaryData(data=data, reference_id=ref.id, reference_type=ref_type)
-                self.repository.save_report(salary_data, transaction_id)
+            data = await self.api_client.fetch_salary_data(**build_task_params(task))
+            if not data:
+                return False
+            saved = True
+            for salary_data in build_task_reports(task, data):
+                # Later reports are still saved after a failed one; the task counts only if all were staged
+                saved = await self._save(salary_data, transaction_id, timestamp) and saved
+            return saved
 
     @staticmethod
     def _build_params(ref_type: str, ref: Reference):
-        mapping = {
-            "specializations": ("spec_alias", ref.alias),
-            "skills": ("skill_aliases", [ref.alias]),
-            "regions": ("region_alias", ref.alias),
-            "companies": ("company_alias", ref.alias),
-        }
-        key, value = mapping.get(ref_type, (None, None))
-        return {key: value} if key else {}
+        return build_params(ref_type, ref)
@@ -1,42 +1,226 @@
 import typer
 import asyncio
-from typing import Optional
+from typing import List, Optional
 from pathlib import Path
+from dataclasses import asdict
+from datetime import datetime, timedelta
 from src.settings import Settings
-from src.database import PostgresRepository
+from src.database import REFERENCE_COLUMNS, PostgresRepository
 from src.scraper import HabrApiClient, SalaryScraper
+from src.config_parser import DefaultConfigParser, SpecConfigParser
+from src.core import ScrapingConfig
+from src.reference_catalog import ReferenceCatalog
 from src.async_api import AsyncHabrApiClient
 from src.async_scraper import AsyncSalaryScraper
+from src.async_database import AsyncPostgresRepository
+from src.pipeline import PipelinedSalaryScraper
+from src.sharded import ShardedSalaryScraper
+from src.task_queue import PostgresTaskQueue, QueuedSalaryScraper
+from src.compaction import ReportCompactor
+from src.export import ParquetExporter, resolve_filters
+from src.reference_import import read_reference_rows
+from src.sqlite_repository import SQLiteRepository, sync_to_postgres
 from scripts.update_references import update_reference
 
-
 app = typer.Typer(help="Salary scraper CLI")
 
 
 def _load_repo() -> PostgresRepository:
     settings = Settings.load("config.yaml")
-    return PostgresRepository(settings.database.model_dump())
+    return PostgresRepository(asdict(settings.database))
 
 
 @app.command()
-def scrape(async_mode: bool = typer.Option(False, "--async", help="Use async scraper")):
+def scrape(
+    async_mode: bool = typer.Option(False, "--async", help="Use async scraper"),
+    pipeline: bool = typer.Option(False, "--pipeline", help="Use staged fetch/transform/persist pipeline"),
+    workers: Optional[int] = typer.Option(None, "--workers", help="Thread pool size for the sync scraper"),
+    processes: Optional[int] = typer.Option(None, "--processes", help="Run plan shards in N worker processes"),
+    spec: Optional[str] = typer.Option(None, "--spec", help="Combination spec, e.g. 'skills[top 200] x regions[all]'"),
+    prune: bool = typer.Option(
+        True,
+        "--prune/--no-prune",
+        help="Skip children of references and combinations whose last report had zero vacancies",
+    ),
+):
     """Run scraping with current config.yaml"""
     settings = Settings.load("config.yaml")
-    repo = _load_repo()
+    if settings.database_backend == "sqlite" and (processes or async_mode):
+        raise typer.BadParameter("--processes and --async need a PostgreSQL database_backend")
+    if processes:
+        repo = PostgresRepository(asdict(settings.database), shared_staging=True)
+        catalog = ReferenceCatalog(repo)
+        scraper = ShardedSalaryScraper(repo, settings.api, processes, catalog=catalog)
+        scraper.scrape(_scraping_config(repo, catalog, spec, prune))
+        return
+
+    repo = settings.create_repository()
+    catalog = ReferenceCatalog(repo)
+    config = _scraping_config(repo, catalog, spec, prune)
     if async_mode:
-        client = AsyncHabrApiClient(**settings.api.model_dump())
-        scraper = AsyncSalaryScraper(repo, client)
-        asyncio.run(scraper.scrape(settings.to_scraping_config()))
+        client = AsyncHabrApiClient(
+            settings.api.url, settings.api.delay_min, settings.api.delay_max, settings.api.retry_attempts
+        )
+        async_repo = AsyncPostgresRepository(asdict(settings.database))
+        scraper = AsyncSalaryScraper(repo, client, catalog=catalog, async_repository=async_repo)
+        asyncio.run(_scrape_async(scraper, config, async_repo))
     else:
-        client = HabrApiClient(**settings.api.model_dump())
-        scraper = SalaryScraper(repo, client)
-        scraper.scrape(settings.to_scraping_config())
+        workers = workers or settings.workers
+        client = HabrApiClient.from_settings(settings.api, workers)
+        if pipeline:
+            scraper = PipelinedSalaryScraper(repo, client, catalog=catalog)
+        else:
+            scraper = SalaryScraper(
+                repo, client, workers=workers, catalog=catalog, commit_per_type=settings.commit_per_reference_type
+            )
+        scraper.scrape(config)
+
+
+async def _scrape_async(scraper: AsyncSalaryScraper, config: ScrapingConfig, async_repo: AsyncPostgresRepository):
+    try:
+        return await scraper.scrape(config)
+    finally:
+        await async_repo.close()
+
+
+def _scraping_config(
+    repo: PostgresRepository, catalog: ReferenceCatalog, spec: Optional[str], prune: bool
+) -> ScrapingConfig:
+    if spec:
+        return SpecConfigParser(repo, prune=prune, catalog=catalog).parse(spec)
+    return DefaultConfigParser().parse()
+
+
+@app.command()
+def worker(
+    run_id: Optional[str] = typer.Argument(None, help="Run to join (defaults to the active run)"),
+    enqueue: bool = typer.Option(False, "--enqueue", help="Publish a new run from config.yaml first"),
+    spec: Optional[str] = typer.Option(None, "--spec", help="Combination spec for --enqueue"),
+    batch_size: int = typer.Option(10, "--batch-size", help="Tasks claimed per lease"),
+):
+    """Work on a run from the shared scrape_tasks queue"""
+    settings = Settings.load("config.yaml")
+    queue = PostgresTaskQueue(PostgresRepository(asdict(settings.database), shared_staging=True))
+    scraper = QueuedSalaryScraper(queue, HabrApiClient.from_settings(settings.api), batch_size=batch_size)
+    if enqueue:
+        run_id = scraper.enqueue(_scraping_config(queue.repository, scraper.catalog, spec, prune=True))
+    if not scraper.join(run_id):
+        raise typer.Exit(code=1)
+
+
+@app.command("backfill-facts")
+def backfill_facts(batch_size: int = typer.Option(10000, "--batch-size", help="Report ids per committed batch")):
+    """Fill salary_facts for reports stored before it existed"""
+    inserted = _load_repo().backfill_salary_facts(batch_size)
+    typer.echo(f"Inserted {inserted} salary facts")
+
+
+@app.command()
+def compact(
+    days: int = typer.Option(90, "--days", help="Archive payloads only referenced by reports older than this"),
+    batch_size: int = typer.Option(500, "--batch-size", help="Payloads per committed batch"),
+):
+    """Move old raw payloads into the compressed archive (facts and rollups stay hot)"""
+    result = ReportCompactor(_load_repo(), retention_days=days, batch_size=batch_size).run()
+    typer.echo(
+        f"Archived {result.archived} payloads older than {result.cutoff:%Y-%m-%d} "
+        f"({result.raw_bytes} -> {result.compressed_bytes} bytes)"
+    )
 
 
 @app.command()
-def update(table: str, file: Path):
-    """Update reference table from Excel"""
-    update_reference(table, str(file))
+def export(
+    dataset: str = typer.Argument(..., help="facts (salary_facts) or reports (raw payloads)"),
+    destination: Path = typer.Argument(..., help="Directory (month=YYYY-MM partitions) or file with --single-file"),
+    since: Optional[datetime] = typer.Option(None, "--since", help="Only rows fetched at or after this time"),
+    until: Optional[datetime] = typer.Option(None, "--until", help="Only rows fetched before this time"),
+    where: List[str] = typer.Option([], "--where", help="Reference filter, e.g. skills=python,go (repeatable)"),
+    single_file: bool = typer.Option(False, "--single-file", help="Write one Parquet file instead of partitions"),
+    batch_size: int = typer.Option(50000, "--batch-size", help="Rows per record batch / row group"),
+):
+    """Stream salary facts or reports into Parquet files"""
+    repo = _load_repo()
+    filters = {}
+    for condition in where:
+        table, _, values = condition.partition("=")
+        filters.setdefault(table.strip(), []).extend(values.split(","))
+    try:
+        references = resolve_filters(repo, filters)
+        result = ParquetExporter(repo, batch_size=batch_size).export(
+            dataset, destination, since, until, references, partitioned=not single_file
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    typer.echo(f"Exported {result.rows} {dataset} rows to {len(result.files)} files in {destination}")
+
+
+@app.command("ensure-partitions")
+def ensure_partitions(months_ahead: int = typer.Option(2, "--months-ahead", help="Months to create ahead of now")):
+    """Create upcoming monthly partitions of report_rows and salary_facts"""
+    created = _load_repo().ensure_partitions(months_ahead)
+    typer.echo(f"Created {created} partitions")
+
+
+@app.command("refresh-rollups")
+def refresh_rollups(
+    lookback_hours: float = typer.Option(24, "--lookback-hours", help="Re-read facts this far behind the watermark")
+):
+    """Update salary_rollups with facts committed since the last refresh"""
+    watermark = _load_repo().refresh_salary_rollups(timedelta(hours=lookback_hours))
+    typer.echo(f"Salary rollups up to date as of {watermark}")
+
+
+@app.command()
+def update(
+    table: str,
+    file: Path,
+    sqlite: Optional[Path] = typer.Option(None, "--sqlite", help="Update this SQLite file instead of PostgreSQL"),
+):
+    """Upsert reference table from an XLSX or CSV file with title/alias columns"""
+    if sqlite:
+        if table not in REFERENCE_COLUMNS:
+            raise typer.BadParameter(f"Invalid table: {table}. Must be one of {list(REFERENCE_COLUMNS)}")
+        repo = SQLiteRepository(sqlite)
+        try:
+            written = repo.import_reference_rows(table, read_reference_rows(file))
+        finally:
+            repo.close()
+        typer.echo(f"Updated {table} in {sqlite}: {written} rows inserted or changed")
+        return
+    if not update_reference(table, str(file)):
+        raise typer.Exit(code=1)
+
+
+@app.command("sqlite-snapshot")
+def sqlite_snapshot(path: Optional[Path] = typer.Argument(None, help="SQLite file (defaults to sqlite_path)")):
+    """Copy the reference tables from PostgreSQL into a SQLite file for offline runs"""
+    settings = Settings.load("config.yaml")
+    postgres = PostgresRepository(asdict(settings.database))
+    repo = SQLiteRepository(path or settings.sqlite_path)
+    try:
+        for table in REFERENCE_COLUMNS:
+            copied = repo.copy_references(table, postgres.iter_references(table))
+            typer.echo(f"Copied {copied} {table}")
+    finally:
+        repo.close()
+
+
+@app.command("sqlite-sync")
+def sqlite_sync(
+    path: Optional[Path] = typer.Argument(None, help="SQLite file (defaults to sqlite_path)"),
+    batch_size: int = typer.Option(5000, "--batch-size", help="Report rows per committed batch"),
+):
+    """Push reports of a SQLite file that PostgreSQL does not have yet"""
+    settings = Settings.load("config.yaml")
+    repo = SQLiteRepository(path or settings.sqlite_path)
+    try:
+        result = sync_to_postgres(repo, PostgresRepository(asdict(settings.database)), batch_size)
+    finally:
+        repo.close()
+    typer.echo(
+        f"Pushed {result.pushed} of {result.rows} reports to {result.target} in {result.batches} batches "
+        f"({result.pending} left: unknown references, import them and sync again)"
+    )
 
 
 if __name__ == "__main__":
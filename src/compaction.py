@@ -0,0 +1,150 @@
+"""
+Cold-tier compaction: move old raw payloads into a compressed archive
+"""
+
+import json
+import logging
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from psycopg2.extras import execute_values
+
+from src.database import SALARY_FACTS_COLUMNS, SALARY_FACTS_SELECT, PostgresRepository
+
+
+@dataclass
+class CompactionResult:
+    """Outcome of one compaction run"""
+
+    cutoff: datetime
+    archived: int = 0  # Payloads moved to the archive
+    raw_bytes: int = 0  # Their JSON size before compression
+    compressed_bytes: int = 0
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-friendly result"""
+        return {
+            "cutoff": self.cutoff.isoformat(),
+            "archived_payloads": self.archived,
+            "raw_bytes": self.raw_bytes,
+            "compressed_bytes": self.compressed_bytes,
+        }
+
+
+class ReportCompactor:
+    """Archives payloads referenced only by reports older than ``retention_days``.
+
+    Each batch first makes sure the affected reports have salary_facts, then stores the
+    payloads zlib-compressed in report_payload_archive and deletes them from report_payloads.
+    The hot table is locked against concurrent commits per batch, so a run that reuses a
+    payload cannot lose it. Needs sql queries/12_payload_archive.sql.
+    """
+
+    def __init__(self, repository: PostgresRepository, retention_days: int = 90, batch_size: int = 500):
+        self.repository = repository
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+
+    def run(self) -> CompactionResult:
+        """Archive all eligible payloads in committed batches"""
+        result = CompactionResult(cutoff=datetime.now() - timedelta(days=self.retention_days))
+        while True:
+            archived = self._archive_batch(result)
+            if archived == 0:
+                break
+            logging.info(f"Archived {result.archived} payloads ({result.raw_bytes} -> {result.compressed_bytes} bytes)")
+        return result
+
+    def _archive_batch(self, result: CompactionResult) -> int:
+        with self.repository.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                # Blocks insert_reports (ROW EXCLUSIVE) until this batch commits. Age comes from the
+                # reports only: created_at is the migration time for payloads moved by 08_report_payloads.sql
+                cursor.execute("LOCK TABLE report_payloads IN SHARE ROW EXCLUSIVE MODE")
+                cursor.execute(
+                    """
+                    SELECT p.hash, p.data::text
+                    FROM report_payloads p
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM report_rows r
+                        WHERE r.payload_hash = p.hash AND r.fetched_at >= %(cutoff)s
+                    )
+                    LIMIT %(limit)s
+                """,
+                    {"cutoff": result.cutoff, "limit": self.batch_size},
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    conn.commit()
+                    return 0
+
+                hashes = [row[0] for row in rows]
+                cursor.execute(
+                    f"""
+                    INSERT INTO salary_facts ({SALARY_FACTS_COLUMNS})
+                    {SALARY_FACTS_SELECT.format(rows="report_rows")}
+                    WHERE r.payload_hash = ANY(%s::uuid[])
+                    ON CONFLICT DO NOTHING
+                """,
+                    (hashes,),
+                )
+
+                archive = []
+                for payload_hash, text in rows:
+                    raw = text.encode("utf-8")
+                    compressed = zlib.compress(raw, 9)
+                    archive.append((payload_hash, compressed, len(raw)))
+                    result.raw_bytes += len(raw)
+                    result.compressed_bytes += len(compressed)
+                execute_values(
+                    cursor,
+                    """
+                    INSERT INTO report_payload_archive (hash, data, raw_size) VALUES %s
+                    ON CONFLICT (hash) DO NOTHING
+                """,
+                    archive,
+                    template="(%s::uuid, %s, %s)",
+                )
+                cursor.execute("DELETE FROM report_payloads WHERE hash = ANY(%s::uuid[])", (hashes,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        result.archived += len(rows)
+        return len(rows)
+
+    def load_payload(self, report_id: int) -> Optional[Dict[str, Any]]:
+        """Raw API payload of a report, from the hot table or the archive (None if unknown)"""
+        with self.repository.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    """
+                    SELECT p.data, a.data
+                    FROM report_rows r
+                    LEFT JOIN report_payloads p ON p.hash = r.payload_hash
+                    LEFT JOIN report_payload_archive a ON a.hash = r.payload_hash
+                    WHERE r.id = %s
+                    LIMIT 1
+                """,
+                    (report_id,),
+                )
+                row = cursor.fetchone()
+                conn.commit()
+            finally:
+                cursor.close()
+
+        if row is None:
+            return None
+        hot, archived = row
+        if hot is not None:
+            return hot
+        if archived is not None:
+            return json.loads(zlib.decompress(bytes(archived)).decode("utf-8"))
+        return None
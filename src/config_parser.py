@@ -3,21 +3,32 @@ Configuration parser implementation
 """
 
 import csv
+import hashlib
 import logging
-from typing import List, Set, Tuple, Optional
+import re
+from typing import Iterator, List, Set, Tuple, Optional
 from pathlib import Path
 
-from src.core import IConfigParser, ScrapingConfig
+from src.core import IConfigParser, IRepository, Reference, ScrapingConfig
+from src.reference_catalog import ReferenceCatalog
+
+_SPEC_TERM = r"(\w+)\s*(?:\[([^\]]*)\])?"
+_SPEC_SEPARATOR = r"\s*[x×*]\s*"
 
 
 class CsvConfigParser(IConfigParser):
-    """CSV configuration parser"""
+    """CSV configuration parser
+
+    With ``stream=True`` rows are not loaded up front: the config holds a ``CsvCombinations``
+    that reads the file while the scraper consumes it.
+    """
 
     VALID_HEADERS = {'specializations', 'skills', 'regions', 'companies'}
 
-    def __init__(self, csv_path: Optional[str] = None):
+    def __init__(self, csv_path: Optional[str] = None, stream: bool = False):
         """Initialize with optional CSV path"""
         self.csv_path = csv_path
+        self.stream = stream
 
     def parse(self, source: Optional[str] = None) -> ScrapingConfig:
         """Parse CSV configuration file"""
@@ -31,34 +42,85 @@ class CsvConfigParser(IConfigParser):
 
         with open(file_path, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
-            headers = set(reader.fieldnames or [])
-
-            # Validate headers
-            invalid_headers = headers - self.VALID_HEADERS
-            if invalid_headers:
-                logging.error(f"Invalid headers found: {invalid_headers}")
-                logging.error(f"   Valid headers are: {self.VALID_HEADERS}")
-                raise ValueError(f"Invalid headers: {invalid_headers}")
+            headers = self.validate_headers(reader.fieldnames)
 
-            if not headers:
-                raise ValueError("Empty CSV file or no headers found")
+            if self.stream:
+                # Only make sure there is something to scrape; rows are read again lazily
+                if next(iter_csv_rows(reader), None) is None:
+                    raise ValueError("No valid data rows found in CSV file")
+                return ScrapingConfig(reference_types=list(headers), combinations=CsvCombinations(file_path))
 
             # Read all combinations from data rows
-            combinations = []
-            for row in reader:
-                # Skip empty rows
-                if not any(row.values()):
-                    continue
-                # Store the actual values from the row, not just keys
-                row_values = tuple((header, value) for header, value in row.items() if value.strip())
-                if row_values:
-                    combinations.append(row_values)
+            combinations = list(iter_csv_rows(reader))
 
             if not combinations:
                 raise ValueError("No valid data rows found in CSV file")
 
         return ScrapingConfig(reference_types=list(headers), combinations=combinations)
 
+    @classmethod
+    def validate_headers(cls, fieldnames: Optional[List[str]]) -> Set[str]:
+        """Check CSV headers are reference types"""
+        headers = set(fieldnames or [])
+
+        # Validate headers
+        invalid_headers = headers - cls.VALID_HEADERS
+        if invalid_headers:
+            logging.error(f"Invalid headers found: {invalid_headers}")
+            logging.error(f"   Valid headers are: {cls.VALID_HEADERS}")
+            raise ValueError(f"Invalid headers: {invalid_headers}")
+
+        if not headers:
+            raise ValueError("Empty CSV file or no headers found")
+        return headers
+
+
+def iter_csv_rows(reader: csv.DictReader) -> Iterator[Tuple[Tuple[str, str], ...]]:
+    """Yield non-empty CSV rows as ((header, value), ...) tuples"""
+    for row in reader:
+        # Skip empty rows
+        if not any(row.values()):
+            continue
+        # Store the actual values from the row, not just keys
+        row_values = tuple((header, value) for header, value in row.items() if value and value.strip())
+        if row_values:
+            yield row_values
+
+
+def row_fingerprint(row: Tuple[Tuple[str, str], ...]) -> int:
+    """64-bit hash of a normalized row (order and case insensitive) for compact dedupe sets"""
+    key = "\x1f".join(sorted(f"{header}={value.strip().casefold()}" for header, value in row))
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+
+
+class CsvCombinations:
+    """Combination rows read lazily from a CSV file, duplicates skipped.
+
+    Each iteration re-reads the file; seen rows are tracked as 64-bit fingerprints
+    (an int per unique row) instead of the row tuples themselves.
+    """
+
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+        self.duplicates = 0
+
+    def __repr__(self) -> str:
+        return f"CsvCombinations({self.csv_path!r})"
+
+    def __iter__(self) -> Iterator[Tuple[Tuple[str, str], ...]]:
+        seen: Set[int] = set()
+        self.duplicates = 0
+        with open(self.csv_path, 'r', encoding='utf-8') as f:
+            for row in iter_csv_rows(csv.DictReader(f)):
+                fingerprint = row_fingerprint(row)
+                if fingerprint in seen:
+                    self.duplicates += 1
+                    continue
+                seen.add(fingerprint)
+                yield row
+        if self.duplicates:
+            logging.warning(f"Skipped {self.duplicates} duplicate rows in {self.csv_path}")
+
 
 class DefaultConfigParser(IConfigParser):
     """Default configuration parser for full scraping"""
@@ -66,3 +128,156 @@ class DefaultConfigParser(IConfigParser):
     def parse(self, source: Optional[str] = None) -> ScrapingConfig:
         """Parse default configuration (all reference types)"""
         return ScrapingConfig(reference_types=['specializations', 'skills', 'regions', 'companies'], combinations=None)
+
+
+class StaticConfigParser(IConfigParser):
+    """Parser returning an already prepared configuration (e.g. pre-flight output)"""
+
+    def __init__(self, config: ScrapingConfig):
+        self.config = config
+
+    def parse(self, source: Optional[str] = None) -> ScrapingConfig:
+        """Return the prepared configuration"""
+        return self.config
+
+
+class CombinationSpec:
+    """Lazy cartesian product of reference selections, e.g. ``skills[top 200] x regions[all]``.
+
+    Iterating yields combination rows ``(('skills', Reference), ('regions', Reference))`` one at a
+    time; only the per-dimension reference lists are held in memory, never the product. With
+    ``prune`` a reference of a non-last dimension is skipped together with all of its child
+    combinations when its latest single-reference report, or the latest report of the
+    combination it extends, had zero vacancies: with ``skills x regions x companies`` an empty
+    ``python`` or an empty ``python x Москва`` is not expanded further.
+    """
+
+    def __init__(
+        self,
+        spec: str,
+        dimensions: List[Tuple[str, str]],
+        repository: IRepository,
+        prune: bool = True,
+        catalog: Optional[ReferenceCatalog] = None,
+    ):
+        self.spec = spec
+        self.dimensions = dimensions
+        self.repository = repository
+        self.prune = prune
+        self.catalog = catalog or ReferenceCatalog(repository)
+
+    def __repr__(self) -> str:
+        return f"CombinationSpec({self.spec!r})"
+
+    def __iter__(self) -> Iterator[Tuple[Tuple[str, Reference], ...]]:
+        selections = [(ref_type, self._select(ref_type, selector)) for ref_type, selector in self.dimensions]
+        # Leaves have no children, so only parent dimensions are checked against past totals:
+        # each reference on its own and, below the first dimension, the combination so far
+        ref_types = [ref_type for ref_type, _ in selections]
+        empty = [self._empty_ids(ref_type) for ref_type in ref_types[:-1]]
+        empty_combinations = [set()] + [
+            self._empty_combinations(ref_types[: level + 1]) for level in range(1, len(ref_types) - 1)
+        ]
+        return self._expand(selections, empty, empty_combinations, ())
+
+    def _expand(self, selections, empty, empty_combinations, prefix) -> Iterator[Tuple[Tuple[str, Reference], ...]]:
+        level = len(prefix)
+        ref_type, references = selections[level]
+        for ref in references:
+            combination = prefix + ((ref_type, ref),)
+            if level == len(selections) - 1:
+                yield combination
+            elif ref.id in empty[level]:
+                logging.debug(f"Pruned {ref_type}={ref.alias}: no vacancies in last report")
+            elif tuple(ref.id for _, ref in combination) in empty_combinations[level]:
+                logging.debug(f"Pruned {' x '.join(ref.alias for _, ref in combination)}: no vacancies in last report")
+            else:
+                yield from self._expand(selections, empty, empty_combinations, combination)
+
+    def _select(self, ref_type: str, selector: str) -> List[Reference]:
+        selector = selector.strip()
+        if not selector or selector.lower() == 'all':
+            return self.catalog.get_references(ref_type)
+
+        top = re.fullmatch(r"top\s+(\d+)", selector, re.IGNORECASE)
+        if top:
+            # Catalog tables are ordered by id
+            return self.catalog.get_references(ref_type)[: int(top.group(1))]
+
+        # Explicit comma separated aliases or titles
+        selected = []
+        for value in (v.strip() for v in selector.split(',')):
+            ref = self.catalog.find(ref_type, value) if value else None
+            if ref is None:
+                logging.warning(f"Reference not found: {ref_type}={value}")
+            else:
+                selected.append(ref)
+        return selected
+
+    def _empty_ids(self, ref_type: str) -> Set[int]:
+        if not self.prune:
+            return set()
+        empty = {ref_id for ref_id, total in self.repository.get_latest_totals(ref_type).items() if total == 0}
+        if empty:
+            logging.info(f"Pruning {len(empty)} {ref_type} with zero vacancies in their last report")
+        return empty
+
+    def _empty_combinations(self, ref_types: List[str]) -> Set[Tuple[int, ...]]:
+        if not self.prune:
+            return set()
+        totals = self.repository.get_latest_combination_totals(ref_types)
+        empty = {ids for ids, total in totals.items() if total == 0}
+        if empty:
+            logging.info(f"Pruning {len(empty)} {' x '.join(ref_types)} with zero vacancies in their last report")
+        return empty
+
+
+class SpecConfigParser(IConfigParser):
+    """Parser for declarative combination specs such as ``skills[top 200] x regions[all]``
+
+    Selectors: ``all`` (or none), ``top N`` (first N references by id) or a comma separated
+    list of aliases/titles. Dimensions are joined with ``x``, ``×`` or ``*``.
+    """
+
+    def __init__(
+        self,
+        repository: Optional[IRepository] = None,
+        spec: Optional[str] = None,
+        prune: bool = True,
+        catalog: Optional[ReferenceCatalog] = None,
+    ):
+        self.repository = repository
+        self.spec = spec
+        self.prune = prune
+        self.catalog = catalog
+
+    def parse(self, source: Optional[str] = None) -> ScrapingConfig:
+        """Parse spec string into a lazily expanded configuration"""
+        spec = source or self.spec
+        dimensions = self.parse_dimensions(spec)
+        if self.repository is None:
+            raise ValueError("Combination spec needs a repository to expand")
+
+        return ScrapingConfig(
+            reference_types=[ref_type for ref_type, _ in dimensions],
+            combinations=CombinationSpec(spec.strip(), dimensions, self.repository, self.prune, self.catalog),
+        )
+
+    @staticmethod
+    def parse_dimensions(spec: Optional[str]) -> List[Tuple[str, str]]:
+        """Validate spec syntax and return [(reference_type, selector), ...]"""
+        if not spec or not spec.strip():
+            raise ValueError("No combination spec provided")
+        if not re.fullmatch(rf"\s*{_SPEC_TERM}(?:{_SPEC_SEPARATOR}{_SPEC_TERM})*\s*", spec):
+            raise ValueError(f"Invalid combination spec: {spec!r}")
+
+        terms = re.finditer(rf"(?:^\s*|{_SPEC_SEPARATOR}){_SPEC_TERM}", spec)
+        dimensions = [(m.group(1), m.group(2) or 'all') for m in terms]
+
+        ref_types = [ref_type for ref_type, _ in dimensions]
+        invalid = set(ref_types) - CsvConfigParser.VALID_HEADERS
+        if invalid:
+            raise ValueError(f"Invalid reference types: {invalid}")
+        if len(set(ref_types)) != len(ref_types):
+            raise ValueError(f"Duplicate reference types in spec: {spec!r}")
+        return dimensions
@@ -3,8 +3,8 @@ Core classes and interfaces for salary scraper following SOLID principles
 """
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple
 from datetime import datetime
 import json
 
@@ -25,6 +25,13 @@ class SalaryData:
     data: Dict[str, Any]
     reference_id: int
     reference_type: str
+    # Every reference of a combination ({'skills': 1, 'regions': 10}); the row gets all of them
+    combination: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def reference_ids(self) -> Dict[str, int]:
+        """Reference id per reference type to store in one report row"""
+        return self.combination or {self.reference_type: self.reference_id}
 
 
 @dataclass
@@ -32,15 +39,23 @@ class ScrapingConfig:
     """Configuration for scraping task"""
 
     reference_types: List[str]  # ['specializations', 'skills', 'regions', 'companies']
-    combinations: Optional[List[Tuple[str, ...]]] = None  # [('skills', 'regions'), ...]
+    # [('skills', 'regions'), ...]; may be a lazy iterable (see CombinationSpec) that has no len()
+    combinations: Optional[Iterable[Tuple[str, ...]]] = None
+
+
+@dataclass
+class ScrapeTask:
+    """Resolved unit of work: one API call for one or more references"""
+
+    references: List[Tuple[str, Reference]]  # [('skills', Reference), ('regions', Reference)]
 
 
 class IRepository(ABC):
     """Repository interface (Repository pattern)"""
 
     @abstractmethod
-    def get_references(self, table_name: str, limit: int = 2000) -> List[Reference]:
-        """Get references from database"""
+    def get_references(self, table_name: str, limit: Optional[int] = None) -> List[Reference]:
+        """Get references from database (all of them unless ``limit`` is given)"""
         pass
 
     @abstractmethod
@@ -58,6 +73,62 @@ class IRepository(ABC):
         """Rollback transaction on error"""
         pass
 
+    def commit_chunk(self, transaction_id: str) -> int:
+        """Make the rows saved so far permanent while the transaction continues; returns their count
+
+        Repositories without chunked commits keep everything for commit_transaction (returns 0).
+        """
+        return 0
+
+    def iter_references(self, table_name: str) -> Iterator[Reference]:
+        """Stream references ordered by id (repositories that can avoid building a list override this)"""
+        return iter(self.get_references(table_name))
+
+    def resolve_references(self, table_name: str, values: Iterable[str]) -> Dict[str, Reference]:
+        """Resolve values by alias first, then by title (case-insensitive); keyed by lowercased value"""
+        wanted = {value.strip().lower() for value in values}
+        by_alias: Dict[str, Reference] = {}
+        by_title: Dict[str, Reference] = {}
+        for ref in self.get_references(table_name):
+            by_alias.setdefault(ref.alias.lower(), ref)
+            by_title.setdefault(ref.title.lower(), ref)
+        resolved = {value: by_alias.get(value) or by_title.get(value) for value in wanted}
+        return {value: ref for value, ref in resolved.items() if ref is not None}
+
+    def get_reference_version(self, table_name: str) -> Optional[Any]:
+        """Cheap fingerprint of a reference table that changes when its rows change (None if unsupported)"""
+        return None
+
+    def get_latest_totals(self, table_name: str) -> Dict[int, int]:
+        """Vacancy total of the latest single-reference report per reference id (empty if unknown)"""
+        return {}
+
+    def get_latest_combination_totals(self, table_names: Sequence[str]) -> Dict[Tuple[int, ...], int]:
+        """Vacancy total of the latest report of exactly these references, keyed by their ids (empty if unknown)"""
+        return {}
+
+
+class IAsyncRepository(ABC):
+    """Non-blocking counterpart of IRepository for the async engine (writes only)"""
+
+    @abstractmethod
+    async def save_report(self, data: SalaryData, transaction_id: str, timestamp: Optional[datetime] = None) -> bool:
+        """Stage report for the transaction"""
+        pass
+
+    @abstractmethod
+    async def commit_transaction(self, transaction_id: str) -> None:
+        """Commit all changes for transaction"""
+        pass
+
+    @abstractmethod
+    async def rollback_transaction(self, transaction_id: str) -> None:
+        """Rollback transaction on error"""
+        pass
+
+    async def close(self) -> None:
+        """Release connections"""
+
 
 class IApiClient(ABC):
     """API client interface"""
@@ -1,28 +1,275 @@
 """Database layer implementation using PostgreSQL with temporary table storage"""
 
 import logging
+import os
+import threading
+import time
 import psycopg2
 from psycopg2.extras import Json, execute_values
-from psycopg2.pool import SimpleConnectionPool
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import Callable, List, Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple, TypeVar
+from datetime import datetime, timedelta
 import json
+import uuid
 from contextlib import contextmanager
 from src.core import IRepository, Reference, SalaryData
+from src.db_pool import HealthCheckedPool, PoolStats, PreparedConnection
+
+# reports/staging column holding the reference id of each reference type
+REFERENCE_COLUMNS = {
+    'specializations': 'specialization_id',
+    'skills': 'skills_1',
+    'regions': 'region_id',
+    'companies': 'company_id',
+}
+
+
+# salary_facts columns and the SELECT exploding data->'groups' of report rows ({rows} needs
+# id, reference columns, payload_hash and fetched_at); salary_int() comes with 09_salary_facts.sql
+SALARY_FACTS_COLUMNS = (
+    "report_id, group_index, specialization_id, skills_1, region_id, company_id, level, title, "
+    "total, median, min_salary, max_salary, salary_value, salary_bonus, fetched_at"
+)
+SALARY_FACTS_SELECT = """
+    SELECT r.id, g.idx, r.specialization_id, r.skills_1, r.region_id, r.company_id,
+           g.item->>'name', g.item->>'title',
+           salary_int(g.item->'total'), salary_int(g.item->'median'),
+           salary_int(g.item->'min'), salary_int(g.item->'max'),
+           salary_int(g.item->'salary'->'value'), salary_int(g.item->'salary'->'bonus'),
+           r.fetched_at
+    FROM {rows} r
+    JOIN report_payloads p ON p.hash = r.payload_hash
+    CROSS JOIN LATERAL jsonb_array_elements(
+        CASE WHEN jsonb_typeof(p.data->'groups') = 'array' THEN p.data->'groups' ELSE '[]'::jsonb END
+    ) WITH ORDINALITY AS g(item, idx)
+"""
+
+# salary_facts of single-reference reports of completed runs unpivoted to (dimension, reference_id)
+# for rollups; {since} filters on fetched_at
+_ROLLUP_FACTS = """
+    SELECT d.dimension, d.reference_id, f.level, p.period,
+           date_trunc(p.period, f.fetched_at)::date AS period_start, f.total, f.median, f.min_salary, f.max_salary
+    FROM completed_salary_facts f
+    CROSS JOIN LATERAL (
+        VALUES ('specializations', f.specialization_id), ('skills', f.skills_1),
+               ('regions', f.region_id), ('companies', f.company_id)
+    ) AS d(dimension, reference_id)
+    CROSS JOIN (VALUES ('day'), ('week')) AS p(period)
+    WHERE d.reference_id IS NOT NULL
+      AND f.level IS NOT NULL
+      AND num_nonnulls(f.specialization_id, f.skills_1, f.region_id, f.company_id) = 1
+      AND f.fetched_at > {since}
+"""
+
+
+# Server-side prepared statements for the hot paths; turn off behind poolers in transaction
+# mode (pgbouncer, Supabase on port 6543), which do not keep them between transactions
+PREPARE_STATEMENTS = os.environ.get("DATABASE_PREPARED_STATEMENTS", "true").lower() == "true"
+
+# New connections are retried CONNECT_RETRIES times (RETRY_DELAY seconds backoff); after a pool
+# could not be opened, calls fail fast for POOL_RETRY_AFTER seconds instead of reconnecting each time
+CONNECT_RETRIES = int(os.environ.get("DATABASE_CONNECT_RETRIES", "2"))
+RETRY_DELAY = float(os.environ.get("DATABASE_RETRY_DELAY", "0.5"))
+POOL_RETRY_AFTER = float(os.environ.get("DATABASE_POOL_RETRY_AFTER", "5"))
+
+T = TypeVar("T")
+
+
+def execute_prepared(cursor, name: str, query: str, params: Sequence[Any] = ()) -> None:
+    """Run ``query`` (``%s`` placeholders) as server-side prepared statement ``name``.
+
+    The statement is PREPAREd on first use per connection and EXECUTEd afterwards, so the
+    server parses and plans it once. Connections that do not track prepared statements
+    (no PreparedConnection) get a plain execute.
+    """
+    prepared = getattr(cursor.connection, "prepared", None)
+    if not isinstance(prepared, set):
+        cursor.execute(query, params)
+        return
+
+    if name not in prepared:
+        cursor.execute(f"PREPARE {name} AS {numbered_placeholders(query)}")
+        prepared.add(name)
+    if params:
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cursor.execute(f"EXECUTE {name}")
+
+
+def numbered_placeholders(query: str) -> str:
+    """``query`` with ``%s`` placeholders as ``$1, $2, ...`` (PREPARE, asyncpg) and ``%%`` unescaped"""
+    parts = query.split("%s")
+    numbered = "".join(f"{part}${i}" for i, part in enumerate(parts[:-1], start=1)) + parts[-1]
+    return numbered.replace('%%', '%')
+
+
+def deallocate_prepared(cursor, prefix: str) -> None:
+    """Drop the connection's prepared statements whose name starts with ``prefix``"""
+    prepared = getattr(cursor.connection, "prepared", None)
+    if not isinstance(prepared, set):
+        return
+    for name in sorted(n for n in prepared if n.startswith(prefix)):
+        cursor.execute(f"DEALLOCATE {name}")
+        prepared.discard(name)
+
+
+def insert_reports(cursor, source: str, params: tuple = (), prepared_as: Optional[str] = None) -> None:
+    """Copy staged rows into report_rows and salary_facts, storing each distinct payload once.
+
+    ``source`` is a FROM clause with specialization_id, skills_1, region_id, company_id, data
+    and fetched_at columns. Payloads are keyed by md5 of their canonical jsonb text, so
+    unchanged responses from earlier runs are not written again. Rows already stored under
+    their natural key (references and run timestamp, 14_report_natural_key.sql) are skipped, so
+    a commit of the same run can be retried or replayed safely. The inserted rows are exploded
+    into salary_facts in the same statement. With ``prepared_as`` (only for a ``source`` that
+    does not change between calls) the statements are prepared under that prefix.
+    """
+    # Monthly partitions of report_rows/salary_facts (no-op unless a new month is due)
+    cursor.execute("SELECT ensure_report_partitions()")
+    for i, statement in enumerate(report_insert_statements(source)):
+        if prepared_as:
+            execute_prepared(cursor, f"{prepared_as}_{i}", statement, params)
+        else:
+            cursor.execute(statement, params)
+
+
+def report_insert_statements(source: str) -> List[str]:
+    """Statements of insert_reports after the partition check: payloads, then rows with their facts"""
+    facts = SALARY_FACTS_SELECT.format(rows="inserted")
+    return [
+        f"""
+        INSERT INTO report_payloads (hash, data)
+        SELECT DISTINCT md5(data::text)::uuid, data
+        FROM {source}
+        ON CONFLICT (hash) DO NOTHING
+    """,
+        f"""
+        WITH inserted AS (
+            INSERT INTO report_rows (specialization_id, skills_1, region_id, company_id, payload_hash, fetched_at, run_id)
+            SELECT specialization_id, skills_1, region_id, company_id, md5(data::text)::uuid, fetched_at,
+                   NULLIF(current_setting('scraper.run_id', true), '')::int
+            FROM {source}
+            -- Replayed rows (same references and run timestamp) are skipped, and so are their facts
+            ON CONFLICT (fetched_at, COALESCE(specialization_id, 0), COALESCE(skills_1, 0), COALESCE(region_id, 0),
+                         COALESCE(company_id, 0)) DO NOTHING
+            RETURNING id, specialization_id, skills_1, region_id, company_id, payload_hash, fetched_at
+        )
+        INSERT INTO salary_facts ({SALARY_FACTS_COLUMNS})
+        {facts}
+    """,
+    ]
+
+
+# Records one more committed chunk of a transaction's scrape run (13_report_runs.sql) and makes the
+# run's id the run_id of report rows inserted later in the same database transaction
+RUN_PROGRESS = """
+    WITH run AS (
+        INSERT INTO report_runs AS r (transaction_id, status, chunks, rows_committed, finished_at)
+        VALUES (%s, %s, %s, %s, CASE WHEN %s = 'complete' THEN NOW() END)
+        ON CONFLICT (transaction_id) DO UPDATE SET
+            status = EXCLUDED.status,
+            chunks = r.chunks + EXCLUDED.chunks,
+            rows_committed = r.rows_committed + EXCLUDED.rows_committed,
+            finished_at = EXCLUDED.finished_at
+        RETURNING id
+    )
+    SELECT set_config('scraper.run_id', id::text, true) FROM run
+"""
+
+# Runs rolled back after some chunks were committed keep those rows but never become complete
+RUN_FAILED = "UPDATE report_runs SET status = 'failed', finished_at = NOW() WHERE transaction_id = %s"
+
+
+def run_progress_params(transaction_id: str, rows: int, complete: bool) -> tuple:
+    """Parameters of RUN_PROGRESS for a chunk of ``rows`` rows (the final one when ``complete``)"""
+    status = 'complete' if complete else 'running'
+    return (transaction_id, status, 1 if rows else 0, rows, status)
 
 
 class PostgresRepository(IRepository):
-    """PostgreSQL implementation of repository with temporary table storage"""
-
-    def __init__(self, config: Dict[str, Any]):
+    """PostgreSQL implementation of repository with temporary table storage
+
+    Thread-safe: connections come from a HealthCheckedPool, and each transaction's
+    temporary table lives on one pinned connection (temp tables are per-session), so
+    concurrent save_report calls from worker threads all land in the same staging table.
+
+    With ``shared_staging=True`` rows are staged in the persistent ``report_staging`` table
+    keyed by transaction_id instead, so several processes (or hosts) can write into one
+    transaction that a single parent commits.
+
+    Hot statements (staging inserts, reference lookups, the shared-staging commit) are
+    server-side prepared once per pooled connection unless ``prepare_statements`` is False.
+
+    With ``chunk_rows`` the staged rows are moved to the permanent tables every ``chunk_rows``
+    rows (commit_chunk) instead of all at once, tagged with the transaction's scrape run;
+    commit_transaction moves the rest and marks the run complete.
+
+    Reference reads and shared-staging saves that lose their connection mid-statement are
+    retried once on a new connection. Temp-table staging cannot be: the staged rows live
+    on the lost session, so the save fails and the run has to be retried.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        shared_staging: bool = False,
+        prepare_statements: bool = PREPARE_STATEMENTS,
+        chunk_rows: Optional[int] = None,
+        connect_retries: int = CONNECT_RETRIES,
+        retry_delay: float = RETRY_DELAY,
+        pool_retry_after: float = POOL_RETRY_AFTER,
+    ):
         self.config = config
-        self._pool: Optional[SimpleConnectionPool] = None
+        self.shared_staging = shared_staging
+        self.prepare_statements = prepare_statements
+        self.chunk_rows = chunk_rows
+        self.connect_retries = connect_retries
+        self.retry_delay = retry_delay
+        self.pool_retry_after = pool_retry_after
+        self._pool: Optional[HealthCheckedPool] = None
+        self._pool_lock = threading.Lock()
+        # Last failed pool init (monotonic time, error): calls fail fast until pool_retry_after passed
+        self._pool_failure: Optional[Tuple[float, Exception]] = None
+        # transaction_id -> connection holding its temp table
+        self._staging_conns: Dict[str, Any] = {}
+        self._staging_lock = threading.RLock()
+        # transaction_id -> rows staged (by this process) since the last chunk
+        self._staged_rows: Dict[str, int] = {}
 
     # ---------- Pool helpers ----------
 
     def _init_pool(self):
-        if self._pool is None:
-            self._pool = SimpleConnectionPool(minconn=1, maxconn=10, **self.config)
+        with self._pool_lock:
+            if self._pool is not None:
+                return
+            if self._pool_failure is not None:
+                failed_at, error = self._pool_failure
+                if time.monotonic() - failed_at < self.pool_retry_after:
+                    raise psycopg2.OperationalError(f"Database unavailable (pool could not be opened: {error})")
+            try:
+                self._pool = self._open_pool()
+            except Exception as e:
+                self._pool_failure = (time.monotonic(), e)
+                raise
+            self._pool_failure = None
+
+    def _open_pool(self):
+        options = {"connection_factory": PreparedConnection} if self.prepare_statements else {}
+        return HealthCheckedPool(
+            minconn=1,
+            maxconn=10,
+            connect_retries=self.connect_retries,
+            retry_delay=self.retry_delay,
+            **options,
+            **self.config,
+        )
+
+    def warmup(self) -> None:
+        """Open the pool (and its minconn connections) now instead of on the first query"""
+        self._init_pool()
+
+    def pool_stats(self) -> Optional[PoolStats]:
+        """Pool utilization and wait-time counters (None before the pool is opened)"""
+        return self._pool.stats() if self._pool is not None else None
 
     @contextmanager
     def get_connection(self):
@@ -35,6 +282,20 @@ class PostgresRepository(IRepository):
         finally:
             self._pool.putconn(conn)
 
+    def _with_connection_retry(self, operation: Callable[[Any], T]) -> T:
+        """Run ``operation(conn)`` on a pooled connection, once more on a new one if the connection was lost"""
+        for attempt in range(2):
+            conn = None
+            try:
+                with self.get_connection() as conn:
+                    return operation(conn)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                # Only broken connections are retried (not statement errors or a failed checkout)
+                if attempt or conn is None or not conn.closed:
+                    raise
+                logging.warning(f"Database connection lost ({e}), retrying on a new connection")
+        raise AssertionError("unreachable")
+
     def _create_temp_table(self, transaction_id: str, conn) -> None:
         """Create temporary table for transaction"""
         table_name = f"temp_scraping_{transaction_id.replace('-', '_')}"
@@ -60,120 +321,526 @@ class PostgresRepository(IRepository):
         """Get temporary table name for transaction"""
         return f"temp_scraping_{transaction_id.replace('-', '_')}"
 
-    def get_references(self, table_name: str, limit: int = 2000) -> List[Reference]:
-        """Get references from database"""
-        valid_tables = ["specializations", "skills", "regions", "companies"]
-        if table_name not in valid_tables:
-            raise ValueError(f"Invalid table: {table_name}. Must be one of {valid_tables}")
+    def _staging_connection(self, transaction_id: str, create: bool = True):
+        """Connection pinned to the transaction (creates temp table on first use).
 
-        with self.get_connection() as conn:
+        Must be called with _staging_lock held; returns None if no staging exists and create is False.
+        """
+        conn = self._staging_conns.get(transaction_id)
+        if conn is None and create:
+            self._init_pool()
+            assert self._pool is not None
+            conn = self._pool.getconn()
+            try:
+                self._create_temp_table(transaction_id, conn)
+                conn.commit()
+            except Exception:
+                self._pool.putconn(conn, close=True)
+                raise
+            self._staging_conns[transaction_id] = conn
+        return conn
+
+    def _release_staging_connection(self, transaction_id: str) -> None:
+        """Return pinned connection to the pool (must be called with _staging_lock held)"""
+        conn = self._staging_conns.pop(transaction_id, None)
+        if conn is not None and self._pool is not None:
+            self._pool.putconn(conn)
+
+    @contextmanager
+    def _staging(self, transaction_id: str, create: bool = True):
+        """Connection that sees the transaction's staged rows (None if nothing was staged)"""
+        if self.shared_staging:
+            with self.get_connection() as conn:
+                yield conn
+            return
+
+        with self._staging_lock:
+            yield self._staging_connection(transaction_id, create)
+
+    def _staging_source(self, transaction_id: str) -> Tuple[str, tuple]:
+        """FROM clause and parameters selecting the transaction's staged rows"""
+        if self.shared_staging:
+            return "report_staging WHERE transaction_id = %s", (transaction_id,)
+        return self._get_temp_table_name(transaction_id), ()
+
+    def _drop_staging(self, cursor, transaction_id: str) -> None:
+        """Remove the transaction's staged rows"""
+        if self.shared_staging:
+            cursor.execute("DELETE FROM report_staging WHERE transaction_id = %s", (transaction_id,))
+        else:
+            deallocate_prepared(cursor, f"{self._get_temp_table_name(transaction_id)}_")
+            cursor.execute(f"DROP TABLE IF EXISTS {self._get_temp_table_name(transaction_id)}")
+
+    def get_references(self, table_name: str, limit: Optional[int] = None) -> List[Reference]:
+        """Get references from database (all of them unless ``limit`` is given)"""
+        if table_name not in REFERENCE_COLUMNS:
+            raise ValueError(f"Invalid table: {table_name}. Must be one of {list(REFERENCE_COLUMNS)}")
+
+        def fetch(conn):
             cursor = conn.cursor()
+            # LIMIT NULL means no limit
             query = f"""
                     SELECT id, title, alias
                     FROM {table_name}
                     ORDER BY id
                     LIMIT %s
                     """
-            cursor.execute(query, (limit,))
+            execute_prepared(cursor, f"references_{table_name}", query, (limit,))
             rows = cursor.fetchall()
             cursor.close()
+            return rows
+
+        rows = self._with_connection_retry(fetch)
 
         return [Reference(id=row[0], title=row[1], alias=row[2]) for row in rows]
 
-    def save_report(self, data: SalaryData, transaction_id: str, timestamp: Optional[datetime] = None) -> bool:
-        """Save report to temporary table"""
-        try:
-            with self.get_connection() as conn:
-                table_name = self._get_temp_table_name(transaction_id)
-                cursor = conn.cursor()
+    def iter_references(self, table_name: str, itersize: int = 1000) -> Iterator[Reference]:
+        """Stream all references ordered by id through a named (server-side) cursor.
 
-                # Check if temp table exists, create if not
-                try:
-                    cursor.execute(f"SELECT 1 FROM {table_name} LIMIT 1")
-                    # Table exists
-                except psycopg2.Error:
-                    # Table doesn't exist, create it
-                    cursor.close()
-                    self._create_temp_table(transaction_id, conn)
-                    cursor = conn.cursor()
-
-                # Determine field mapping
-                field_mapping = {
-                    'specializations': 'specialization_id',
-                    'skills': 'skills_1',
-                    'regions': 'region_id',
-                    'companies': 'company_id',
-                }
-
-                field_name = field_mapping.get(data.reference_type)
-                if not field_name:
-                    cursor.close()
-                    return False
+        Rows are fetched ``itersize`` at a time, so memory stays constant however large the
+        table is. A pooled connection is held until the iterator is exhausted or closed.
+        """
+        if table_name not in REFERENCE_COLUMNS:
+            raise ValueError(f"Invalid table: {table_name}. Must be one of {list(REFERENCE_COLUMNS)}")
+        return self._stream_references(table_name, itersize)
+
+    def _stream_references(self, table_name: str, itersize: int) -> Iterator[Reference]:
+        with self.get_connection() as conn:
+            cursor = conn.cursor(name=f"references_{uuid.uuid4().hex}")
+            cursor.itersize = itersize
+            try:
+                cursor.execute(f"SELECT id, title, alias FROM {table_name} ORDER BY id")
+                for row in cursor:
+                    yield Reference(id=row[0], title=row[1], alias=row[2])
+            finally:
+                cursor.close()
+                # End the read transaction before the connection goes back to the pool
+                conn.rollback()
+
+    def resolve_references(self, table_name: str, values: Iterable[str]) -> Dict[str, Reference]:
+        """Resolve values in one query (uses the lower(alias)/lower(title) indexes); keyed by lowercased value"""
+        if table_name not in REFERENCE_COLUMNS:
+            raise ValueError(f"Invalid table: {table_name}. Must be one of {list(REFERENCE_COLUMNS)}")
+        wanted = sorted({value.strip().lower() for value in values})
+        if not wanted:
+            return {}
+
+        def fetch(conn):
+            cursor = conn.cursor()
+            execute_prepared(
+                cursor,
+                f"resolve_{table_name}",
+                f"""
+                SELECT id, title, alias
+                FROM {table_name}
+                WHERE lower(alias) = ANY(%s) OR lower(title) = ANY(%s)
+                ORDER BY id
+            """,
+                (wanted, wanted),
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+            return rows
+
+        rows = self._with_connection_retry(fetch)
+
+        by_alias: Dict[str, Reference] = {}
+        by_title: Dict[str, Reference] = {}
+        for row in rows:
+            ref = Reference(id=row[0], title=row[1], alias=row[2])
+            by_alias.setdefault(ref.alias.lower(), ref)
+            by_title.setdefault(ref.title.lower(), ref)
+        resolved = {value: by_alias.get(value) or by_title.get(value) for value in wanted}
+        return {value: ref for value, ref in resolved.items() if ref is not None}
+
+    def get_reference_version(self, table_name: str) -> Optional[Any]:
+        """Row count and checksum of a reference table (computed server-side, no rows transferred)"""
+        if table_name not in REFERENCE_COLUMNS:
+            raise ValueError(f"Invalid table: {table_name}. Must be one of {list(REFERENCE_COLUMNS)}")
+
+        def fetch(conn):
+            cursor = conn.cursor()
+            execute_prepared(
+                cursor,
+                f"reference_version_{table_name}",
+                f"SELECT COUNT(*), md5(string_agg(id || ':' || alias || ':' || title, ',' ORDER BY id)) FROM {table_name}",
+            )
+            version = cursor.fetchone()
+            cursor.close()
+            return version
+
+        return tuple(self._with_connection_retry(fetch))
+
+    def get_latest_totals(self, table_name: str) -> Dict[int, int]:
+        """Vacancy total of the latest single-reference report per reference id"""
+        return {key[0]: total for key, total in self.get_latest_combination_totals([table_name]).items()}
+
+    def get_latest_combination_totals(self, table_names: Sequence[str]) -> Dict[Tuple[int, ...], int]:
+        """Vacancy total of the latest report of exactly these references, keyed by their ids in order.
+
+        The total is the largest groups[].total in salary_facts, so archived payloads count and
+        malformed totals are NULL (no total) instead of an error. Reports of running and failed
+        runs are skipped.
+        """
+        columns = []
+        for table_name in table_names:
+            column = REFERENCE_COLUMNS.get(table_name)
+            if not column:
+                raise ValueError(f"Invalid table: {table_name}. Must be one of {list(REFERENCE_COLUMNS)}")
+            columns.append(column)
+        key = ", ".join(f"r.{column}" for column in columns)
+        conditions = " AND ".join(
+            f"r.{column} IS {'NOT NULL' if column in columns else 'NULL'}" for column in REFERENCE_COLUMNS.values()
+        )
+
+        def fetch(conn):
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT DISTINCT ON ({key}) {key},
+                       (SELECT MAX(f.total) FROM salary_facts f WHERE f.report_id = r.id AND f.fetched_at = r.fetched_at)
+                FROM report_rows r
+                LEFT JOIN report_runs s ON s.id = r.run_id
+                WHERE {conditions} AND (r.run_id IS NULL OR s.status = 'complete')
+                ORDER BY {key}, r.fetched_at DESC, r.id DESC
+            """
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+            return rows
+
+        rows = self._with_connection_retry(fetch)
+        return {tuple(row[:-1]): row[-1] for row in rows if row[-1] is not None}
+
+    def backfill_salary_facts(self, batch_size: int = 10000) -> int:
+        """Explode historical report rows into salary_facts, one committed id range at a time.
+
+        Safe to re-run: rows that already have facts are skipped. Returns inserted fact count.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT MIN(id), MAX(id) FROM report_rows")
+                first_id, last_id = cursor.fetchone()
+                conn.commit()
+                if first_id is None:
+                    return 0
+
+                facts = SALARY_FACTS_SELECT.format(rows="report_rows")
+                inserted = 0
+                for start in range(first_id - 1, last_id, batch_size):
+                    cursor.execute(
+                        f"""
+                        INSERT INTO salary_facts ({SALARY_FACTS_COLUMNS})
+                        {facts}
+                        WHERE r.id > %s AND r.id <= %s
+                        ON CONFLICT DO NOTHING
+                    """,
+                        (start, start + batch_size),
+                    )
+                    inserted += cursor.rowcount
+                    conn.commit()
+                    logging.info(f"Backfilled salary facts up to report id {min(start + batch_size, last_id)}")
+                return inserted
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def ensure_partitions(self, months_ahead: int = 2) -> int:
+        """Create missing monthly partitions up to ``months_ahead`` months from now; returns how many"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT ensure_report_partitions(%s)", (months_ahead,))
+                created = cursor.fetchone()[0]
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        if created:
+            logging.info(f"Created {created} report partitions")
+        return created
+
+    def refresh_salary_rollups(self, lookback: timedelta = timedelta(days=1)) -> Optional[datetime]:
+        """Recompute salary_rollups for periods touched since the watermark; returns the new watermark.
+
+        Facts up to ``lookback`` before the watermark are re-read as well, so runs that commit
+        after a newer run (their fetched_at is the run start) are not missed. Only completed runs
+        are aggregated, and the watermark stops at the start of the oldest run still running so
+        its rows are picked up once it completes. Affected periods are recomputed from
+        salary_facts, so re-running is harmless.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                # Row lock serializes concurrent refreshes
+                cursor.execute("SELECT fetched_at FROM rollup_watermarks WHERE name = 'salary_rollups' FOR UPDATE")
+                watermark = cursor.fetchone()[0]
+                cursor.execute(
+                    """
+                    SELECT LEAST(
+                        (SELECT MAX(fetched_at) FROM salary_facts),
+                        (SELECT MIN(r.fetched_at) FROM report_rows r
+                         JOIN report_runs s ON s.id = r.run_id WHERE s.status = 'running')
+                    )
+                """
+                )
+                high = cursor.fetchone()[0]
+                if high is None:
+                    conn.commit()
+                    return watermark
+                # '-infinity' (nothing aggregated yet) is read as datetime.min
+                since = watermark - lookback if watermark - datetime.min > lookback else datetime.min
+                week = timedelta(days=7)
+                period_floor = since - week if since - datetime.min > week else datetime.min
 
-                # Insert into temporary table
                 cursor.execute(
                     f"""
-                    INSERT INTO {table_name} ({field_name}, data, fetched_at)
-                    VALUES (%s, %s, %s)
+                    CREATE TEMPORARY TABLE affected_rollups ON COMMIT DROP AS
+                    SELECT DISTINCT dimension, reference_id, level, period, period_start
+                    FROM ({_ROLLUP_FACTS.format(since="%s")}) facts
+                """,
+                    (since,),
+                )
+                cursor.execute(
+                    f"""
+                    INSERT INTO salary_rollups (dimension, reference_id, level, period, period_start,
+                                                reports, total, median, min_salary, max_salary, updated_at)
+                    SELECT dimension, reference_id, level, period, period_start,
+                           COUNT(*), ROUND(AVG(total))::int,
+                           ROUND(percentile_cont(0.5) WITHIN GROUP (ORDER BY median))::int,
+                           MIN(min_salary), MAX(max_salary), NOW()
+                    FROM ({_ROLLUP_FACTS.format(since="%s")}) facts
+                    JOIN affected_rollups USING (dimension, reference_id, level, period, period_start)
+                    GROUP BY dimension, reference_id, level, period, period_start
+                    ON CONFLICT (dimension, reference_id, level, period, period_start) DO UPDATE SET
+                        reports = EXCLUDED.reports,
+                        total = EXCLUDED.total,
+                        median = EXCLUDED.median,
+                        min_salary = EXCLUDED.min_salary,
+                        max_salary = EXCLUDED.max_salary,
+                        updated_at = EXCLUDED.updated_at
                 """,
-                    (data.reference_id, Json(data.data), timestamp or datetime.now()),
+                    # Whole periods are re-aggregated, starting at the week containing `since`
+                    (period_floor,),
                 )
+                rollups = cursor.rowcount
+                cursor.execute(
+                    """
+                    UPDATE salary_rollups r
+                    SET moscow_median = m.median,
+                        moscow_delta_pct = CASE WHEN m.median > 0
+                            THEN ROUND((r.median - m.median) * 100.0 / m.median, 1) END
+                    FROM salary_rollups m
+                    JOIN regions mr ON mr.id = m.reference_id AND mr.title = 'Москва'
+                    WHERE r.dimension = 'regions' AND m.dimension = 'regions'
+                      AND m.level = r.level AND m.period = r.period AND m.period_start = r.period_start
+                      AND (r.level, r.period, r.period_start) IN (
+                          SELECT level, period, period_start FROM affected_rollups WHERE dimension = 'regions'
+                      )
+                """
+                )
+                cursor.execute(
+                    """
+                    UPDATE rollup_watermarks SET fetched_at = GREATEST(fetched_at, %s), updated_at = NOW()
+                    WHERE name = 'salary_rollups'
+                """,
+                    (high,),
+                )
+                conn.commit()
+                logging.info(f"Refreshed {rollups} salary rollups, watermark {max(watermark, high)}")
+                return max(watermark, high)
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
 
+    def save_report(self, data: SalaryData, transaction_id: str, timestamp: Optional[datetime] = None) -> bool:
+        """Save report to temporary table (one row with every reference of a combination)"""
+        reference_ids = data.reference_ids
+        if not reference_ids or any(ref_type not in REFERENCE_COLUMNS for ref_type in reference_ids):
+            return False
+        columns = [column for ref_type, column in REFERENCE_COLUMNS.items() if ref_type in reference_ids]
+        values = [reference_ids[ref_type] for ref_type in REFERENCE_COLUMNS if ref_type in reference_ids]
+        field_names = ", ".join(columns)
+        placeholders = ", ".join(["%s"] * len(columns))
+        # One prepared statement per column combination
+        column_mask = sum(1 << i for i, ref_type in enumerate(REFERENCE_COLUMNS) if ref_type in reference_ids)
+
+        def stage(conn) -> None:
+            cursor = conn.cursor()
+            try:
+                if self.shared_staging:
+                    execute_prepared(
+                        cursor,
+                        f"stage_shared_{column_mask}",
+                        f"""
+                        INSERT INTO report_staging (transaction_id, {field_names}, data, fetched_at)
+                        VALUES (%s, {placeholders}, %s, %s)
+                    """,
+                        (transaction_id, *values, Json(data.data), timestamp or datetime.now()),
+                    )
+                else:
+                    # Insert into temporary table (statement is deallocated with the table)
+                    temp_table = self._get_temp_table_name(transaction_id)
+                    execute_prepared(
+                        cursor,
+                        f"{temp_table}_{column_mask}",
+                        f"""
+                        INSERT INTO {temp_table} ({field_names}, data, fetched_at)
+                        VALUES ({placeholders}, %s, %s)
+                    """,
+                        (*values, Json(data.data), timestamp or datetime.now()),
+                    )
                 conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
                 cursor.close()
-                return True
+
+        try:
+            if self.shared_staging:
+                # A staged row is committed on its own, so it can be written again on a new connection
+                self._with_connection_retry(stage)
+            else:
+                with self._staging(transaction_id) as conn:
+                    stage(conn)
 
         except Exception as e:
-            logging.error(f"Error saving report to temp table: {e}")
+            logging.error(f"Error saving report to staging: {e}")
             return False
 
-    def commit_transaction(self, transaction_id: str) -> None:
-        """Move data from temporary table to permanent reports table"""
+        self._track_staged(transaction_id, 1)
+        return True
+
+    def _track_staged(self, transaction_id: str, rows: int) -> None:
+        """Count newly staged rows and commit a chunk once ``chunk_rows`` are waiting"""
+        with self._staging_lock:
+            staged = self._staged_rows[transaction_id] = self._staged_rows.get(transaction_id, 0) + rows
+        if not self.chunk_rows or staged < self.chunk_rows:
+            return
         try:
-            with self.get_connection() as conn:
-                table_name = self._get_temp_table_name(transaction_id)
-                cursor = conn.cursor()
+            self.commit_chunk(transaction_id)
+        except Exception as e:
+            # Rows stay staged; the next save retries, the final commit moves them at the latest
+            logging.error(f"Error committing chunk of transaction {transaction_id}: {e}")
 
-                # Check if temp table exists
-                try:
-                    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                    count = cursor.fetchone()[0]
-                except psycopg2.Error:
-                    logging.warning(f"No temporary table found for transaction {transaction_id}")
-                    cursor.close()
-                    return
+    def _log_import(self, cursor, count: int) -> None:
+        cursor.execute(
+            """
+            INSERT INTO report_log (report_date, report_type, total_variants, success_count, duration_seconds, status)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """,
+            (datetime.now(), 'batch_import', count, count, 0, 'success'),
+        )
 
-                cursor.execute("BEGIN")
+    def commit_chunk(self, transaction_id: str) -> int:
+        """Move the rows staged so far to the permanent tables as one chunk of the scrape run.
 
-                try:
-                    if count == 0:
-                        logging.info("No data to commit")
-                        cursor.close()
-                        return
+        The transaction stays open for more rows and its run stays 'running' until
+        commit_transaction. Returns the number of rows moved.
+        """
+        with self._staging(transaction_id, create=False) as conn:
+            if conn is None:
+                return 0
 
-                    # Move data from temp table to reports table
+            cursor = conn.cursor()
+            try:
+                if self.shared_staging:
+                    # Claim the rows with DELETE ... RETURNING: rows other processes stage meanwhile
+                    # are left for the next chunk instead of being deleted unseen
                     cursor.execute(
-                        f"""
-                        INSERT INTO reports (specialization_id, skills_1, region_id, company_id, data, fetched_at)
+                        """
+                        CREATE TEMPORARY TABLE report_chunk ON COMMIT DROP AS
                         SELECT specialization_id, skills_1, region_id, company_id, data, fetched_at
-                        FROM {table_name}
+                        FROM report_staging WITH NO DATA
                     """
                     )
-
-                    # Log the operation
                     cursor.execute(
                         """
-                        INSERT INTO report_log (report_date, report_type, total_variants, success_count, duration_seconds, status)
-                        VALUES (%s, %s, %s, %s, %s, %s)
+                        WITH moved AS (
+                            DELETE FROM report_staging WHERE transaction_id = %s
+                            RETURNING specialization_id, skills_1, region_id, company_id, data, fetched_at
+                        )
+                        INSERT INTO report_chunk SELECT * FROM moved
                     """,
-                        (datetime.now(), 'batch_import', count, count, 0, 'success'),
+                        (transaction_id,),
                     )
+                    source, count = "report_chunk", cursor.rowcount
+                else:
+                    source = self._get_temp_table_name(transaction_id)
+                    cursor.execute(f"SELECT COUNT(*) FROM {source}")
+                    count = cursor.fetchone()[0]
 
-                    # Drop temporary table
-                    cursor.execute(f"DROP TABLE {table_name}")
+                if count:
+                    cursor.execute(RUN_PROGRESS, run_progress_params(transaction_id, count, complete=False))
+                    insert_reports(cursor, source)
+                    self._log_import(cursor, count)
+                    if not self.shared_staging:
+                        # TRUNCATE instead of DELETE: temp tables are never autovacuumed
+                        cursor.execute(f"TRUNCATE {source}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        with self._staging_lock:
+            self._staged_rows[transaction_id] = 0
+        if count:
+            logging.info(f"Committed chunk of {count} reports for transaction {transaction_id}")
+        return count
 
+    def finish_transaction(self, cursor, transaction_id: str) -> int:
+        """Move the rows still staged and mark the run complete, without committing.
+
+        Runs in the database transaction of ``cursor``, so callers can change their own state
+        in the same commit (see PostgresTaskQueue.try_finalize). ``cursor`` must see the
+        staged rows: any connection with shared staging, the pinned one otherwise.
+        Returns the number of rows moved.
+        """
+        source, params = self._staging_source(transaction_id)
+        cursor.execute(f"SELECT COUNT(*) FROM {source}", params)
+        count = cursor.fetchone()[0]
+
+        # Final chunk: the run becomes complete (also when earlier chunks moved everything)
+        cursor.execute(RUN_PROGRESS, run_progress_params(transaction_id, count, complete=True))
+
+        if count:
+            # Move data from staging to reports table
+            insert_reports(cursor, source, params, prepared_as="commit_shared" if self.shared_staging else None)
+            self._log_import(cursor, count)
+
+        # Drop staged rows
+        self._drop_staging(cursor, transaction_id)
+        with self._staging_lock:
+            self._staged_rows.pop(transaction_id, None)
+        return count
+
+    def commit_transaction(self, transaction_id: str) -> None:
+        """Move data from staging to permanent reports table"""
+        with self._staging(transaction_id, create=False) as conn:
+            if conn is None:
+                logging.warning(f"No temporary table found for transaction {transaction_id}")
+                return
+
+            try:
+                cursor = conn.cursor()
+
+                try:
+                    count = self.finish_transaction(cursor, transaction_id)
                     conn.commit()
-                    logging.info(f"Successfully committed {count} reports from temporary storage")
+                    if count:
+                        logging.info(f"Successfully committed {count} reports from temporary storage")
+                    else:
+                        logging.info("No data to commit")
 
                 except Exception as e:
                     conn.rollback()
@@ -182,44 +849,51 @@ class PostgresRepository(IRepository):
                 finally:
                     cursor.close()
 
-        except Exception as e:
-            logging.error(f"Critical error during commit: {e}")
-            raise
+            except Exception as e:
+                logging.error(f"Critical error during commit: {e}")
+                raise
+            finally:
+                with self._staging_lock:
+                    self._staged_rows.pop(transaction_id, None)
+                if not self.shared_staging:
+                    self._release_staging_connection(transaction_id)
 
     def rollback_transaction(self, transaction_id: str) -> None:
-        """Drop temporary table to rollback transaction"""
-        try:
-            with self.get_connection() as conn:
-                table_name = self._get_temp_table_name(transaction_id)
+        """Drop staged rows to rollback transaction"""
+        with self._staging(transaction_id, create=False) as conn:
+            if conn is None:
+                logging.warning(f"No temp table to rollback for transaction {transaction_id}")
+                return
+
+            try:
+                conn.rollback()
                 cursor = conn.cursor()
-
-                # Check if temp table exists and drop it
-                try:
-                    cursor.execute(f"DROP TABLE {table_name}")
-                    conn.commit()
-                    logging.info(f"Rolled back transaction {transaction_id} (dropped temp table)")
-                except psycopg2.Error:
-                    logging.warning(f"No temp table to rollback for transaction {transaction_id}")
-
+                self._drop_staging(cursor, transaction_id)
+                # Chunks committed earlier stay, but the run never becomes complete
+                cursor.execute(RUN_FAILED, (transaction_id,))
+                conn.commit()
                 cursor.close()
-
-        except Exception as e:
-            logging.error(f"Error during rollback: {e}")
+                logging.info(f"Rolled back transaction {transaction_id} (dropped staged rows)")
+            except Exception as e:
+                logging.error(f"Error during rollback: {e}")
+            finally:
+                with self._staging_lock:
+                    self._staged_rows.pop(transaction_id, None)
+                if not self.shared_staging:
+                    self._release_staging_connection(transaction_id)
 
     def transaction_exists(self, transaction_id: str) -> bool:
-        """Check if transaction exists (temp table exists)"""
+        """Check if transaction exists (has staging)"""
+        if not self.shared_staging:
+            with self._staging_lock:
+                return transaction_id in self._staging_conns
+
         try:
             with self.get_connection() as conn:
-                table_name = self._get_temp_table_name(transaction_id)
                 cursor = conn.cursor()
-
-                try:
-                    cursor.execute(f"SELECT 1 FROM {table_name} LIMIT 1")
-                    cursor.close()
-                    return True
-                except psycopg2.Error:
-                    cursor.close()
-                    return False
-
+                cursor.execute("SELECT 1 FROM report_staging WHERE transaction_id = %s LIMIT 1", (transaction_id,))
+                exists = cursor.fetchone() is not None
+                cursor.close()
+                return exists
         except Exception:
             return False
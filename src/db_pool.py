@@ -0,0 +1,275 @@
+"""
+Thread-safe psycopg2 connection pool with warmup, checkout health checks and age-based recycling
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+
+class PreparedConnection(extensions.connection):
+    """psycopg2 connection that remembers which server-side prepared statements it holds.
+
+    Pass as ``connection_factory``; database.execute_prepared PREPAREs each statement once
+    per connection. A replaced (recycled or reconnected) connection starts with an empty set.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: Set[str] = set()
+
+
+@dataclass
+class PoolStats:
+    """Utilization and wait-time counters of a HealthCheckedPool"""
+
+    maxconn: int
+    size: int = 0  # Open connections (idle + in use)
+    in_use: int = 0
+    checkouts: int = 0
+    waits: int = 0  # Checkouts that had to wait for a free connection
+    wait_seconds: float = 0.0  # Total time spent waiting
+    max_wait_seconds: float = 0.0
+    recycled: int = 0  # Connections replaced because of their age
+    broken: int = 0  # Connections that failed the checkout ping or came back closed
+    connect_failures: int = 0
+
+    @property
+    def idle(self) -> int:
+        return self.size - self.in_use
+
+    @property
+    def utilization(self) -> float:
+        """Share of maxconn checked out right now"""
+        return self.in_use / self.maxconn if self.maxconn else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-friendly snapshot"""
+        return {
+            "maxconn": self.maxconn,
+            "size": self.size,
+            "in_use": self.in_use,
+            "idle": self.idle,
+            "utilization": round(self.utilization, 3),
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+            "recycled": self.recycled,
+            "broken": self.broken,
+            "connect_failures": self.connect_failures,
+        }
+
+
+class HealthCheckedPool:
+    """Drop-in replacement for ``ThreadedConnectionPool`` (getconn/putconn/closeall).
+
+    - ``minconn`` connections are opened when the pool is created
+    - checkout blocks up to ``timeout`` seconds when ``maxconn`` connections are in use
+      (PoolError after that) instead of failing immediately
+    - connections idle for more than ``ping_after`` seconds are pinged with ``SELECT 1`` on
+      checkout; dead ones (e.g. dropped by a pgbouncer/Supabase pooler) are replaced
+    - connections older than ``max_age`` seconds are closed and reopened on checkout
+    - new connections are retried ``connect_retries`` times with ``retry_delay`` backoff
+      (0: a single attempt)
+
+    A connection that breaks while checked out is not repaired: the statement running on it
+    fails, and the connection is replaced when it comes back (see PostgresRepository for the
+    operations that are retried on a fresh connection).
+    """
+
+    def __init__(
+        self,
+        minconn: int,
+        maxconn: int,
+        *,
+        max_age: float = 1800.0,
+        ping_after: float = 10.0,
+        timeout: float = 30.0,
+        connect_retries: int = 2,
+        retry_delay: float = 0.5,
+        **kwargs,
+    ):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.max_age = max_age
+        self.ping_after = ping_after
+        self.timeout = timeout
+        self.connect_retries = connect_retries
+        self.retry_delay = retry_delay
+        self._kwargs = kwargs
+        self._cond = threading.Condition()
+        # Idle connections with their (created_at, returned_at), most recently returned last
+        self._idle: Deque[Tuple[Any, float, float]] = deque()
+        self._created: Dict[int, float] = {}  # id(conn) -> created_at of checked out connections
+        self._stats = PoolStats(maxconn=maxconn)
+        self._closed = False
+        self.warmup()
+
+    def warmup(self) -> None:
+        """Open connections until ``minconn`` exist"""
+        while True:
+            with self._cond:
+                if self._stats.size >= self.minconn:
+                    return
+                self._stats.size += 1  # Reserve the slot before connecting outside the lock
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._stats.size -= 1
+                raise
+            now = time.monotonic()
+            with self._cond:
+                self._idle.append((conn, now, now))
+                self._cond.notify()
+
+    def _connect(self):
+        attempts = self.connect_retries + 1
+        for attempt in range(attempts):
+            try:
+                return psycopg2.connect(**self._kwargs)
+            except psycopg2.OperationalError as e:
+                with self._cond:
+                    self._stats.connect_failures += 1
+                if attempt == attempts - 1:
+                    raise
+                logging.warning(f"Connection attempt {attempt + 1}/{attempts} failed: {e}")
+                time.sleep(self.retry_delay * (attempt + 1))
+
+    def getconn(self):
+        """Check out a healthy connection, waiting for a free slot if the pool is exhausted"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            waited = False
+            while not self._idle and self._stats.size >= self.maxconn:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(f"connection pool exhausted (waited {self.timeout:.1f}s)")
+                waited = True
+                self._cond.wait(remaining)
+            if self._closed:
+                raise PoolError("connection pool is closed")
+
+            wait = time.monotonic() - started
+            self._stats.checkouts += 1
+            self._stats.in_use += 1
+            if waited:
+                self._stats.waits += 1
+                self._stats.wait_seconds += wait
+                self._stats.max_wait_seconds = max(self._stats.max_wait_seconds, wait)
+            if self._idle:
+                conn, created_at, returned_at = self._idle.pop()
+            else:
+                self._stats.size += 1
+                conn, created_at, returned_at = None, 0.0, 0.0
+
+        try:
+            if conn is not None:
+                conn, created_at = self._checked(conn, created_at, returned_at)
+            if conn is None:
+                conn, created_at = self._connect(), time.monotonic()
+        except Exception:
+            with self._cond:
+                self._stats.size -= 1
+                self._stats.in_use -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._created[id(conn)] = created_at
+        return conn
+
+    def _checked(self, conn, created_at: float, returned_at: float) -> Tuple[Optional[Any], float]:
+        """The idle connection if it is still usable, otherwise (None, 0) after closing it"""
+        now = time.monotonic()
+        if conn.closed:
+            reason = "broken"
+        elif now - created_at > self.max_age:
+            reason = "recycled"
+        elif now - returned_at > self.ping_after and not self._ping(conn):
+            reason = "broken"
+        else:
+            return conn, created_at
+
+        with self._cond:
+            setattr(self._stats, reason, getattr(self._stats, reason) + 1)
+        logging.info(f"Replacing {reason} pooled connection")
+        self._close(conn)
+        return None, 0.0
+
+    @staticmethod
+    def _ping(conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def putconn(self, conn, close: bool = False) -> None:
+        """Return a connection; closed, broken or ``close=True`` connections free their slot"""
+        with self._cond:
+            created_at = self._created.pop(id(conn), None)
+        if created_at is None:
+            raise PoolError("trying to put unkeyed connection")
+
+        keep = not close and not self._closed and not conn.closed
+        if keep and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()  # Same as ThreadedConnectionPool: never hand out an open transaction
+            except Exception:
+                keep = False
+        if not keep:
+            if not close and not self._closed:
+                with self._cond:
+                    self._stats.broken += 1
+            self._close(conn)
+
+        with self._cond:
+            self._stats.in_use -= 1
+            if keep:
+                self._idle.append((conn, created_at, time.monotonic()))
+            else:
+                self._stats.size -= 1
+            self._cond.notify()
+
+    def closeall(self) -> None:
+        """Close idle connections; checked out ones are closed when returned"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._stats.size -= len(idle)
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> PoolStats:
+        """Copy of the current counters"""
+        with self._cond:
+            return PoolStats(**vars(self._stats))
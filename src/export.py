@@ -0,0 +1,235 @@
+"""
+Columnar export of salary facts and reports to Parquet through a server-side cursor
+"""
+
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+from src.database import REFERENCE_COLUMNS, PostgresRepository
+
+# Exported relations: columns with their Arrow types (built lazily, pyarrow is imported on use)
+# Both relations skip rows of running and failed runs (13_report_runs.sql)
+DATASETS = {
+    "facts": (
+        "completed_salary_facts",
+        [
+            ("report_id", "int64"),
+            ("group_index", "int16"),
+            *((column, "int32") for column in REFERENCE_COLUMNS.values()),
+            ("level", "string"),
+            ("title", "string"),
+            *(
+                (column, "int32")
+                for column in ("total", "median", "min_salary", "max_salary", "salary_value", "salary_bonus")
+            ),
+            ("fetched_at", "timestamp"),
+        ],
+    ),
+    # Raw payloads as JSON text; reports whose payload was archived (12_payload_archive.sql) are not in the view
+    "reports": (
+        "reports",
+        [
+            ("id", "int64"),
+            *((column, "int32") for column in REFERENCE_COLUMNS.values()),
+            ("data", "string"),
+            ("fetched_at", "timestamp"),
+        ],
+    ),
+}
+
+
+@dataclass
+class ExportResult:
+    """Outcome of one export"""
+
+    dataset: str
+    destination: str
+    rows: int = 0
+    batches: int = 0  # Record batches (Parquet row groups) written
+    files: List[str] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-friendly result"""
+        return {
+            "dataset": self.dataset,
+            "destination": self.destination,
+            "rows": self.rows,
+            "batches": self.batches,
+            "files": self.files,
+        }
+
+
+def resolve_filters(repository: PostgresRepository, filters: Mapping[str, Iterable[str]]) -> Dict[str, List[int]]:
+    """Reference ids for ``{table: aliases or titles}``; raises ValueError for unknown tables or values"""
+    resolved = {}
+    for table, values in filters.items():
+        if table not in REFERENCE_COLUMNS:
+            raise ValueError(f"Invalid table: {table}. Must be one of {list(REFERENCE_COLUMNS)}")
+        wanted = {value.strip().lower() for value in values if value.strip()}
+        found = repository.resolve_references(table, wanted)
+        unknown = sorted(wanted - set(found))
+        if unknown:
+            raise ValueError(f"Unknown {table}: {', '.join(unknown)}")
+        resolved[table] = sorted({ref.id for ref in found.values()})
+    return resolved
+
+
+def _month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def _next_month(month: datetime) -> datetime:
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+class ParquetExporter:
+    """Streams salary_facts or reports into Parquet files with bounded memory.
+
+    Rows are read month by month (one report_rows/salary_facts partition each, see
+    11_partition_reports.sql) through a named server-side cursor, ``batch_size`` rows at a
+    time. Each batch becomes one Arrow record batch and one Parquet row group, so memory does
+    not depend on the number of rows exported. With ``partitioned`` the destination is a
+    directory with a hive-style ``month=YYYY-MM/<dataset>.parquet`` file per month (re-exports
+    overwrite them); otherwise it is a single Parquet file.
+    """
+
+    def __init__(self, repository: PostgresRepository, batch_size: int = 50000, compression: str = "zstd"):
+        self.repository = repository
+        self.batch_size = batch_size
+        self.compression = compression
+
+    def export(
+        self,
+        dataset: str,
+        destination: Union[str, Path],
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        references: Optional[Mapping[str, Iterable[int]]] = None,
+        partitioned: bool = True,
+    ) -> ExportResult:
+        """Export rows with ``since <= fetched_at < until`` matching every ``{table: ids}`` filter"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if dataset not in DATASETS:
+            raise ValueError(f"Invalid dataset: {dataset}. Must be one of {list(DATASETS)}")
+        relation, columns = DATASETS[dataset]
+        schema = pa.schema(
+            [(name, pa.timestamp("us") if kind == "timestamp" else pa.type_for_alias(kind)) for name, kind in columns]
+        )
+        conditions, params = self._filters(references or {})
+        destination = Path(destination)
+        result = ExportResult(dataset=dataset, destination=str(destination))
+
+        with self.repository.get_connection() as conn:
+            try:
+                bounds = self._bounds(conn, relation, conditions, params, since, until)
+                if bounds is None:
+                    logging.info(f"No {dataset} to export")
+                    return result
+
+                writer = None
+                try:
+                    for month, low, high in self._months(*bounds):
+                        if partitioned and writer is not None:
+                            writer.close()
+                            writer = None
+                        path = (
+                            destination / f"month={month:%Y-%m}" / f"{dataset}.parquet" if partitioned else destination
+                        )
+                        for rows in self._stream(conn, relation, columns, conditions, params, low, high):
+                            if writer is None:
+                                path.parent.mkdir(parents=True, exist_ok=True)
+                                writer = pq.ParquetWriter(path, schema, compression=self.compression)
+                                result.files.append(str(path))
+                            arrays = [pa.array(values, type=column.type) for values, column in zip(zip(*rows), schema)]
+                            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                            result.rows += len(rows)
+                            result.batches += 1
+                        if result.rows:
+                            logging.info(f"Exported {result.rows} {dataset} up to {high:%Y-%m-%d}")
+                finally:
+                    if writer is not None:
+                        writer.close()
+            finally:
+                # End the read transaction before the connection goes back to the pool
+                conn.rollback()
+
+        return result
+
+    @staticmethod
+    def _filters(references: Mapping[str, Iterable[int]]) -> Tuple[List[str], List[Any]]:
+        conditions, params = [], []
+        for table, ids in references.items():
+            column = REFERENCE_COLUMNS.get(table)
+            if not column:
+                raise ValueError(f"Invalid table: {table}. Must be one of {list(REFERENCE_COLUMNS)}")
+            conditions.append(f"{column} = ANY(%s)")
+            params.append(list(ids))
+        return conditions, params
+
+    @staticmethod
+    def _bounds(
+        conn,
+        relation: str,
+        conditions: List[str],
+        params: List[Any],
+        since: Optional[datetime],
+        until: Optional[datetime],
+    ) -> Optional[Tuple[datetime, datetime]]:
+        """``[low, high)`` range of fetched_at to export, narrowed to the data's own range"""
+        if since is not None and until is not None and since >= until:
+            return None
+
+        cursor = conn.cursor()
+        try:
+            where = " AND ".join([*conditions, "fetched_at >= %s", "fetched_at < %s"])
+            cursor.execute(
+                f"SELECT MIN(fetched_at), MAX(fetched_at) FROM {relation} WHERE {where}",
+                (*params, since or datetime.min, until or datetime.max),
+            )
+            first, last = cursor.fetchone()
+        finally:
+            cursor.close()
+        if first is None:
+            return None
+        # MAX is inclusive, the range is not: stop just after the last row
+        return first, last + timedelta(microseconds=1)
+
+    @staticmethod
+    def _months(low: datetime, high: datetime) -> Iterator[Tuple[datetime, datetime, datetime]]:
+        """``(month, low, high)`` slices of ``[low, high)`` at month boundaries"""
+        month = _month_start(low)
+        while month < high:
+            following = _next_month(month)
+            yield month, max(low, month), min(high, following)
+            month = following
+
+    def _stream(
+        self,
+        conn,
+        relation: str,
+        columns: List[Tuple[str, str]],
+        conditions: List[str],
+        params: List[Any],
+        low: datetime,
+        high: datetime,
+    ) -> Iterator[List[Tuple[Any, ...]]]:
+        """Rows of one slice in lists of up to ``batch_size`` (named cursor: the server keeps the result)"""
+        select = ", ".join(f"{name}::text" if name == "data" else name for name, _ in columns)
+        where = " AND ".join([*conditions, "fetched_at >= %s", "fetched_at < %s"])
+        cursor = conn.cursor(name=f"export_{uuid.uuid4().hex}")
+        cursor.itersize = self.batch_size
+        try:
+            cursor.execute(f"SELECT {select} FROM {relation} WHERE {where}", (*params, low, high))
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
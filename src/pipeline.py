@@ -0,0 +1,203 @@
+"""
+Pipelined scraper: fetch, validate/transform and persist stages connected by bounded queues
+"""
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.core import IApiClient, IRepository, ScrapingConfig, SalaryData, ScrapeTask
+from src.reference_catalog import ReferenceCatalog
+from src.scraper import SalaryScraper, build_task_params, build_task_reports
+
+_DONE = object()  # Sentinel closing a stage queue
+
+
+@dataclass
+class StageStats:
+    """Per-stage throughput counters"""
+
+    name: str
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0  # Time spent doing work (excludes waiting on queues)
+
+    @property
+    def throughput(self) -> float:
+        """Items per second of busy time"""
+        return self.processed / self.busy_seconds if self.busy_seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.processed} ok, {self.failed} failed, "
+            f"{self.busy_seconds:.1f}s busy, {self.throughput:.2f} items/s"
+        )
+
+
+class PipelinedSalaryScraper(SalaryScraper):
+    """Scraper running network, JSON handling and DB writes as concurrent stages.
+
+    Stages are connected by bounded queues, so a slow database only slows fetching
+    through backpressure once the queues are full, instead of on every request.
+    """
+
+    def __init__(
+        self,
+        repository: IRepository,
+        api_client: IApiClient,
+        queue_size: int = 100,
+        fetch_workers: int = 1,
+        catalog: Optional[ReferenceCatalog] = None,
+    ):
+        super().__init__(repository, api_client, catalog=catalog)
+        self.queue_size = queue_size
+        self.fetch_workers = fetch_workers
+        self.stats: Dict[str, StageStats] = {}
+
+    def scrape(self, config: ScrapingConfig) -> bool:
+        """Execute scraping based on configuration"""
+        transaction_id = str(uuid.uuid4())
+        transaction_timestamp = datetime.now()  # Единая дата для всей транзакции
+
+        try:
+            # The plan is resolved lazily on this thread while the stages run
+            total_count, success_count = self._run_pipeline(
+                self._iter_tasks(config), transaction_id, transaction_timestamp
+            )
+            if total_count == 0:
+                logging.info("No data to scrape")
+                return True
+
+            self.repository.commit_transaction(transaction_id)
+            logging.info(f"Pipelined scraping completed: {success_count}/{total_count} successful")
+            for stats in self.stats.values():
+                logging.info(f"  {stats}")
+            return True
+
+        except Exception as e:
+            self.repository.rollback_transaction(transaction_id)
+            logging.error(f"Critical error during pipelined scraping: {e}")
+            return False
+
+    def _run_pipeline(self, tasks: Iterable[ScrapeTask], transaction_id: str, timestamp: datetime) -> Tuple[int, int]:
+        """Push tasks through the stages and return (planned, persisted) task counts"""
+        self.stats = {name: StageStats(name) for name in ("fetch", "transform", "persist")}
+        fetch_queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+        transform_queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+        persist_queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+        stats_lock = threading.Lock()
+
+        threads = [
+            threading.Thread(
+                target=self._fetch_stage, args=(fetch_queue, transform_queue, stats_lock), name=f"fetch-{i}"
+            )
+            for i in range(self.fetch_workers)
+        ]
+        threads.append(
+            threading.Thread(target=self._transform_stage, args=(transform_queue, persist_queue), name="transform")
+        )
+        persisted: List[int] = [0]
+        threads.append(
+            threading.Thread(
+                target=self._persist_stage,
+                args=(persist_queue, transaction_id, timestamp, persisted),
+                name="persist",
+            )
+        )
+        for thread in threads:
+            thread.start()
+
+        # Blocks when the fetch stage falls behind (backpressure)
+        planned = 0
+        try:
+            for task in tasks:
+                fetch_queue.put(task)
+                planned += 1
+        finally:
+            # Close the stages even if planning fails, so no thread is left blocked
+            for _ in range(self.fetch_workers):
+                fetch_queue.put(_DONE)
+            for thread in threads:
+                thread.join()
+        return planned, persisted[0]
+
+    def _fetch_stage(self, inbox: queue.Queue, outbox: queue.Queue, stats_lock: threading.Lock) -> None:
+        stats = self.stats["fetch"]
+        while True:
+            task = inbox.get()
+            if task is _DONE:
+                outbox.put(_DONE)
+                return
+            started = time.monotonic()
+            try:
+                data = self.api_client.fetch_salary_data(**build_task_params(task))
+            except Exception as e:
+                logging.error(f"Fetch stage error: {e}")
+                data = None
+            with stats_lock:
+                stats.busy_seconds += time.monotonic() - started
+                if data:
+                    stats.processed += 1
+                else:
+                    stats.failed += 1
+            outbox.put((task, data))
+
+    def _transform_stage(self, inbox: queue.Queue, outbox: queue.Queue) -> None:
+        stats = self.stats["transform"]
+        open_fetchers = self.fetch_workers
+        while open_fetchers:
+            item = inbox.get()
+            if item is _DONE:
+                open_fetchers -= 1
+                continue
+            task, data = item
+            started = time.monotonic()
+            reports = self._validate(task, data)
+            stats.busy_seconds += time.monotonic() - started
+            if reports is None:
+                if data:
+                    stats.failed += 1
+                outbox.put(None)  # Keeps persist stage progress in step with planned tasks
+                continue
+            stats.processed += 1
+            outbox.put(reports)
+        outbox.put(_DONE)
+
+    @staticmethod
+    def _validate(task: ScrapeTask, data: Optional[Dict[str, Any]]) -> Optional[List[SalaryData]]:
+        """Check API payload shape and build reports to persist"""
+        if not isinstance(data, dict) or not isinstance(data.get('groups'), list) or not data['groups']:
+            return None
+        return build_task_reports(task, data)
+
+    def _persist_stage(
+        self, inbox: queue.Queue, transaction_id: str, timestamp: datetime, persisted: List[int]
+    ) -> None:
+        stats = self.stats["persist"]
+        done = 0
+        while True:
+            reports = inbox.get()
+            if reports is _DONE:
+                return
+            done += 1
+            if reports is not None:
+                started = time.monotonic()
+                try:
+                    saved = all([self.repository.save_report(report, transaction_id, timestamp) for report in reports])
+                except Exception as e:
+                    logging.error(f"Persist stage error: {e}")
+                    saved = False
+                stats.busy_seconds += time.monotonic() - started
+                if saved:
+                    stats.processed += 1
+                    persisted[0] += 1
+                else:
+                    stats.failed += 1
+
+            if done % 10 == 0:
+                logging.info(f"  Progress: {done} ({persisted[0]} successful)")
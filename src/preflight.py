@@ -0,0 +1,97 @@
+"""
+Pre-flight resolution and validation of CSV combination configs
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple
+
+from src.core import IRepository, Reference, ScrapingConfig
+
+
+@dataclass
+class PreflightReport:
+    """Outcome of resolving a config before scraping"""
+
+    config: ScrapingConfig  # Rows carry resolved Reference objects instead of raw values
+    total_rows: int = 0
+    unresolved: Dict[str, List[str]] = field(default_factory=dict)  # ref_type -> unknown values
+    skipped_rows: int = 0  # Rows dropped because of unresolved values
+    duplicate_rows: List[Tuple[Tuple[str, str], ...]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        """True if every value resolved and no row was repeated"""
+        return not self.unresolved and not self.duplicate_rows
+
+    @property
+    def resolved_rows(self) -> int:
+        return self.total_rows - self.skipped_rows - len(self.duplicate_rows)
+
+    def summary(self) -> Dict[str, object]:
+        """JSON-friendly report"""
+        return {
+            "total_rows": self.total_rows,
+            "resolved_rows": self.resolved_rows,
+            "skipped_rows": self.skipped_rows,
+            "duplicate_rows": len(self.duplicate_rows),
+            "unresolved": self.unresolved,
+        }
+
+
+def preflight(config: ScrapingConfig, repository: IRepository) -> PreflightReport:
+    """Resolve every distinct (ref_type, value) of the config with one query per table.
+
+    Rows with unknown values are dropped and reported, repeated rows are kept once; raises
+    ValueError if no row resolves. Configs without explicit rows (full scrapes, lazy specs)
+    are returned unchanged.
+    """
+    if not isinstance(config.combinations, list):
+        return PreflightReport(config=config)
+
+    rows = config.combinations
+    values: Dict[str, Set[str]] = {}
+    for row in rows:
+        for ref_type, value in row:
+            if not isinstance(value, Reference):
+                values.setdefault(ref_type, set()).add(value.strip().lower())
+
+    resolved: Dict[str, Dict[str, Reference]] = {
+        ref_type: repository.resolve_references(ref_type, wanted) for ref_type, wanted in values.items()
+    }
+
+    report = PreflightReport(config=config, total_rows=len(rows))
+    unresolved: Dict[str, Set[str]] = {}
+    seen: Set[Tuple[Tuple[str, int], ...]] = set()
+    resolved_rows = []
+    for row in rows:
+        resolved_row = []
+        for ref_type, value in row:
+            ref = value if isinstance(value, Reference) else resolved[ref_type].get(value.strip().lower())
+            if ref is None:
+                unresolved.setdefault(ref_type, set()).add(value)
+            else:
+                resolved_row.append((ref_type, ref))
+        if len(resolved_row) != len(row):
+            report.skipped_rows += 1
+            continue
+
+        key = tuple(sorted((ref_type, ref.id) for ref_type, ref in resolved_row))
+        if key in seen:
+            report.duplicate_rows.append(tuple((ref_type, ref.alias) for ref_type, ref in resolved_row))
+            continue
+        seen.add(key)
+        resolved_rows.append(tuple(resolved_row))
+
+    report.unresolved = {ref_type: sorted(found) for ref_type, found in unresolved.items()}
+    for ref_type, unknown in report.unresolved.items():
+        logging.warning(f"Unresolved {ref_type} ({len(unknown)}): {', '.join(unknown[:20])}")
+    if not resolved_rows:
+        # An empty row list would make scrapers fall back to a full scrape
+        raise ValueError(f"No CSV rows could be resolved (unresolved: {report.unresolved})")
+
+    report.config = ScrapingConfig(reference_types=config.reference_types, combinations=resolved_rows)
+    if report.duplicate_rows:
+        logging.warning(f"Skipping {len(report.duplicate_rows)} duplicate rows")
+    logging.info(f"Preflight: {report.resolved_rows}/{report.total_rows} rows resolved")
+    return report
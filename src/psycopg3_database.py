@@ -0,0 +1,250 @@
+"""
+PostgreSQL repository on psycopg 3: binary COPY staging, pipelined commits, psycopg_pool
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg import DataError, pq
+from psycopg.types.datetime import TimestampLoader
+from psycopg.types.json import Jsonb
+from psycopg_pool import ConnectionPool
+
+from src.core import SalaryData
+from src.database import (
+    REFERENCE_COLUMNS,
+    RUN_PROGRESS,
+    PostgresRepository,
+    report_insert_statements,
+    run_progress_params,
+)
+from src.db_pool import PoolStats
+
+_STAGING_COLUMNS = [*REFERENCE_COLUMNS.values(), "data", "fetched_at"]
+_STAGING_TYPES = ["int4"] * len(REFERENCE_COLUMNS) + ["jsonb", "timestamp"]
+
+
+class _InfTimestampLoader(TimestampLoader):
+    """Read -infinity/infinity as datetime.min/max like psycopg2 (rollup_watermarks starts at -infinity)"""
+
+    def load(self, data):
+        if data == b"-infinity":
+            return datetime.min
+        if data == b"infinity":
+            return datetime.max
+        return super().load(data)
+
+
+def _configure(conn) -> None:
+    conn.adapters.register_loader("timestamp", _InfTimestampLoader)
+
+
+class _Psycopg3Pool:
+    """psycopg_pool.ConnectionPool behind the getconn/putconn interface PostgresRepository uses"""
+
+    def __init__(self, config: Dict[str, Any], min_size: int, max_size: int):
+        kwargs = dict(config)
+        if "database" in kwargs:
+            kwargs["dbname"] = kwargs.pop("database")
+        self.pool = ConnectionPool(
+            kwargs=kwargs,
+            min_size=min_size,
+            max_size=max_size,
+            configure=_configure,
+            check=ConnectionPool.check_connection,  # Ping on checkout, reconnect if it fails
+            open=True,
+        )
+        self.maxconn = max_size
+
+    def getconn(self):
+        return self.pool.getconn()
+
+    def putconn(self, conn, close: bool = False) -> None:
+        if close:
+            conn.close()  # The pool replaces closed connections
+        elif conn.info.transaction_status != pq.TransactionStatus.IDLE:
+            conn.rollback()  # Same as HealthCheckedPool: never hand out an open transaction
+        self.pool.putconn(conn)
+
+    def closeall(self) -> None:
+        self.pool.close()
+
+    def stats(self) -> PoolStats:
+        stats = self.pool.get_stats()
+        size = stats.get("pool_size", 0)
+        return PoolStats(
+            maxconn=self.maxconn,
+            size=size,
+            in_use=size - stats.get("pool_available", 0),
+            checkouts=stats.get("requests_num", 0),
+            waits=stats.get("requests_queued", 0),
+            wait_seconds=stats.get("requests_wait_ms", 0) / 1000,
+            broken=stats.get("connections_lost", 0),
+            connect_failures=stats.get("connections_errors", 0),
+        )
+
+
+class Psycopg3Repository(PostgresRepository):
+    """PostgresRepository on psycopg 3 for high-latency (remote) databases
+
+    - save_report buffers rows per transaction and writes ``batch_size`` of them at a time
+      with binary COPY into the transaction's temp table, instead of one round trip per row
+    - commit sends the run bookkeeping, partition check, payload/row/fact inserts, report_log
+      entry and staging drop in one pipeline, so it costs a single round trip
+    - connections come from psycopg_pool (checked on checkout); repeated statements are
+      prepared automatically by psycopg
+
+    Only temp-table staging is supported: engines that need report_staging (process shards,
+    task queue) and the maintenance commands keep using PostgresRepository.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        batch_size: int = 500,
+        min_size: int = 1,
+        max_size: int = 10,
+        chunk_rows: Optional[int] = None,
+    ):
+        super().__init__(config, prepare_statements=False, chunk_rows=chunk_rows)
+        self.batch_size = batch_size
+        self.min_size = min_size
+        self.max_size = max_size
+        # transaction_id -> rows not yet copied to its temp table
+        self._buffers: Dict[str, List[Tuple[Any, ...]]] = {}
+
+    def _open_pool(self):
+        return _Psycopg3Pool(self.config, self.min_size, self.max_size)
+
+    def save_report(self, data: SalaryData, transaction_id: str, timestamp: Optional[datetime] = None) -> bool:
+        """Buffer report for the transaction, copying a full batch to its temp table"""
+        reference_ids = data.reference_ids
+        if not reference_ids or any(ref_type not in REFERENCE_COLUMNS for ref_type in reference_ids):
+            return False
+        row = (
+            *(reference_ids.get(ref_type) for ref_type in REFERENCE_COLUMNS),
+            Jsonb(data.data),
+            timestamp or datetime.now(),
+        )
+
+        with self._staging_lock:
+            buffer = self._buffers.setdefault(transaction_id, [])
+            buffer.append(row)
+            if len(buffer) < self.batch_size:
+                return True
+            try:
+                copied, rejected = self._flush(transaction_id)
+            except Exception as e:
+                # Earlier rows were accepted and stay buffered for the next flush; this one is dropped
+                buffer = self._buffers.get(transaction_id)
+                if buffer and buffer[-1] is row:
+                    buffer.pop()
+                logging.error(f"Error saving report to staging: {e}")
+                return False
+            self._track_staged(transaction_id, copied)
+        return not any(rejected_row is row for rejected_row in rejected)
+
+    def _flush(self, transaction_id: str) -> Tuple[int, List[Tuple[Any, ...]]]:
+        """Binary COPY of buffered rows into the temp table (must be called with _staging_lock held).
+
+        A batch the server rejects for its data (e.g. a NUL character in a payload, refused by jsonb)
+        is split in halves and copied again until the offending rows are isolated; those are
+        dropped and logged, so one bad report cannot block the run. Returns the number of
+        copied rows and the dropped ones. On any other error the rows not copied yet go back
+        to the buffer and the error is raised.
+        """
+        rows = self._buffers.pop(transaction_id, None)
+        if not rows:
+            return 0, []
+        conn = self._staging_connection(transaction_id)
+        copied, rejected = 0, []
+        pending = [rows]  # Batches still to copy, next one last
+        while pending:
+            batch = pending.pop()
+            try:
+                self._copy(conn, transaction_id, batch)
+            except DataError as e:
+                conn.rollback()
+                if len(batch) == 1:
+                    logging.error(f"Report rejected by the database, dropped: {e}")
+                    rejected.extend(batch)
+                else:
+                    middle = len(batch) // 2
+                    pending.extend([batch[middle:], batch[:middle]])
+                continue
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                not_copied = [row for part in (batch, *reversed(pending)) for row in part]
+                self._buffers[transaction_id] = not_copied + self._buffers.get(transaction_id, [])
+                raise
+            copied += len(batch)
+        return copied, rejected
+
+    def _copy(self, conn, transaction_id: str, rows: List[Tuple[Any, ...]]) -> None:
+        with conn.cursor() as cursor:
+            with cursor.copy(
+                f"COPY {self._get_temp_table_name(transaction_id)} ({', '.join(_STAGING_COLUMNS)}) "
+                "FROM STDIN (FORMAT BINARY)"
+            ) as copy:
+                copy.set_types(_STAGING_TYPES)
+                for row in rows:
+                    copy.write_row(row)
+        conn.commit()
+
+    def commit_chunk(self, transaction_id: str) -> int:
+        """Copy buffered rows, then move everything staged so far as one chunk of the run"""
+        with self._staging_lock:
+            flushed, _ = self._flush(transaction_id)
+            self._staged_rows[transaction_id] = self._staged_rows.get(transaction_id, 0) + flushed
+            return super().commit_chunk(transaction_id)
+
+    def commit_transaction(self, transaction_id: str) -> None:
+        """Move the transaction's reports to the permanent tables in one pipelined round trip"""
+        with self._staging_lock:
+            flushed, _ = self._flush(transaction_id)
+            conn = self._staging_connection(transaction_id, create=False)
+            if conn is None:
+                logging.warning(f"No temporary table found for transaction {transaction_id}")
+                return
+
+            # Rows copied since the last chunk (counted client-side, no COUNT round trip)
+            count = self._staged_rows.pop(transaction_id, 0) + flushed
+            source = self._get_temp_table_name(transaction_id)
+            try:
+                with conn.cursor() as cursor:
+                    with conn.pipeline():
+                        cursor.execute(RUN_PROGRESS, run_progress_params(transaction_id, count, complete=True))
+                        if count:
+                            cursor.execute("SELECT ensure_report_partitions()")
+                            for statement in report_insert_statements(source):
+                                cursor.execute(statement)
+                            self._log_import(cursor, count)
+                        self._drop_staging(cursor, transaction_id)
+                conn.commit()
+                if count:
+                    logging.info(f"Successfully committed {count} reports from temporary storage")
+                else:
+                    logging.info("No data to commit")
+            except Exception as e:
+                conn.rollback()
+                logging.error(f"Error committing transaction: {e}")
+                raise
+            finally:
+                self._release_staging_connection(transaction_id)
+
+    def rollback_transaction(self, transaction_id: str) -> None:
+        """Discard buffered rows and drop the staged ones"""
+        with self._staging_lock:
+            buffered = self._buffers.pop(transaction_id, None)
+            if buffered and transaction_id not in self._staging_conns:
+                self._staged_rows.pop(transaction_id, None)
+                logging.info(f"Rolled back transaction {transaction_id} (discarded buffered rows)")
+                return
+        super().rollback_transaction(transaction_id)
+
+    def transaction_exists(self, transaction_id: str) -> bool:
+        """Check if transaction has buffered or staged rows"""
+        with self._staging_lock:
+            return transaction_id in self._buffers or transaction_id in self._staging_conns
@@ -0,0 +1,67 @@
+"""
+Rate limiting shared between concurrent API callers
+"""
+
+import multiprocessing
+import random
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing requests by a (randomized) interval.
+
+    Each caller reserves the next free slot under a lock and sleeps outside of it,
+    so N threads together never exceed the configured request rate.
+    """
+
+    def __init__(self, delay_min: float, delay_max: Optional[float] = None):
+        self.delay_min = delay_min
+        self.delay_max = delay_min if delay_max is None else delay_max
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_second(cls, requests_per_second: float) -> "RateLimiter":
+        """Limiter allowing a fixed number of requests per second"""
+        return cls(1.0 / requests_per_second)
+
+    def acquire(self) -> None:
+        """Block until the caller may send the next request"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + random.uniform(self.delay_min, self.delay_max)
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+class SharedRateLimiter:
+    """Process-safe limiter: one request budget shared by all worker processes.
+
+    The next free slot lives in a ``multiprocessing.Value`` (wall-clock seconds), so the
+    limiter must be handed to workers at process start (e.g. via pool initargs).
+    """
+
+    def __init__(self, delay_min: float, delay_max: Optional[float] = None, context=None):
+        ctx = context or multiprocessing.get_context()
+        self.delay_min = delay_min
+        self.delay_max = delay_min if delay_max is None else delay_max
+        self._next_slot = ctx.Value('d', 0.0)
+
+    @classmethod
+    def per_second(cls, requests_per_second: float, context=None) -> "SharedRateLimiter":
+        """Limiter allowing a fixed number of requests per second across processes"""
+        return cls(1.0 / requests_per_second, context=context)
+
+    def acquire(self) -> None:
+        """Block until the caller may send the next request"""
+        with self._next_slot.get_lock():
+            now = time.time()
+            slot = max(now, self._next_slot.value)
+            self._next_slot.value = slot + random.uniform(self.delay_min, self.delay_max)
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
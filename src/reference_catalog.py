@@ -0,0 +1,82 @@
+"""
+In-memory reference catalog with hash indexes for alias/title lookups
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from src.core import IRepository, Reference
+
+
+@dataclass
+class _TableIndex:
+    """Loaded reference table with casefolded lookup indexes"""
+
+    references: List[Reference]
+    by_alias: Dict[str, Reference] = field(default_factory=dict)
+    by_title: Dict[str, Reference] = field(default_factory=dict)
+    version: Any = None
+    checked_at: float = 0.0
+
+    @classmethod
+    def build(cls, references: List[Reference], version: Any) -> "_TableIndex":
+        index = cls(references=references, version=version, checked_at=time.monotonic())
+        for ref in references:
+            # First occurrence wins, matching the old linear scan order
+            index.by_alias.setdefault(ref.alias.casefold(), ref)
+            index.by_title.setdefault(ref.title.casefold(), ref)
+        return index
+
+
+class ReferenceCatalog:
+    """Reference tables loaded once and resolved in O(1).
+
+    Each table is loaded on first use. After ``ttl`` seconds the repository's cheap
+    ``get_reference_version`` fingerprint is compared and the table is reloaded only if it
+    changed (or always, for repositories without versions). Thread-safe, so one catalog can
+    be shared by the sync, async and API scrapers.
+    """
+
+    def __init__(self, repository: IRepository, ttl: float = 600.0):
+        self.repository = repository
+        self.ttl = ttl
+        self._tables: Dict[str, _TableIndex] = {}
+        self._lock = threading.RLock()
+
+    def get_references(self, ref_type: str) -> List[Reference]:
+        """All references of a type, ordered by id"""
+        return self._table(ref_type).references
+
+    def find(self, ref_type: str, value: str) -> Optional[Reference]:
+        """Look for reference by alias first, then by title (case-insensitive)"""
+        index = self._table(ref_type)
+        key = value.strip().casefold()
+        return index.by_alias.get(key) or index.by_title.get(key)
+
+    def invalidate(self, ref_type: Optional[str] = None) -> None:
+        """Drop cached tables so the next lookup reloads them"""
+        with self._lock:
+            if ref_type is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(ref_type, None)
+
+    def _table(self, ref_type: str) -> _TableIndex:
+        with self._lock:
+            index = self._tables.get(ref_type)
+            if index is not None and time.monotonic() - index.checked_at < self.ttl:
+                return index
+
+            version = self.repository.get_reference_version(ref_type)
+            if index is not None and version is not None and version == index.version:
+                index.checked_at = time.monotonic()
+                return index
+
+            # Raises ValueError for unknown reference types, like the repository does
+            references = self.repository.get_references(ref_type)
+            self._tables[ref_type] = index = _TableIndex.build(references, version)
+            logging.info(f"Loaded {len(references)} {ref_type} into reference catalog")
+            return index
@@ -0,0 +1,196 @@
+"""
+Bulk import of reference tables from CSV/XLSX files via COPY and a single upsert
+"""
+
+import csv
+import io
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from src.database import REFERENCE_COLUMNS, PostgresRepository
+
+REQUIRED_COLUMNS = ("title", "alias")
+
+
+@dataclass
+class ImportResult:
+    """Outcome of importing one reference file"""
+
+    table: str
+    rows: int = 0  # Data rows read from the file
+    skipped: int = 0  # Rows with an empty title or alias
+    duplicates: int = 0  # Repeated aliases within the file (the last row wins)
+    inserted: int = 0
+    updated: int = 0  # Existing aliases whose title changed
+    unchanged: int = 0
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-friendly result"""
+        return {
+            "table": self.table,
+            "rows": self.rows,
+            "skipped": self.skipped,
+            "duplicates": self.duplicates,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+        }
+
+
+def _header_positions(header: Iterable[Any]) -> Dict[str, int]:
+    positions = {}
+    for index, name in enumerate(header):
+        key = str(name).strip().lower() if name is not None else ""
+        positions.setdefault(key, index)
+    missing = [column for column in REQUIRED_COLUMNS if column not in positions]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    return positions
+
+
+def _iter_sheet_rows(path: Path) -> Iterator[Tuple[Any, ...]]:
+    # Read-only mode streams rows instead of building the whole workbook in memory
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_csv_rows(path: Path) -> Iterator[Tuple[Any, ...]]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.reader(f):
+            yield tuple(row)
+
+
+def read_reference_rows(path: Union[str, Path]) -> Iterator[Optional[Tuple[str, str]]]:
+    """Stream ``(title, alias)`` pairs from a CSV or XLSX file with a header row.
+
+    Rows with an empty title or alias are yielded as None so callers can count them.
+    Raises ValueError for unsupported files or a header without title/alias columns.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        rows = _iter_csv_rows(path)
+    elif suffix in (".xlsx", ".xlsm"):
+        rows = _iter_sheet_rows(path)
+    else:
+        raise ValueError(f"Unsupported file type: {path.suffix or path.name} (expected .csv or .xlsx)")
+
+    positions = _header_positions(next(rows, ()))
+    title_at, alias_at = positions["title"], positions["alias"]
+    for row in rows:
+        if not any(value not in (None, "") for value in row):
+            continue  # Trailing blank lines / empty sheet rows
+        title = row[title_at] if title_at < len(row) else None
+        alias = row[alias_at] if alias_at < len(row) else None
+        title = str(title).strip() if title is not None else ""
+        alias = str(alias).strip() if alias is not None else ""
+        yield (title, alias) if title and alias else None
+
+
+class _CopyStream(io.TextIOBase):
+    """File-like CSV view over row tuples, read lazily by ``copy_expert``"""
+
+    def __init__(self, rows: Iterable[Tuple[Any, ...]]):
+        self._rows = iter(rows)
+        self._buffer = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            out = io.StringIO()
+            csv.writer(out, lineterminator="\n").writerow(row)
+            self._buffer += out.getvalue()
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def readline(self, size: int = -1) -> str:
+        return self.read(size)
+
+
+class ReferenceImporter:
+    """Loads a reference file into a temp staging table with COPY and merges it with one
+    ``INSERT ... ON CONFLICT (alias) DO UPDATE``, all in a single transaction.
+
+    Titles of existing aliases are updated only when they differ, so re-importing the same
+    file leaves the table (and ``updated_at``) untouched.
+    """
+
+    def __init__(self, repository: PostgresRepository):
+        self.repository = repository
+
+    def import_file(self, table_name: str, path: Union[str, Path]) -> ImportResult:
+        """Import ``title``/``alias`` rows from a CSV or XLSX file into a reference table"""
+        if table_name not in REFERENCE_COLUMNS:
+            raise ValueError(f"Invalid table: {table_name}. Must be one of {list(REFERENCE_COLUMNS)}")
+
+        result = ImportResult(table=table_name)
+
+        def staged_rows() -> Iterator[Tuple[int, str, str]]:
+            for line, row in enumerate(read_reference_rows(path), start=1):
+                result.rows += 1
+                if row is None:
+                    result.skipped += 1
+                    continue
+                yield (line, *row)
+
+        with self.repository.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    """
+                    CREATE TEMP TABLE reference_import (line INTEGER, title TEXT, alias TEXT)
+                    ON COMMIT DROP
+                """
+                )
+                cursor.copy_expert(
+                    "COPY reference_import (line, title, alias) FROM STDIN WITH (FORMAT csv)",
+                    _CopyStream(staged_rows()),
+                )
+                cursor.execute(
+                    f"""
+                    WITH src AS (
+                        SELECT DISTINCT ON (alias) alias, title
+                        FROM reference_import
+                        ORDER BY alias, line DESC
+                    ),
+                    merged AS (
+                        INSERT INTO {table_name} (title, alias)
+                        SELECT title, alias FROM src
+                        ON CONFLICT (alias) DO UPDATE SET title = EXCLUDED.title, updated_at = NOW()
+                        WHERE {table_name}.title IS DISTINCT FROM EXCLUDED.title
+                        RETURNING (xmax = 0) AS inserted
+                    )
+                    SELECT (SELECT COUNT(*) FROM src),
+                           COUNT(*) FILTER (WHERE inserted),
+                           COUNT(*) FILTER (WHERE NOT inserted)
+                    FROM merged
+                """
+                )
+                distinct, inserted, updated = cursor.fetchone()
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        result.duplicates = result.rows - result.skipped - distinct
+        result.inserted = inserted
+        result.updated = updated
+        result.unchanged = distinct - inserted - updated
+        logging.info(f"Imported {table_name} from {path}: {result.summary()}")
+        return result
@@ -7,24 +7,103 @@ import requests
 import time
 import random
 import urllib.parse
-from typing import Dict, Any, Optional, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sized
 from datetime import datetime
 import warnings
 import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
-from src.core import IApiClient, IScraper, IRepository, ScrapingConfig, SalaryData, Reference
+from src.core import IApiClient, IScraper, IRepository, ScrapingConfig, SalaryData, Reference, ScrapeTask
+from src.rate_limit import RateLimiter
+from src.reference_catalog import ReferenceCatalog
+from src.settings import ApiSettings
 
 warnings.filterwarnings("ignore", category=requests.packages.urllib3.exceptions.InsecureRequestWarning)
 
 
-class HabrApiClient(IApiClient):
-    """Habr Career API client implementation"""
+def build_params(ref_type: str, ref: Reference) -> Dict[str, Any]:
+    """Build API parameters based on reference type"""
+    param_mapping = {
+        'specializations': ('spec_alias', ref.alias),
+        'skills': ('skill_aliases', [ref.alias]),
+        'regions': ('region_alias', ref.alias),  # mapped to locations[] in fetch
+        'companies': ('company_alias', ref.alias),
+    }
+
+    param_name, param_value = param_mapping.get(ref_type, (None, None))
+    if param_name:
+        return {param_name: param_value}
+    return {}
+
+
+def build_task_params(task: ScrapeTask) -> Dict[str, Any]:
+    """Merge API parameters of all references in the task into one call"""
+    combined_params: Dict[str, Any] = {}
+    for ref_type, ref in task.references:
+        combined_params.update(build_params(ref_type, ref))
+    return combined_params
+
+
+def build_task_reports(task: ScrapeTask, data: Dict[str, Any]) -> List[SalaryData]:
+    """Build reports to save for an API response (one row with every reference of the task)"""
+    ref_type, ref = task.references[0]
+    combination = {other_type: other.id for other_type, other in task.references} if len(task.references) > 1 else {}
+    return [SalaryData(data=data, reference_id=ref.id, reference_type=ref_type, combination=combination)]
+
+
+def create_http_session(pool_size: int = 10) -> requests.Session:
+    """HTTP session with a connection pool large enough for pool_size threads"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
-    def __init__(self, url: str, delay_min: float = 1.5, delay_max: float = 2.5, retry_attempts: int = 3):
+
+class HabrApiClient(IApiClient):
+    """Habr Career API client implementation
+
+    With a shared ``rate_limiter`` the client is safe to call from many threads: requests
+    are spaced globally instead of each call sleeping after its own response.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        delay_min: float = 1.5,
+        delay_max: float = 2.5,
+        retry_attempts: int = 3,
+        *,
+        session: Optional[requests.Session] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
         self.url = url
         self.delay_min = delay_min
         self.delay_max = delay_max
         self.retry_attempts = retry_attempts
+        self.session = session
+        self.rate_limiter = rate_limiter
+
+    @classmethod
+    def from_settings(cls, api: ApiSettings, workers: int = 1) -> "HabrApiClient":
+        """Create client; for several workers share one pooled session and a global rate limiter"""
+        if workers <= 1:
+            return cls(api.url, api.delay_min, api.delay_max, api.retry_attempts)
+
+        if api.requests_per_second:
+            rate_limiter = RateLimiter.per_second(api.requests_per_second)
+        else:
+            rate_limiter = RateLimiter(api.delay_min, api.delay_max)
+        return cls(
+            api.url,
+            api.delay_min,
+            api.delay_max,
+            api.retry_attempts,
+            session=create_http_session(workers),
+            rate_limiter=rate_limiter,
+        )
 
     def fetch_salary_data(self, **params) -> Optional[Dict[str, Any]]:
         """Fetch salary data from API"""
@@ -47,9 +126,12 @@ class HabrApiClient(IApiClient):
 
         full_url = f"{self.url}?{urllib.parse.urlencode(api_params, doseq=True)}"
 
+        http = self.session or requests
         for attempt in range(self.retry_attempts):
             try:
-                response = requests.get(self.url, params=api_params, verify=False)
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
+                response = http.get(self.url, params=api_params, verify=False)
                 response.raise_for_status()
                 data = response.json()
 
@@ -58,8 +140,9 @@ class HabrApiClient(IApiClient):
                     logging.warning(f"Empty response for {full_url}")
                     return None
 
-                # Add delay between requests
-                time.sleep(random.uniform(self.delay_min, self.delay_max))
+                # Add delay between requests (shared limiter already spaced this one)
+                if not self.rate_limiter:
+                    time.sleep(random.uniform(self.delay_min, self.delay_max))
                 return data
 
             except Exception as e:
@@ -70,12 +153,73 @@ class HabrApiClient(IApiClient):
         return None
 
 
-class SalaryScraper(IScraper):
-    """Main scraper implementation"""
+def run_bounded(fn: Callable[[Any], None], items: Iterable[Any], workers: int) -> None:
+    """Run fn over items on a thread pool, pulling items lazily.
+
+    Unlike ``pool.map`` (which submits the whole iterable at once) at most ``2 * workers``
+    items are queued, so generated plans are never materialized. Re-raises the first
+    worker exception.
+    """
+    slots = threading.BoundedSemaphore(2 * workers)
+    errors: List[BaseException] = []
+
+    def done(future) -> None:
+        if future.exception() is not None:
+            errors.append(future.exception())
+        slots.release()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for item in items:
+            slots.acquire()
+            if errors:
+                break
+            pool.submit(fn, item).add_done_callback(done)
+    if errors:
+        raise errors[0]
+
+
+class _Progress:
+    """Thread-safe progress counter logging every 10 processed items"""
 
-    def __init__(self, repository: IRepository, api_client: IApiClient):
+    def __init__(self, total: Optional[int] = None):
+        self.total = total  # None for lazily generated plans
+        self.done = 0
+        self.success = 0
+        self._lock = threading.Lock()
+
+    def advance(self, success: bool) -> None:
+        with self._lock:
+            self.done += 1
+            if success:
+                self.success += 1
+            if self.done % 10 == 0:
+                done = self.done if self.total is None else f"{self.done}/{self.total}"
+                logging.info(f"  Progress: {done} ({self.success} successful)")
+
+
+class SalaryScraper(IScraper):
+    """Main scraper implementation
+
+    With ``workers > 1`` references (or CSV rows) are fanned out to a thread pool; the
+    API client and repository must then be thread-safe (shared rate limiter, pooled session).
+    References are resolved through a ``ReferenceCatalog`` (pass one to share it between runs).
+    With ``commit_per_type`` the reports of each finished reference type are committed as a
+    chunk of the run (see IRepository.commit_chunk) instead of waiting for the whole run.
+    """
+
+    def __init__(
+        self,
+        repository: IRepository,
+        api_client: IApiClient,
+        workers: int = 1,
+        catalog: Optional[ReferenceCatalog] = None,
+        commit_per_type: bool = False,
+    ):
         self.repository = repository
         self.api_client = api_client
+        self.workers = workers
+        self.catalog = catalog or ReferenceCatalog(repository)
+        self.commit_per_type = commit_per_type
 
     def scrape(self, config: ScrapingConfig) -> bool:
         """Execute scraping based on configuration"""
@@ -88,10 +232,15 @@ class SalaryScraper(IScraper):
             if config.combinations:
                 # Scrape specific combinations
                 logging.info(f"Scraping combinations: {config.combinations}")
-                for combination in config.combinations:
-                    count, success = self._scrape_combination(combination, transaction_id, transaction_timestamp)
-                    total_count += count
-                    success_count += success
+                if self.workers > 1:
+                    total_count, success_count = self._scrape_combinations_parallel(
+                        config.combinations, transaction_id, transaction_timestamp
+                    )
+                else:
+                    for combination in config.combinations:
+                        count, success = self._scrape_combination(combination, transaction_id, transaction_timestamp)
+                        total_count += count
+                        success_count += success
             else:
                 # Scrape individual reference types
                 logging.info(f"Scraping individual references: {config.reference_types}")
@@ -99,6 +248,8 @@ class SalaryScraper(IScraper):
                     count, success = self._scrape_reference_type(ref_type, transaction_id, transaction_timestamp)
                     total_count += count
                     success_count += success
+                    if self.commit_per_type and success:
+                        self.repository.commit_chunk(transaction_id)
 
             # Commit if any work was done
             if total_count == 0:
@@ -116,19 +267,25 @@ class SalaryScraper(IScraper):
 
     def _scrape_reference_type(self, ref_type: str, transaction_id: str, timestamp: datetime) -> tuple[int, int]:
         """Scrape single reference type"""
-        references = self.repository.get_references(ref_type)
+        references = self.catalog.get_references(ref_type)
         total = len(references)
         success = 0
 
         logging.info(f"Processing {total} {ref_type}")
 
-        for i, ref in enumerate(references):
-            params = self._build_params(ref_type, ref)
-            data = self.api_client.fetch_salary_data(**params)
+        if self.workers > 1:
+            progress = _Progress(total)
 
-            if data:
-                salary_data = SalaryData(data=data, reference_id=ref.id, reference_type=ref_type)
-                self.repository.save_report(salary_data, transaction_id, timestamp)
+            def scrape_one(ref: Reference) -> None:
+                progress.advance(self._scrape_reference(ref_type, ref, transaction_id, timestamp))
+
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                # list() re-raises worker exceptions
+                list(pool.map(scrape_one, references))
+            return total, progress.success
+
+        for i, ref in enumerate(references):
+            if self._scrape_reference(ref_type, ref, transaction_id, timestamp):
                 success += 1
 
             if (i + 1) % 10 == 0:
@@ -136,43 +293,49 @@ class SalaryScraper(IScraper):
 
         return total, success
 
+    def _scrape_reference(self, ref_type: str, ref: Reference, transaction_id: str, timestamp: datetime) -> bool:
+        """Fetch and save one reference, True if data was saved"""
+        params = self._build_params(ref_type, ref)
+        data = self.api_client.fetch_salary_data(**params)
+
+        if data:
+            salary_data = SalaryData(data=data, reference_id=ref.id, reference_type=ref_type)
+            self.repository.save_report(salary_data, transaction_id, timestamp)
+            return True
+        return False
+
+    def _scrape_combinations_parallel(self, combinations, transaction_id: str, timestamp: datetime) -> tuple[int, int]:
+        """Scrape CSV rows on the thread pool, returns aggregated (total, success)"""
+        progress = _Progress(len(combinations) if isinstance(combinations, Sized) else None)
+        totals = [0, 0]
+        lock = threading.Lock()
+
+        def scrape_one(combination) -> None:
+            count, success = self._scrape_combination(combination, transaction_id, timestamp)
+            with lock:
+                totals[0] += count
+                totals[1] += success
+            progress.advance(bool(success))
+
+        run_bounded(scrape_one, combinations, self.workers)
+        return totals[0], totals[1]
+
     def _scrape_combination(self, combination: tuple, transaction_id: str, timestamp: datetime) -> tuple[int, int]:
         """Scrape specific combination from CSV row"""
         logging.info(f"Processing combination: {combination}")
 
-        # Parse combination parameters
-        combined_params = {}
-        ref_data = []
-
         try:
-            for ref_type, value in combination:
-                # Find reference by alias/title
-                references = self.repository.get_references(ref_type)
-
-                # Look for reference by alias first, then by title
-                found_ref = None
-                for ref in references:
-                    if ref.alias.lower() == value.lower() or ref.title.lower() == value.lower():
-                        found_ref = ref
-                        break
-
-                if not found_ref:
-                    logging.warning(f"Reference not found: {ref_type}={value}")
-                    return 0, 0
-
-                # Build API parameters
-                params = self._build_params(ref_type, found_ref)
-                combined_params.update(params)
-                ref_data.append((ref_type, found_ref))
+            task = self._resolve_combination(combination)
+            if task is None:
+                return 0, 0
 
             # Call API once with combined parameters
-            logging.info(f"API call: {', '.join(f'{rt}={ref.title}' for rt, ref in ref_data)}")
-            data = self.api_client.fetch_salary_data(**combined_params)
+            logging.info(f"API call: {', '.join(f'{rt}={ref.title}' for rt, ref in task.references)}")
+            data = self.api_client.fetch_salary_data(**build_task_params(task))
 
             if data:
-                # Save data for each reference type in the combination
-                for ref_type, ref in ref_data:
-                    salary_data = SalaryData(data=data, reference_id=ref.id, reference_type=ref_type)
+                # One row with every reference of the combination
+                for salary_data in build_task_reports(task, data):
                     self.repository.save_report(salary_data, transaction_id, timestamp)
 
                 return 1, 1  # 1 combination processed, 1 successful
@@ -183,16 +346,41 @@ class SalaryScraper(IScraper):
             logging.error(f"Error processing combination: {e}")
             return 1, 0
 
+    def _resolve_combination(self, combination: tuple) -> Optional[ScrapeTask]:
+        """Resolve CSV row values to references, None if any value is unknown"""
+        references = []
+        for ref_type, value in combination:
+            if isinstance(value, Reference):  # Already resolved by a CombinationSpec
+                found_ref = value
+            else:
+                found_ref = self.catalog.find(ref_type, value)
+            if not found_ref:
+                logging.warning(f"Reference not found: {ref_type}={value}")
+                return None
+            references.append((ref_type, found_ref))
+        return ScrapeTask(references=references)
+
+    def _iter_tasks(self, config: ScrapingConfig) -> Iterator[ScrapeTask]:
+        """Resolve the run plan task by task (lazy combination plans stay lazy)"""
+        if config.combinations:
+            for combination in config.combinations:
+                try:
+                    task = self._resolve_combination(combination)
+                except ValueError as e:
+                    logging.error(f"Error processing combination: {e}")
+                    continue
+                if task is not None:
+                    yield task
+            return
+
+        for ref_type in config.reference_types:
+            for ref in self.catalog.get_references(ref_type):
+                yield ScrapeTask(references=[(ref_type, ref)])
+
+    def _plan_tasks(self, config: ScrapingConfig) -> List[ScrapeTask]:
+        """Resolve the whole run plan up front (used by engines that split it into shards)"""
+        return list(self._iter_tasks(config))
+
     def _build_params(self, ref_type: str, ref: Reference) -> Dict[str, Any]:
         """Build API parameters based on reference type"""
-        param_mapping = {
-            'specializations': ('spec_alias', ref.alias),
-            'skills': ('skill_aliases', [ref.alias]),
-            'regions': ('region_alias', ref.alias),  # mapped to locations[] in fetch
-            'companies': ('company_alias', ref.alias),
-        }
-
-        param_name, param_value = param_mapping.get(ref_type, (None, None))
-        if param_name:
-            return {param_name: param_value}
-        return {}
+        return build_params(ref_type, ref)
@@ -3,7 +3,7 @@
 import os
 from pathlib import Path
 from typing import Any, Dict, Union, Optional
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 
 # Flag to check if dotenv is available
 HAS_DOTENV = True
@@ -23,6 +23,8 @@ except ImportError:
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+DATABASE_BACKENDS = ("psycopg2", "psycopg3", "sqlite")
+
 
 @dataclass
 class DatabaseSettings:
@@ -39,6 +41,8 @@ class ApiSettings:
     delay_min: float = 1.5
     delay_max: float = 2.5
     retry_attempts: int = 3
+    # Global request budget shared by worker threads; None keeps delay_min..delay_max spacing
+    requests_per_second: Optional[float] = None
 
 
 @dataclass
@@ -46,6 +50,33 @@ class Settings:
     database: DatabaseSettings
     api: ApiSettings
     max_references: int = 2000
+    workers: int = 1  # Thread pool size for SalaryScraper
+    # Driver of the run's repository: psycopg2 (PostgresRepository), psycopg3 (Psycopg3Repository)
+    # or sqlite (SQLiteRepository on sqlite_path, no PostgreSQL needed)
+    database_backend: str = "psycopg2"
+    sqlite_path: str = "data/scraper.db"
+    # Rolling commits of a run (13_report_runs.sql): every N staged rows and/or after each reference type
+    commit_chunk_rows: Optional[int] = None
+    commit_per_reference_type: bool = False
+
+    def __post_init__(self):
+        if self.database_backend not in DATABASE_BACKENDS:
+            raise ValueError(f"Invalid database_backend: {self.database_backend}. Must be one of {DATABASE_BACKENDS}")
+
+    def create_repository(self):
+        """Repository for a scraping run on the configured backend (temp-table staging)"""
+        if self.database_backend == "sqlite":
+            from src.sqlite_repository import SQLiteRepository
+
+            return SQLiteRepository(self.sqlite_path)
+        if self.database_backend == "psycopg3":
+            from src.psycopg3_database import Psycopg3Repository
+
+            return Psycopg3Repository(asdict(self.database), chunk_rows=self.commit_chunk_rows)
+
+        from src.database import PostgresRepository
+
+        return PostgresRepository(asdict(self.database), chunk_rows=self.commit_chunk_rows)
 
     @classmethod
     def load(cls, yaml_path: Union[Path, str] = "config.yaml", env_file: str = ".env") -> "Settings":
@@ -70,11 +101,28 @@ class Settings:
                 delay_min=float(os.environ.get("API_DELAY_MIN", "1.5")),
                 delay_max=float(os.environ.get("API_DELAY_MAX", "2.5")),
                 retry_attempts=int(os.environ.get("API_RETRY_ATTEMPTS", "3")),
+                requests_per_second=(
+                    float(os.environ["API_REQUESTS_PER_SECOND"]) if os.environ.get("API_REQUESTS_PER_SECOND") else None
+                ),
             )
 
             max_refs = int(os.environ.get("MAX_REFERENCES", "2000"))
-
-            return cls(database=db_settings, api=api_settings, max_references=max_refs)
+            workers = int(os.environ.get("SCRAPER_WORKERS", "1"))
+            backend = os.environ.get("DATABASE_BACKEND", "psycopg2")
+            sqlite_path = os.environ.get("SQLITE_PATH", "data/scraper.db")
+            chunk_rows = int(os.environ["COMMIT_CHUNK_ROWS"]) if os.environ.get("COMMIT_CHUNK_ROWS") else None
+            per_type = os.environ.get("COMMIT_PER_REFERENCE_TYPE", "false").lower() == "true"
+
+            return cls(
+                database=db_settings,
+                api=api_settings,
+                max_references=max_refs,
+                workers=workers,
+                database_backend=backend,
+                sqlite_path=sqlite_path,
+                commit_chunk_rows=chunk_rows,
+                commit_per_reference_type=per_type,
+            )
 
         # Fall back to YAML file
         path = Path(yaml_path)
@@ -95,4 +143,9 @@ class Settings:
             database=DatabaseSettings(**db_data),
             api=ApiSettings(**api_data),
             max_references=config_data.get("max_references", 2000),
+            workers=config_data.get("workers", 1),
+            database_backend=config_data.get("database_backend", "psycopg2"),
+            sqlite_path=config_data.get("sqlite_path", "data/scraper.db"),
+            commit_chunk_rows=config_data.get("commit_chunk_rows"),
+            commit_per_reference_type=config_data.get("commit_per_reference_type", False),
         )
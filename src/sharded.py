@@ -0,0 +1,128 @@
+"""
+Multi-process sharded scraper sharing one request budget and one staging area
+"""
+
+import logging
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core import ScrapingConfig, ScrapeTask
+from src.database import PostgresRepository
+from src.rate_limit import SharedRateLimiter
+from src.reference_catalog import ReferenceCatalog
+from src.scraper import HabrApiClient, SalaryScraper, build_task_params, build_task_reports
+from src.settings import ApiSettings
+
+# Per-process state created by _init_worker
+_worker_repository: Optional[PostgresRepository] = None
+_worker_client: Optional[HabrApiClient] = None
+
+
+def _init_worker(db_config: Dict[str, Any], api: ApiSettings, rate_limiter: SharedRateLimiter) -> None:
+    """Process pool initializer: own DB pool and HTTP session, shared rate budget"""
+    global _worker_repository, _worker_client
+    _worker_repository = PostgresRepository(db_config, shared_staging=True)
+    _worker_client = HabrApiClient(api.url, api.delay_min, api.delay_max, api.retry_attempts, rate_limiter=rate_limiter)
+
+
+def _run_shard(tasks: List[ScrapeTask], transaction_id: str, timestamp: datetime) -> Tuple[int, int]:
+    """Fetch and stage one shard, returns (total, success)"""
+    assert _worker_repository is not None and _worker_client is not None
+    success = 0
+    for task in tasks:
+        data = _worker_client.fetch_salary_data(**build_task_params(task))
+        if not data:
+            continue
+        saved = [
+            _worker_repository.save_report(report, transaction_id, timestamp)
+            for report in build_task_reports(task, data)
+        ]
+        if all(saved):
+            success += 1
+    return len(tasks), success
+
+
+def split_shards(tasks: List[ScrapeTask], shard_count: int) -> List[List[ScrapeTask]]:
+    """Split plan into at most shard_count non-empty shards of similar size"""
+    shard_count = max(1, min(shard_count, len(tasks)))
+    return [tasks[i::shard_count] for i in range(shard_count) if tasks[i::shard_count]]
+
+
+class ShardedSalaryScraper(SalaryScraper):
+    """Scraper executing plan shards in worker processes.
+
+    Workers stage rows in the shared ``report_staging`` table under the parent's
+    transaction_id; the parent merges progress and commits once.
+    """
+
+    def __init__(
+        self,
+        repository: PostgresRepository,
+        api_settings: ApiSettings,
+        processes: Optional[int] = None,
+        shards_per_process: int = 4,
+        catalog: Optional[ReferenceCatalog] = None,
+    ):
+        if not repository.shared_staging:
+            raise ValueError("ShardedSalaryScraper requires PostgresRepository(shared_staging=True)")
+        super().__init__(repository, api_client=None, catalog=catalog)
+        self.api_settings = api_settings
+        self.processes = processes or os.cpu_count() or 1
+        self.shards_per_process = shards_per_process
+
+    def scrape(self, config: ScrapingConfig) -> bool:
+        """Execute scraping based on configuration"""
+        transaction_id = str(uuid.uuid4())
+        transaction_timestamp = datetime.now()  # Единая дата для всей транзакции
+
+        try:
+            tasks = self._plan_tasks(config)
+            total_count = len(tasks)
+            if total_count == 0:
+                logging.info("No data to scrape")
+                return True
+
+            shards = split_shards(tasks, self.processes * self.shards_per_process)
+            logging.info(f"Scraping {total_count} tasks in {len(shards)} shards on {self.processes} processes")
+            success_count = self._run_shards(shards, transaction_id, transaction_timestamp, total_count)
+
+            self.repository.commit_transaction(transaction_id)
+            logging.info(f"Sharded scraping completed: {success_count}/{total_count} successful")
+            return True
+
+        except Exception as e:
+            self.repository.rollback_transaction(transaction_id)
+            logging.error(f"Critical error during sharded scraping: {e}")
+            return False
+
+    def _create_rate_limiter(self, context) -> SharedRateLimiter:
+        api = self.api_settings
+        if api.requests_per_second:
+            return SharedRateLimiter.per_second(api.requests_per_second, context=context)
+        return SharedRateLimiter(api.delay_min, api.delay_max, context=context)
+
+    def _run_shards(self, shards: List[List[ScrapeTask]], transaction_id: str, timestamp: datetime, total: int) -> int:
+        # spawn: forked children would inherit (and on exit close) the parent's pooled DB sockets
+        context = multiprocessing.get_context("spawn")
+        rate_limiter = self._create_rate_limiter(context)
+        done = 0
+        success = 0
+
+        with ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.repository.config, self.api_settings, rate_limiter),
+        ) as pool:
+            futures = [pool.submit(_run_shard, shard, transaction_id, timestamp) for shard in shards]
+            for future in as_completed(futures):
+                shard_total, shard_success = future.result()
+                done += shard_total
+                success += shard_success
+                logging.info(f"  Progress: {done}/{total} ({success} successful)")
+
+        return success
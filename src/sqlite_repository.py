@@ -0,0 +1,551 @@
+"""
+Permanent repository on a local SQLite file (offline runs, single-file snapshots) and its sync to PostgreSQL
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from psycopg2.extras import execute_values
+
+from src.core import IRepository, Reference, SalaryData
+from src.database import REFERENCE_COLUMNS, RUN_PROGRESS, SALARY_FACTS_COLUMNS, insert_reports, run_progress_params
+
+# Same tables as the PostgreSQL schema after 14_report_natural_key.sql (without partitions,
+# runs and rollups): payloads stored once per content hash, a reports view, typed salary_facts.
+# The staging table keeps rows of open transactions in the same file.
+SCHEMA = (
+    "".join(
+        f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        alias TEXT NOT NULL UNIQUE,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_{table}_lower_alias ON {table}(lower(alias));
+    CREATE INDEX IF NOT EXISTS idx_{table}_lower_title ON {table}(lower(title));
+"""
+        for table in REFERENCE_COLUMNS
+    )
+    + """
+    CREATE TABLE IF NOT EXISTS report_staging (
+        id INTEGER PRIMARY KEY,
+        transaction_id TEXT NOT NULL,
+        specialization_id INTEGER,
+        skills_1 INTEGER,
+        region_id INTEGER,
+        company_id INTEGER,
+        payload_hash TEXT NOT NULL,
+        data TEXT NOT NULL,
+        fetched_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_report_staging_transaction ON report_staging(transaction_id);
+
+    CREATE TABLE IF NOT EXISTS report_payloads (
+        hash TEXT PRIMARY KEY,
+        data TEXT NOT NULL,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS report_rows (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        specialization_id INTEGER,
+        skills_1 INTEGER,
+        region_id INTEGER,
+        company_id INTEGER,
+        payload_hash TEXT NOT NULL REFERENCES report_payloads(hash),
+        fetched_at TEXT NOT NULL
+    );
+    -- Natural key: empty reference columns compare equal (as with COALESCE in PostgreSQL)
+    CREATE UNIQUE INDEX IF NOT EXISTS report_rows_natural_key ON report_rows(
+        fetched_at, ifnull(specialization_id, 0), ifnull(skills_1, 0), ifnull(region_id, 0), ifnull(company_id, 0)
+    );
+
+    CREATE VIEW IF NOT EXISTS reports AS
+    SELECT r.id, r.specialization_id, r.skills_1, r.region_id, r.company_id, p.data, r.fetched_at
+    FROM report_rows r
+    JOIN report_payloads p ON p.hash = r.payload_hash;
+
+    CREATE TABLE IF NOT EXISTS salary_facts (
+        report_id INTEGER NOT NULL REFERENCES report_rows(id),
+        group_index INTEGER NOT NULL,
+        specialization_id INTEGER,
+        skills_1 INTEGER,
+        region_id INTEGER,
+        company_id INTEGER,
+        level TEXT,
+        title TEXT,
+        total INTEGER,
+        median INTEGER,
+        min_salary INTEGER,
+        max_salary INTEGER,
+        salary_value INTEGER,
+        salary_bonus INTEGER,
+        fetched_at TEXT NOT NULL,
+        PRIMARY KEY (report_id, group_index)
+    );
+    CREATE INDEX IF NOT EXISTS idx_salary_facts_fetched_at ON salary_facts(fetched_at);
+    CREATE INDEX IF NOT EXISTS idx_salary_facts_level ON salary_facts(level, fetched_at);
+
+    CREATE TABLE IF NOT EXISTS report_log (
+        id INTEGER PRIMARY KEY,
+        report_date TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        report_type TEXT NOT NULL,
+        total_variants INTEGER NOT NULL,
+        success_count INTEGER NOT NULL,
+        duration_seconds INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        error_message TEXT
+    );
+
+    -- Highest report_rows.id pushed to each PostgreSQL database (sync_to_postgres)
+    CREATE TABLE IF NOT EXISTS sync_state (
+        target TEXT PRIMARY KEY,
+        last_report_id INTEGER NOT NULL,
+        synced_at TEXT NOT NULL
+    );
+"""
+)
+
+_NUMERIC_STRING = re.compile(r"^-?\d+(\.\d+)?$")
+
+
+def _salary_int(json_type: Optional[str], value: Any) -> Optional[int]:
+    """salary_int() of 09_salary_facts.sql: numbers and numeric strings rounded half away from zero"""
+    if json_type in ("integer", "real") or (json_type == "text" and _NUMERIC_STRING.match(value)):
+        return int(Decimal(str(value)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    return None
+
+
+def _fact(path: str) -> str:
+    return f"salary_int(json_type(g.value, '{path}'), json_extract(g.value, '{path}'))"
+
+
+# salary_facts of report rows with id > ? (SALARY_FACTS_SELECT with json_each; g.key is 0-based)
+_SALARY_FACTS_INSERT = f"""
+    INSERT INTO salary_facts ({SALARY_FACTS_COLUMNS})
+    SELECT r.id, g.key + 1, r.specialization_id, r.skills_1, r.region_id, r.company_id,
+           json_extract(g.value, '$.name'), json_extract(g.value, '$.title'),
+           {_fact('$.total')}, {_fact('$.median')}, {_fact('$.min')}, {_fact('$.max')},
+           {_fact('$.salary.value')}, {_fact('$.salary.bonus')},
+           r.fetched_at
+    FROM report_rows r
+    JOIN report_payloads p ON p.hash = r.payload_hash
+    JOIN json_each(p.data, '$.groups') g
+    WHERE r.id > ? AND json_type(p.data, '$.groups') = 'array'
+"""
+
+
+def payload_hash(data: Dict[str, Any]) -> str:
+    """Content hash of a payload (canonical JSON); local to the file, PostgreSQL hashes on sync"""
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.md5(canonical.encode("utf-8")).hexdigest()
+
+
+class SQLiteRepository(IRepository):
+    """IRepository on a single SQLite file: references, reports, report_log and salary_facts
+
+    Runs need no database server: reports are staged in the same file and moved to
+    report_rows/salary_facts in one local transaction on commit (replayed rows are skipped
+    by the natural key like in PostgreSQL). Reference tables are filled with
+    ``copy_references`` (snapshot of PostgreSQL, ids kept) or ``import_reference_rows``
+    (title/alias pairs from a file). ``sync_to_postgres`` pushes the reports later.
+
+    Thread-safe: one connection shared by scraper worker threads, serialized by a lock.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.create_function("salary_int", 2, _salary_int, deterministic=True)
+        # WAL: readers (reports) don't block the run; NORMAL sync is durable at checkpoints
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.RLock()
+        with self._lock:
+            self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the file"""
+        with self._lock:
+            self.conn.close()
+
+    @staticmethod
+    def _check_table(table_name: str) -> None:
+        if table_name not in REFERENCE_COLUMNS:
+            raise ValueError(f"Invalid table: {table_name}. Must be one of {list(REFERENCE_COLUMNS)}")
+
+    def _query(self, query: str, params: Tuple[Any, ...] = ()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def get_references(self, table_name: str, limit: Optional[int] = None) -> List[Reference]:
+        """Get references ordered by id (all of them unless ``limit`` is given)"""
+        self._check_table(table_name)
+        # LIMIT -1 means no limit
+        rows = self._query(
+            f"SELECT id, title, alias FROM {table_name} ORDER BY id LIMIT ?", (-1 if limit is None else limit,)
+        )
+        return [Reference(id=row[0], title=row[1], alias=row[2]) for row in rows]
+
+    def resolve_references(self, table_name: str, values: Iterable[str]) -> Dict[str, Reference]:
+        """Resolve values in one query (lower(alias)/lower(title) indexes); keyed by lowercased value"""
+        self._check_table(table_name)
+        wanted = sorted({value.strip().lower() for value in values})
+        if not wanted:
+            return {}
+
+        # One JSON array parameter instead of a placeholder per value
+        rows = self._query(
+            f"""
+            SELECT id, title, alias
+            FROM {table_name}
+            WHERE lower(alias) IN (SELECT value FROM json_each(?)) OR lower(title) IN (SELECT value FROM json_each(?))
+            ORDER BY id
+        """,
+            (json.dumps(wanted), json.dumps(wanted)),
+        )
+
+        by_alias: Dict[str, Reference] = {}
+        by_title: Dict[str, Reference] = {}
+        for row in rows:
+            ref = Reference(id=row[0], title=row[1], alias=row[2])
+            by_alias.setdefault(ref.alias.lower(), ref)
+            by_title.setdefault(ref.title.lower(), ref)
+        resolved = {value: by_alias.get(value) or by_title.get(value) for value in wanted}
+        return {value: ref for value, ref in resolved.items() if ref is not None}
+
+    def get_reference_version(self, table_name: str) -> Optional[Any]:
+        """Row count and checksum of a reference table"""
+        self._check_table(table_name)
+        count, rows = self._query(
+            f"SELECT COUNT(*), group_concat(line, ',') FROM "
+            f"(SELECT id || ':' || alias || ':' || title AS line FROM {table_name} ORDER BY id)"
+        )[0]
+        return count, hashlib.md5((rows or "").encode("utf-8")).hexdigest()
+
+    def get_latest_totals(self, table_name: str) -> Dict[int, int]:
+        """Vacancy total of the latest single-reference report per reference id"""
+        return {key[0]: total for key, total in self.get_latest_combination_totals([table_name]).items()}
+
+    def get_latest_combination_totals(self, table_names: Sequence[str]) -> Dict[Tuple[int, ...], int]:
+        """Vacancy total of the latest report of exactly these references, keyed by their ids in order"""
+        for table_name in table_names:
+            self._check_table(table_name)
+        columns = [REFERENCE_COLUMNS[table_name] for table_name in table_names]
+        key = ", ".join(columns)
+        conditions = " AND ".join(
+            f"{column} IS {'NOT NULL' if column in columns else 'NULL'}" for column in REFERENCE_COLUMNS.values()
+        )
+
+        rows = self._query(
+            f"""
+            SELECT {", ".join(f"l.{column}" for column in columns)},
+                   (SELECT MAX(f.total) FROM salary_facts f WHERE f.report_id = l.id)
+            FROM (
+                SELECT id, {key},
+                       row_number() OVER (PARTITION BY {key} ORDER BY fetched_at DESC, id DESC) AS n
+                FROM report_rows
+                WHERE {conditions}
+            ) l
+            WHERE l.n = 1
+        """
+        )
+        return {tuple(row[:-1]): row[-1] for row in rows if row[-1] is not None}
+
+    def copy_references(self, table_name: str, references: Iterable[Reference]) -> int:
+        """Store references with their ids (snapshot of another database); rows with a clashing alias are replaced"""
+        self._check_table(table_name)
+        with self._lock, self.conn:
+            cursor = self.conn.executemany(
+                f"INSERT OR REPLACE INTO {table_name} (id, title, alias) VALUES (?, ?, ?)",
+                ((ref.id, ref.title, ref.alias) for ref in references),
+            )
+            return cursor.rowcount
+
+    def import_reference_rows(self, table_name: str, rows: Iterable[Optional[Tuple[str, str]]]) -> int:
+        """Upsert ``(title, alias)`` pairs by alias (see read_reference_rows); returns the rows written"""
+        self._check_table(table_name)
+        with self._lock, self.conn:
+            cursor = self.conn.executemany(
+                f"""
+                INSERT INTO {table_name} (title, alias) VALUES (?, ?)
+                ON CONFLICT (alias) DO UPDATE SET title = excluded.title, updated_at = CURRENT_TIMESTAMP
+                WHERE title <> excluded.title
+            """,
+                (row for row in rows if row is not None),
+            )
+            return cursor.rowcount
+
+    def save_report(self, data: SalaryData, transaction_id: str, timestamp: Optional[datetime] = None) -> bool:
+        """Stage report for the transaction (one row with every reference of a combination)"""
+        reference_ids = data.reference_ids
+        if not reference_ids or any(ref_type not in REFERENCE_COLUMNS for ref_type in reference_ids):
+            return False
+
+        try:
+            with self._lock, self.conn:
+                self.conn.execute(
+                    """
+                    INSERT INTO report_staging
+                        (transaction_id, specialization_id, skills_1, region_id, company_id, payload_hash, data, fetched_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                    (
+                        transaction_id,
+                        *(reference_ids.get(ref_type) for ref_type in REFERENCE_COLUMNS),
+                        payload_hash(data.data),
+                        json.dumps(data.data, ensure_ascii=False),
+                        (timestamp or datetime.now()).isoformat(),
+                    ),
+                )
+            return True
+        except Exception as e:
+            logging.error(f"Error saving report to SQLite staging: {e}")
+            return False
+
+    def _move_staged(self, transaction_id: str) -> int:
+        """Move the transaction's staged rows to report_rows/salary_facts (caller holds the lock and a transaction)"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM report_staging WHERE transaction_id = ?", (transaction_id,))
+        count = cursor.fetchone()[0]
+        if not count:
+            return 0
+
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO report_payloads (hash, data)
+            SELECT payload_hash, data FROM report_staging WHERE transaction_id = ?
+        """,
+            (transaction_id,),
+        )
+        last_id = cursor.execute("SELECT ifnull(MAX(id), 0) FROM report_rows").fetchone()[0]
+        cursor.execute(
+            """
+            INSERT INTO report_rows (specialization_id, skills_1, region_id, company_id, payload_hash, fetched_at)
+            SELECT specialization_id, skills_1, region_id, company_id, payload_hash, fetched_at
+            FROM report_staging
+            WHERE transaction_id = ?
+            ORDER BY id
+            -- Replayed rows (same references and run timestamp) are skipped, and so are their facts
+            ON CONFLICT DO NOTHING
+        """,
+            (transaction_id,),
+        )
+        # AUTOINCREMENT ids only grow, so the rows just inserted are the ones above last_id
+        cursor.execute(_SALARY_FACTS_INSERT, (last_id,))
+        cursor.execute("DELETE FROM report_staging WHERE transaction_id = ?", (transaction_id,))
+        cursor.execute(
+            """
+            INSERT INTO report_log (report_date, report_type, total_variants, success_count, duration_seconds, status)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """,
+            (datetime.now().isoformat(), 'batch_import', count, count, 0, 'success'),
+        )
+        return count
+
+    def commit_chunk(self, transaction_id: str) -> int:
+        """Move the rows staged so far while the transaction continues; returns their count"""
+        with self._lock, self.conn:
+            count = self._move_staged(transaction_id)
+        if count:
+            logging.info(f"Committed chunk of {count} reports for transaction {transaction_id}")
+        return count
+
+    def commit_transaction(self, transaction_id: str) -> None:
+        """Move staged data to the permanent tables in one local transaction"""
+        with self._lock, self.conn:
+            count = self._move_staged(transaction_id)
+        if count:
+            logging.info(f"Successfully committed {count} reports to {self.path}")
+        else:
+            logging.info("No data to commit")
+
+    def rollback_transaction(self, transaction_id: str) -> None:
+        """Discard the transaction's staged rows"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM report_staging WHERE transaction_id = ?", (transaction_id,))
+        logging.info(f"Rolled back transaction {transaction_id}")
+
+    def transaction_exists(self, transaction_id: str) -> bool:
+        """Check if transaction has staged rows"""
+        rows = self._query("SELECT 1 FROM report_staging WHERE transaction_id = ? LIMIT 1", (transaction_id,))
+        return bool(rows)
+
+
+@dataclass
+class SyncResult:
+    """Outcome of pushing a SQLite file to PostgreSQL"""
+
+    target: str
+    rows: int = 0  # Report rows read from the file
+    pushed: int = 0  # Rows sent (rows PostgreSQL already had are skipped by its natural key)
+    # Rows left for the next sync: the first row with references unknown to PostgreSQL and all after it
+    pending: int = 0
+    batches: int = 0
+
+
+class _ReferenceMap:
+    """SQLite reference id -> PostgreSQL id, matched by alias (files may be filled offline with other ids)"""
+
+    def __init__(self, source: SQLiteRepository, target):
+        self.source = source
+        self.target = target
+        self.ids: Dict[str, Dict[int, Optional[int]]] = {table: {} for table in REFERENCE_COLUMNS}
+
+    def resolve(self, rows: List[Tuple[Any, ...]]) -> None:
+        """Look up the ids of ``rows`` (reference columns first) that are not mapped yet"""
+        for position, table in enumerate(REFERENCE_COLUMNS):
+            known = self.ids[table]
+            missing = {row[position] for row in rows if row[position] is not None and row[position] not in known}
+            if not missing:
+                continue
+            aliases = dict(
+                self.source._query(
+                    f"SELECT id, alias FROM {table} WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(sorted(missing)),),
+                )
+            )
+            resolved = self.target.resolve_references(table, aliases.values())
+            for local_id in missing:
+                ref = resolved.get(aliases.get(local_id, "").strip().lower())
+                known[local_id] = ref.id if ref else None
+                if ref is None:
+                    logging.warning(f"{table} {aliases.get(local_id, local_id)!r} not found in PostgreSQL")
+
+    def translate(self, row: Tuple[Any, ...]) -> Optional[Tuple[Any, ...]]:
+        ids = []
+        for position, table in enumerate(REFERENCE_COLUMNS):
+            if row[position] is None:
+                ids.append(None)
+            elif self.ids[table].get(row[position]) is None:
+                return None
+            else:
+                ids.append(self.ids[table][row[position]])
+        return (*ids, *row[len(REFERENCE_COLUMNS) :])
+
+
+def sync_to_postgres(source: SQLiteRepository, target, batch_size: int = 5000) -> SyncResult:
+    """Push report rows of ``source`` not yet sent to ``target`` (a PostgresRepository).
+
+    Rows go in id order, ``batch_size`` per PostgreSQL transaction, through the same
+    insert_reports statements as a scrape commit (payload dedup, natural key, salary_facts);
+    the whole sync is one run in report_runs. After each batch the file records the last
+    pushed id for this target, so an interrupted sync resumes where it stopped, and a batch
+    pushed twice is skipped by the natural key. Reference ids are translated by alias; the sync
+    stops before the first row whose references PostgreSQL does not know, so that row and the
+    ones after it are pushed by a later sync once the references are imported there.
+    """
+    config = target.config
+    key = f"{config.get('host')}:{config.get('port')}/{config.get('database')}"
+    result = SyncResult(target=key)
+    state = source._query("SELECT last_report_id FROM sync_state WHERE target = ?", (key,))
+    last_id = state[0][0] if state else 0
+    high = source._query("SELECT ifnull(MAX(id), 0) FROM report_rows")[0][0]
+    if high <= last_id:
+        logging.info(f"Nothing to sync to {key}")
+        return result
+
+    run_id = f"sqlite-sync-{uuid.uuid4()}"
+    references = _ReferenceMap(source, target)
+    while last_id < high:
+        rows = source._query(
+            """
+            SELECT r.specialization_id, r.skills_1, r.region_id, r.company_id, p.data, r.fetched_at, r.id
+            FROM report_rows r
+            JOIN report_payloads p ON p.hash = r.payload_hash
+            WHERE r.id > ? AND r.id <= ?
+            ORDER BY r.id
+            LIMIT ?
+        """,
+            (last_id, high, batch_size),
+        )
+        references.resolve(rows)
+        translated = []
+        for row in rows:
+            pushed = references.translate(row[:-1])
+            if pushed is None:
+                break
+            translated.append(pushed)
+        blocked = len(translated) < len(rows)
+        # The high-water mark never passes an untranslated row
+        batch_last = rows[len(translated) - 1][-1] if translated else last_id
+
+        with target.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    """
+                    CREATE TEMPORARY TABLE sqlite_sync (
+                        specialization_id INTEGER,
+                        skills_1 INTEGER,
+                        region_id INTEGER,
+                        company_id INTEGER,
+                        data JSONB NOT NULL,
+                        fetched_at TIMESTAMP NOT NULL
+                    ) ON COMMIT DROP
+                """
+                )
+                if translated:
+                    execute_values(
+                        cursor,
+                        "INSERT INTO sqlite_sync (specialization_id, skills_1, region_id, company_id, data, fetched_at) "
+                        "VALUES %s",
+                        translated,
+                        page_size=1000,
+                    )
+                complete = blocked or batch_last >= high
+                cursor.execute(RUN_PROGRESS, run_progress_params(run_id, len(translated), complete=complete))
+                if translated:
+                    insert_reports(cursor, "sqlite_sync")
+                    cursor.execute(
+                        """
+                        INSERT INTO report_log (report_date, report_type, total_variants, success_count, duration_seconds, status)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                    """,
+                        (datetime.now(), 'sqlite_sync', len(rows), len(translated), 0, 'success'),
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        with source._lock, source.conn:
+            source.conn.execute(
+                """
+                INSERT INTO sync_state (target, last_report_id, synced_at) VALUES (?, ?, ?)
+                ON CONFLICT (target) DO UPDATE SET last_report_id = excluded.last_report_id, synced_at = excluded.synced_at
+            """,
+                (key, batch_last, datetime.now().isoformat()),
+            )
+        last_id = batch_last
+        result.rows += len(rows)
+        result.pushed += len(translated)
+        result.batches += 1
+        if blocked:
+            result.pending = source._query(
+                "SELECT COUNT(*) FROM report_rows WHERE id > ? AND id <= ?", (last_id, high)
+            )[0][0]
+            logging.warning(
+                f"Stopped before report {rows[len(translated)][-1]}: unknown references, "
+                f"{result.pending} reports left for the next sync"
+            )
+            break
+        logging.info(f"Pushed {result.pushed}/{result.rows} reports to {key}")
+
+    return result
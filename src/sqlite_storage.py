@@ -4,11 +4,12 @@ Alternative implementation of temporary storage using SQLite
 
 import logging
 import sqlite3
+import threading
 import tempfile
 import os
 import json
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional
 from pathlib import Path
 
 from src.core import IRepository, Reference, SalaryData
@@ -26,8 +27,9 @@ class SQLiteTemporaryStorage:
         self.db_path = self.temp_file.name
         self.temp_file.close()  # Close file but don't delete
 
-        # Connect to SQLite
-        self.conn = sqlite3.connect(self.db_path)
+        # Connect to SQLite (shared by scraper worker threads, writes serialized by lock)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.Lock()
         self._create_temp_table()
 
     def _create_temp_table(self):
@@ -58,10 +60,14 @@ class SQLiteTemporaryStorage:
 
     def save_report(self, data: SalaryData, timestamp: Optional[datetime] = None) -> bool:
         """Save data to temporary storage"""
+        with self._lock:
+            return self._save_report(data, timestamp)
+
+    def _save_report(self, data: SalaryData, timestamp: Optional[datetime] = None) -> bool:
         try:
             cursor = self.conn.cursor()
 
-            # Determine field for insertion
+            # Reference type -> column
             field_mapping = {
                 'specializations': 'specialization_id',
                 'skills': 'skills_1',
@@ -69,43 +75,22 @@ class SQLiteTemporaryStorage:
                 'companies': 'company_id',
             }
 
-            field_name = field_mapping.get(data.reference_type)
-            if not field_name:
+            reference_ids = data.reference_ids
+            if not reference_ids or any(ref_type not in field_mapping for ref_type in reference_ids):
                 return False
 
-            # Build SQL with correct field
-            if field_name == 'specialization_id':
-                cursor.execute(
-                    """
-                    INSERT INTO temp_reports (specialization_id, skills_1, region_id, company_id, data, fetched_at)
-                    VALUES (?, NULL, NULL, NULL, ?, ?)
-                """,
-                    (data.reference_id, json.dumps(data.data), (timestamp or datetime.now()).isoformat()),
-                )
-            elif field_name == 'skills_1':
-                cursor.execute(
-                    """
-                    INSERT INTO temp_reports (specialization_id, skills_1, region_id, company_id, data, fetched_at)
-                    VALUES (NULL, ?, NULL, NULL, ?, ?)
-                """,
-                    (data.reference_id, json.dumps(data.data), (timestamp or datetime.now()).isoformat()),
-                )
-            elif field_name == 'region_id':
-                cursor.execute(
-                    """
-                    INSERT INTO temp_reports (specialization_id, skills_1, region_id, company_id, data, fetched_at)
-                    VALUES (NULL, NULL, ?, NULL, ?, ?)
-                """,
-                    (data.reference_id, json.dumps(data.data), (timestamp or datetime.now()).isoformat()),
-                )
-            elif field_name == 'company_id':
-                cursor.execute(
-                    """
-                    INSERT INTO temp_reports (specialization_id, skills_1, region_id, company_id, data, fetched_at)
-                    VALUES (NULL, NULL, NULL, ?, ?, ?)
-                """,
-                    (data.reference_id, json.dumps(data.data), (timestamp or datetime.now()).isoformat()),
-                )
+            # One row with every reference of the combination, other fields stay NULL
+            cursor.execute(
+                """
+                INSERT INTO temp_reports (specialization_id, skills_1, region_id, company_id, data, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    *(reference_ids.get(ref_type) for ref_type in field_mapping),
+                    json.dumps(data.data),
+                    (timestamp or datetime.now()).isoformat(),
+                ),
+            )
 
             self.conn.commit()
             cursor.close()
@@ -158,18 +143,41 @@ class PostgresRepositoryWithSQLite(IRepository):
 
         self.postgres_repo = PostgresRepository(config)
         self.temp_storages: dict[str, SQLiteTemporaryStorage] = {}
+        self._storages_lock = threading.Lock()
 
-    def get_references(self, table_name: str, limit: int = 2000) -> List[Reference]:
+    def get_references(self, table_name: str, limit: Optional[int] = None) -> List[Reference]:
         """Get references from PostgreSQL"""
         return self.postgres_repo.get_references(table_name, limit)
 
+    def iter_references(self, table_name: str) -> Iterator[Reference]:
+        """Stream references from PostgreSQL"""
+        return self.postgres_repo.iter_references(table_name)
+
+    def resolve_references(self, table_name: str, values) -> Dict[str, Reference]:
+        """Resolve reference values in PostgreSQL"""
+        return self.postgres_repo.resolve_references(table_name, values)
+
+    def get_reference_version(self, table_name: str):
+        """Get reference table fingerprint from PostgreSQL"""
+        return self.postgres_repo.get_reference_version(table_name)
+
+    def get_latest_totals(self, table_name: str) -> Dict[int, int]:
+        """Get latest vacancy totals from PostgreSQL"""
+        return self.postgres_repo.get_latest_totals(table_name)
+
+    def get_latest_combination_totals(self, table_names):
+        """Get latest vacancy totals of combinations from PostgreSQL"""
+        return self.postgres_repo.get_latest_combination_totals(table_names)
+
     def save_report(self, data: SalaryData, transaction_id: str, timestamp: Optional[datetime] = None) -> bool:
         """Save to temporary SQLite storage"""
         # Create SQLite storage if not exists
-        if transaction_id not in self.temp_storages:
-            self.temp_storages[transaction_id] = SQLiteTemporaryStorage(transaction_id)
+        with self._storages_lock:
+            if transaction_id not in self.temp_storages:
+                self.temp_storages[transaction_id] = SQLiteTemporaryStorage(transaction_id)
+            storage = self.temp_storages[transaction_id]
 
-        return self.temp_storages[transaction_id].save_report(data, timestamp)
+        return storage.save_report(data, timestamp)
 
     def commit_transaction(self, transaction_id: str) -> None:
         """Transfer data from SQLite to PostgreSQL"""
@@ -195,31 +203,34 @@ class PostgresRepositoryWithSQLite(IRepository):
             cursor.execute("BEGIN")
 
             try:
-                # Transfer data in batches
+                # Transfer data in batches into a session staging table, then store it like
+                # PostgreSQL staging (payloads deduplicated by content hash)
                 from psycopg2.extras import execute_values
+                from src.database import RUN_PROGRESS, insert_reports, run_progress_params
 
-                batch_data = []
-                for row in reports:
-                    # row: (specialization_id, skills_1, region_id, company_id, data, fetched_at)
-                    batch_data.append(
-                        (
-                            row[0],  # specialization_id
-                            row[1],  # skills_1
-                            row[2],  # region_id
-                            row[3],  # company_id
-                            row[4],  # data (JSON string)
-                            row[5],  # fetched_at
-                        )
-                    )
-
+                cursor.execute(
+                    """
+                    CREATE TEMPORARY TABLE sqlite_import (
+                        specialization_id INTEGER,
+                        skills_1 INTEGER,
+                        region_id INTEGER,
+                        company_id INTEGER,
+                        data JSONB NOT NULL,
+                        fetched_at TIMESTAMP NOT NULL
+                    ) ON COMMIT DROP
+                """
+                )
+                # row: (specialization_id, skills_1, region_id, company_id, data (JSON string), fetched_at)
                 execute_values(
                     cursor,
-                    """INSERT INTO reports (specialization_id, skills_1, region_id, company_id, data, fetched_at)
+                    """INSERT INTO sqlite_import (specialization_id, skills_1, region_id, company_id, data, fetched_at)
                        VALUES %s""",
-                    batch_data,
+                    reports,
                     template=None,
                     page_size=1000,
                 )
+                cursor.execute(RUN_PROGRESS, run_progress_params(transaction_id, count, complete=True))
+                insert_reports(cursor, "sqlite_import")
 
                 # Log operation
                 cursor.execute(
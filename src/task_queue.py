@@ -0,0 +1,408 @@
+"""
+Postgres-backed distributed work queue for multi-node scraping
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, List, Optional, Set
+
+from psycopg2.extras import Json, execute_values
+
+from src.core import IApiClient, Reference, ScrapingConfig, ScrapeTask
+from src.database import PostgresRepository
+from src.reference_catalog import ReferenceCatalog
+from src.scraper import SalaryScraper, build_task_params, build_task_reports
+
+
+@dataclass
+class ScrapeRun:
+    """Run state and task counters"""
+
+    run_id: str
+    status: str
+    run_timestamp: datetime
+    total_tasks: int
+    pending: int = 0
+    leased: int = 0
+    done: int = 0
+    failed: int = 0
+
+
+@dataclass
+class ClaimedTask:
+    """Task leased by a worker"""
+
+    id: int
+    task: ScrapeTask
+
+
+def task_to_payload(task: ScrapeTask) -> list:
+    """Serialize task for the scrape_tasks.payload column"""
+    return [
+        {"ref_type": ref_type, "id": ref.id, "title": ref.title, "alias": ref.alias}
+        for ref_type, ref in task.references
+    ]
+
+
+def task_from_payload(payload: list) -> ScrapeTask:
+    """Deserialize scrape_tasks.payload"""
+    return ScrapeTask(
+        references=[(item["ref_type"], Reference(item["id"], item["title"], item["alias"])) for item in payload]
+    )
+
+
+class PostgresTaskQueue:
+    """Queue of scrape tasks shared by all replicas through the scrape_tasks table
+
+    Tasks are claimed in batches with ``FOR UPDATE SKIP LOCKED`` under a time-limited lease;
+    leases expired without a heartbeat are handed out again (up to ``max_attempts``).
+    """
+
+    def __init__(self, repository: PostgresRepository, lease_seconds: int = 300, max_attempts: int = 3):
+        if not repository.shared_staging:
+            raise ValueError("PostgresTaskQueue requires PostgresRepository(shared_staging=True)")
+        self.repository = repository
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def create_run(self, tasks: Iterable[ScrapeTask], run_id: Optional[str] = None, batch_size: int = 1000) -> str:
+        """Enqueue a run; its run_id is also the staging transaction_id"""
+        run_id = run_id or str(uuid.uuid4())
+        with self.repository.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "INSERT INTO scrape_runs (run_id, run_timestamp) VALUES (%s, %s)", (run_id, datetime.now())
+                )
+                total = 0
+                batch: List[tuple] = []
+                for task in tasks:
+                    batch.append((run_id, Json(task_to_payload(task))))
+                    if len(batch) >= batch_size:
+                        execute_values(cursor, "INSERT INTO scrape_tasks (run_id, payload) VALUES %s", batch)
+                        total += len(batch)
+                        batch = []
+                if batch:
+                    execute_values(cursor, "INSERT INTO scrape_tasks (run_id, payload) VALUES %s", batch)
+                    total += len(batch)
+                cursor.execute("UPDATE scrape_runs SET total_tasks = %s WHERE run_id = %s", (total, run_id))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        logging.info(f"Enqueued run {run_id} with {total} tasks")
+        return run_id
+
+    def get_run(self, run_id: str) -> Optional[ScrapeRun]:
+        """Run state with per-status task counts"""
+        with self.repository.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT r.run_id, r.status, r.run_timestamp, r.total_tasks,
+                       COUNT(*) FILTER (WHERE t.status = 'pending'),
+                       COUNT(*) FILTER (WHERE t.status = 'leased'),
+                       COUNT(*) FILTER (WHERE t.status = 'done'),
+                       COUNT(*) FILTER (WHERE t.status = 'failed')
+                FROM scrape_runs r
+                LEFT JOIN scrape_tasks t ON t.run_id = r.run_id
+                WHERE r.run_id = %s
+                GROUP BY r.run_id
+            """,
+                (run_id,),
+            )
+            row = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+        return ScrapeRun(*row) if row else None
+
+    def active_run_id(self) -> Optional[str]:
+        """Oldest run that is still being worked on"""
+        with self.repository.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT run_id FROM scrape_runs WHERE status = 'running' ORDER BY created_at LIMIT 1")
+            row = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+        return row[0] if row else None
+
+    def requeue_expired(self, run_id: Optional[str] = None) -> int:
+        """Return tasks with expired leases to the queue (or fail them after max_attempts)"""
+        with self.repository.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE scrape_tasks
+                SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                    leased_by = NULL, lease_expires_at = NULL, updated_at = NOW()
+                WHERE status = 'leased' AND lease_expires_at < NOW()
+                  AND (%s::varchar IS NULL OR run_id = %s)
+            """,
+                (self.max_attempts, run_id, run_id),
+            )
+            count = cursor.rowcount
+            conn.commit()
+            cursor.close()
+        if count:
+            logging.warning(f"Re-queued {count} tasks with expired leases")
+        return count
+
+    def claim(self, run_id: str, worker_id: str, batch_size: int = 10) -> List[ClaimedTask]:
+        """Lease up to batch_size pending tasks (expired leases are claimable as well)"""
+        with self.repository.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    """
+                    UPDATE scrape_tasks t
+                    SET status = 'leased', leased_by = %s, attempts = t.attempts + 1,
+                        lease_expires_at = NOW() + make_interval(secs => %s), updated_at = NOW()
+                    WHERE t.id IN (
+                        SELECT id FROM scrape_tasks
+                        WHERE run_id = %s
+                          AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < NOW()))
+                          AND attempts < %s
+                        ORDER BY id
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING t.id, t.payload
+                """,
+                    (worker_id, self.lease_seconds, run_id, self.max_attempts, batch_size),
+                )
+                rows = cursor.fetchall()
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        return [ClaimedTask(id=row[0], task=task_from_payload(row[1])) for row in rows]
+
+    def heartbeat(self, worker_id: str, task_ids: Iterable[int]) -> None:
+        """Extend leases of tasks still held by the worker"""
+        ids = list(task_ids)
+        if not ids:
+            return
+        with self.repository.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE scrape_tasks
+                SET lease_expires_at = NOW() + make_interval(secs => %s), updated_at = NOW()
+                WHERE id = ANY(%s) AND leased_by = %s AND status = 'leased'
+            """,
+                (self.lease_seconds, ids, worker_id),
+            )
+            conn.commit()
+            cursor.close()
+
+    def complete(self, task_id: int, worker_id: str, success: bool) -> bool:
+        """Mark a leased task done; False if the lease was lost to another worker"""
+        with self.repository.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE scrape_tasks
+                SET status = 'done', success = %s, leased_by = NULL, lease_expires_at = NULL, updated_at = NOW()
+                WHERE id = %s AND leased_by = %s AND status = 'leased'
+            """,
+                (success, task_id, worker_id),
+            )
+            updated = cursor.rowcount == 1
+            conn.commit()
+            cursor.close()
+        return updated
+
+    def try_finalize(self, run_id: str) -> bool:
+        """Commit the run's staging once all tasks are finished.
+
+        The staged rows are moved and the run marked completed in the same database
+        transaction that holds the run's row lock, so concurrent finalizers serialize and a
+        crash rolls back both: the run stays 'running' with its rows still staged, and the
+        next try_finalize commits it. Returns True if this call completed the run.
+        """
+        self.requeue_expired(run_id)
+        with self.repository.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT status FROM scrape_runs WHERE run_id = %s FOR UPDATE", (run_id,))
+                row = cursor.fetchone()
+                if not row or row[0] != 'running':
+                    conn.rollback()
+                    return False
+
+                cursor.execute(
+                    "SELECT 1 FROM scrape_tasks WHERE run_id = %s AND status IN ('pending', 'leased') LIMIT 1",
+                    (run_id,),
+                )
+                if cursor.fetchone():
+                    conn.rollback()
+                    return False
+
+                count = self.repository.finish_transaction(cursor, run_id)
+                cursor.execute(
+                    "UPDATE scrape_runs SET status = 'completed', finished_at = NOW() WHERE run_id = %s", (run_id,)
+                )
+                conn.commit()
+                logging.info(f"Run {run_id} committed ({count} reports in the final chunk)")
+                return True
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def fail_run(self, run_id: str) -> None:
+        """Abort a run and drop its staged rows"""
+        with self.repository.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE scrape_runs SET status = 'failed', finished_at = NOW() WHERE run_id = %s AND status = 'running'",
+                (run_id,),
+            )
+            conn.commit()
+            cursor.close()
+        self.repository.rollback_transaction(run_id)
+
+
+class QueueWorker:
+    """Worker loop: claim task batches, scrape them, stage rows, finalize the run"""
+
+    def __init__(
+        self,
+        queue: PostgresTaskQueue,
+        api_client: IApiClient,
+        worker_id: Optional[str] = None,
+        batch_size: int = 10,
+        poll_interval: float = 5.0,
+    ):
+        self.queue = queue
+        self.repository = queue.repository
+        self.api_client = api_client
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._held: Set[int] = set()
+        self._held_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self, run_id: str) -> bool:
+        """Work on the run until no tasks are left; True if the run ended completed"""
+        run = self.queue.get_run(run_id)
+        if run is None:
+            raise ValueError(f"Unknown run: {run_id}")
+
+        logging.info(f"Worker {self.worker_id} joined run {run_id}")
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="queue-heartbeat", daemon=True)
+        heartbeat.start()
+        processed = 0
+        success = 0
+        try:
+            while True:
+                claimed = self.queue.claim(run_id, self.worker_id, self.batch_size)
+                if not claimed:
+                    if self.queue.try_finalize(run_id):
+                        break
+                    state = self.queue.get_run(run_id)
+                    if state is None or state.status != 'running':
+                        break
+                    # Other workers still hold leases: wait for them (or for their leases to expire)
+                    time.sleep(self.poll_interval)
+                    continue
+
+                with self._held_lock:
+                    self._held.update(item.id for item in claimed)
+                for item in claimed:
+                    ok = self._process(item.task, run_id, run.run_timestamp)
+                    self.queue.complete(item.id, self.worker_id, ok)
+                    with self._held_lock:
+                        self._held.discard(item.id)
+                    processed += 1
+                    success += int(ok)
+                    if processed % 10 == 0:
+                        logging.info(f"  Progress ({self.worker_id}): {processed} processed ({success} successful)")
+        finally:
+            self._stop.set()
+
+        final = self.queue.get_run(run_id)
+        logging.info(f"Worker {self.worker_id} finished: {success}/{processed} successful")
+        return final is not None and final.status == 'completed'
+
+    def _process(self, task: ScrapeTask, run_id: str, timestamp: datetime) -> bool:
+        try:
+            data = self.api_client.fetch_salary_data(**build_task_params(task))
+            if not data:
+                return False
+            return all(
+                [self.repository.save_report(report, run_id, timestamp) for report in build_task_reports(task, data)]
+            )
+        except Exception as e:
+            logging.error(f"Error processing task: {e}")
+            return False
+
+    def _heartbeat_loop(self) -> None:
+        interval = max(1.0, self.queue.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            with self._held_lock:
+                held = list(self._held)
+            try:
+                self.queue.heartbeat(self.worker_id, held)
+            except Exception as e:
+                logging.warning(f"Heartbeat failed: {e}")
+
+
+class QueuedSalaryScraper(SalaryScraper):
+    """Scraper publishing its plan to the shared task queue and working on it locally.
+
+    Other replicas attach to the same run with ``join()``; whichever worker finishes the
+    last task commits the run.
+    """
+
+    def __init__(
+        self,
+        queue: PostgresTaskQueue,
+        api_client: IApiClient,
+        worker_id: Optional[str] = None,
+        batch_size: int = 10,
+        catalog: Optional[ReferenceCatalog] = None,
+    ):
+        super().__init__(queue.repository, api_client, catalog=catalog)
+        self.queue = queue
+        self.worker_id = worker_id
+        self.batch_size = batch_size
+
+    def enqueue(self, config: ScrapingConfig, run_id: Optional[str] = None) -> str:
+        """Resolve the plan and publish it as a new run"""
+        return self.queue.create_run(self._iter_tasks(config), run_id)
+
+    def scrape(self, config: ScrapingConfig) -> bool:
+        """Execute scraping based on configuration"""
+        try:
+            run_id = self.enqueue(config)
+        except Exception as e:
+            logging.error(f"Critical error while enqueueing run: {e}")
+            return False
+        return self.join(run_id)
+
+    def join(self, run_id: Optional[str] = None) -> bool:
+        """Work on the given (or oldest active) run until it is finished"""
+        run_id = run_id or self.queue.active_run_id()
+        if run_id is None:
+            logging.info("No active run to join")
+            return True
+        worker = QueueWorker(self.queue, self.api_client, self.worker_id, self.batch_size)
+        try:
+            return worker.run(run_id)
+        except Exception as e:
+            logging.error(f"Critical error in queue worker: {e}")
+            return False
@@ -0,0 +1,8 @@
+"""
+Test-wide settings: unreachable databases fail on the first connection attempt
+"""
+
+import os
+
+os.environ.setdefault("DATABASE_CONNECT_RETRIES", "0")
+os.environ.setdefault("DATABASE_RETRY_DELAY", "0")
@@ -0,0 +1,115 @@
+"""Tests for AsyncPostgresRepository"""
+
+import asyncpg
+import pytest
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+from src.async_database import AsyncPostgresRepository
+from src.core import SalaryData
+
+
+def _mock_pool():
+    conn = Mock()
+    conn.execute = AsyncMock()
+    conn.copy_records_to_table = AsyncMock()
+    conn.transaction.return_value = MagicMock(__aenter__=AsyncMock(), __aexit__=AsyncMock(return_value=False))
+    pool = Mock()
+    pool.acquire = AsyncMock(return_value=conn)
+    pool.release = AsyncMock()
+    pool.close = AsyncMock()
+    return pool, conn
+
+
+def _report(ref_id=1, **combination):
+    return SalaryData(
+        data={"groups": [{"name": "junior"}]}, reference_id=ref_id, reference_type="skills", combination=combination
+    )
+
+
+@pytest.mark.asyncio
+async def test_reports_copied_in_batches():
+    pool, conn = _mock_pool()
+    repo = AsyncPostgresRepository({}, batch_size=2)
+    with patch("src.async_database.asyncpg.create_pool", AsyncMock(return_value=pool)):
+        for i in range(5):
+            assert await repo.save_report(_report(i), "tx-1") is True
+
+    # Two full batches flushed on one pinned connection, one row still buffered
+    assert conn.copy_records_to_table.await_count == 2
+    pool.acquire.assert_awaited_once()
+    call = conn.copy_records_to_table.await_args_list[0]
+    assert call.args[0] == "temp_scraping_tx_1"
+    assert call.kwargs["columns"][:4] == ["specialization_id", "skills_1", "region_id", "company_id"]
+    assert call.kwargs["records"][1][:4] == (None, 1, None, None)
+    assert repo.transaction_exists("tx-1")
+
+
+@pytest.mark.asyncio
+async def test_commit_flushes_and_moves_rows():
+    pool, conn = _mock_pool()
+    repo = AsyncPostgresRepository({}, batch_size=10)
+    with patch("src.async_database.asyncpg.create_pool", AsyncMock(return_value=pool)):
+        await repo.save_report(_report(1, skills=1, regions=10), "tx-1")
+        await repo.commit_transaction("tx-1")
+
+    records = conn.copy_records_to_table.await_args.kwargs["records"]
+    assert records[0][:4] == (None, 1, 10, None)
+    statements = [call.args[0] for call in conn.execute.await_args_list]
+    assert any("INSERT INTO report_payloads" in sql for sql in statements)
+    assert any("INSERT INTO salary_facts" in sql for sql in statements)
+    assert "DROP TABLE IF EXISTS temp_scraping_tx_1" in statements[-1]
+    pool.release.assert_awaited_once_with(conn)
+    assert not repo.transaction_exists("tx-1")
+
+
+@pytest.mark.asyncio
+async def test_rollback_without_flush_never_connects():
+    repo = AsyncPostgresRepository({}, batch_size=10)
+    create_pool = AsyncMock()
+    with patch("src.async_database.asyncpg.create_pool", create_pool):
+        await repo.save_report(_report(), "tx-1")
+        await repo.rollback_transaction("tx-1")
+
+    create_pool.assert_not_awaited()
+    assert not repo.transaction_exists("tx-1")
+
+
+@pytest.mark.asyncio
+async def test_bad_rows_isolated_and_never_committed():
+    pool, conn = _mock_pool()
+    copied = []
+
+    async def copy(table, records, columns):
+        if any(record[1] in (2, 9) for record in records):
+            raise asyncpg.exceptions.UntranslatableCharacterError("unsupported Unicode escape sequence")
+        copied.extend(record[1] for record in records)
+
+    conn.copy_records_to_table.side_effect = copy
+    repo = AsyncPostgresRepository({}, batch_size=4)
+    with patch("src.async_database.asyncpg.create_pool", AsyncMock(return_value=pool)):
+        assert [await repo.save_report(_report(i), "tx-1") for i in (1, 2, 3, 9)] == [True, True, True, False]
+        await repo.commit_transaction("tx-1")
+
+    assert sorted(copied) == [1, 3]
+    progress = conn.execute.await_args_list[1]
+    assert progress.args[2:5] == ("complete", 1, 2)  # Only the two copied rows are committed
+
+
+@pytest.mark.asyncio
+async def test_failed_copy_keeps_earlier_rows():
+    pool, conn = _mock_pool()
+    conn.copy_records_to_table.side_effect = ConnectionError("connection lost")
+    repo = AsyncPostgresRepository({}, batch_size=2)
+    with patch("src.async_database.asyncpg.create_pool", AsyncMock(return_value=pool)):
+        assert await repo.save_report(_report(1), "tx-1") is True
+        assert await repo.save_report(_report(2), "tx-1") is False
+
+    assert [record[1] for record in repo._stagings["tx-1"].buffer] == [1]
+
+
+@pytest.mark.asyncio
+async def test_unknown_reference_type_rejected():
+    repo = AsyncPostgresRepository({})
+
+    assert await repo.save_report(SalaryData(data={}, reference_id=1, reference_type="bogus"), "tx-1") is False
+    assert not repo.transaction_exists("tx-1")
@@ -0,0 +1,144 @@
+"""Tests for AsyncSalaryScraper"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.async_scraper import AsyncSalaryScraper
+from src.core import Reference, ScrapeTask, ScrapingConfig
+
+
+def _make_scraper(references, api_result=None):
+    repo = Mock()
+    repo.get_references.side_effect = lambda ref_type: references.get(ref_type, [])
+    api = Mock()
+    api.fetch_salary_data = AsyncMock(return_value=api_result)
+    return AsyncSalaryScraper(repo, api, concurrency=2), repo, api
+
+
+@pytest.mark.asyncio
+async def test_async_scrape_individual_references():
+    scraper, repo, api = _make_scraper(
+        {"skills": [Reference(1, "Python", "python"), Reference(2, "Java", "java")]}, {"groups": [{"total": 1}]}
+    )
+
+    result = await scraper.scrape(ScrapingConfig(reference_types=["skills"]))
+
+    assert result is True
+    assert api.fetch_salary_data.await_count == 2
+    assert repo.save_report.call_count == 2
+    repo.commit_transaction.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_async_scrape_combinations_resolve_once_per_table():
+    scraper, repo, api = _make_scraper(
+        {
+            "skills": [Reference(1, "Python", "python"), Reference(2, "Java", "java")],
+            "regions": [Reference(10, "Москва", "c_678")],
+        },
+        {"groups": [{"total": 1}]},
+    )
+    config = ScrapingConfig(
+        reference_types=["skills", "regions"],
+        combinations=[
+            (("skills", "Python"), ("regions", "c_678")),
+            (("skills", "java"), ("regions", "Москва")),
+            (("skills", "unknown"), ("regions", "c_678")),
+        ],
+    )
+
+    result = await scraper.scrape(config)
+
+    assert result is True
+    assert repo.get_references.call_count == 2
+    assert api.fetch_salary_data.await_count == 2
+    api.fetch_salary_data.assert_any_await(skill_aliases=["python"], region_alias="c_678")
+    # One report per combination carrying every reference
+    assert repo.save_report.call_count == 2
+    saved = [call.args[0].reference_ids for call in repo.save_report.call_args_list]
+    assert {"skills": 1, "regions": 10} in saved
+    assert {"skills": 2, "regions": 10} in saved
+
+
+@pytest.mark.asyncio
+async def test_async_scrape_uses_unique_transaction_and_shared_timestamp():
+    scraper, repo, _ = _make_scraper(
+        {"skills": [Reference(1, "Python", "python"), Reference(2, "Go", "go")]}, {"groups": [{}]}
+    )
+
+    await scraper.scrape(ScrapingConfig(reference_types=["skills"]))
+    await scraper.scrape(ScrapingConfig(reference_types=["skills"]))
+
+    calls = repo.save_report.call_args_list
+    first_run, second_run = calls[:2], calls[2:]
+    assert first_run[0].args[1] == first_run[1].args[1]
+    assert first_run[0].args[2] == first_run[1].args[2]
+    assert first_run[0].args[1] != second_run[0].args[1]
+    assert first_run[0].args[1] != "async-transaction"
+
+
+@pytest.mark.asyncio
+async def test_async_scrape_rolls_back_on_error():
+    scraper, repo, _ = _make_scraper({})
+    repo.get_references.side_effect = Exception("Database error")
+
+    result = await scraper.scrape(ScrapingConfig(reference_types=["skills"]))
+
+    assert result is False
+    repo.rollback_transaction.assert_called_once()
+    repo.commit_transaction.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_async_scrape_lazy_plan_bounded_concurrency():
+    scraper, repo, api = _make_scraper({}, None)
+    active = {"now": 0, "max": 0}
+
+    async def fetch(**params):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0)
+        active["now"] -= 1
+        return {"groups": [{"total": 1}]}
+
+    api.fetch_salary_data = fetch
+    rows = ((("skills", Reference(i, f"S{i}", f"s{i}")),) for i in range(7))
+
+    result = await scraper.scrape(ScrapingConfig(reference_types=["skills"], combinations=rows))
+
+    assert result is True
+    assert repo.save_report.call_count == 7
+    assert active["max"] <= 2
+    repo.get_references.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_async_failed_save_not_counted():
+    scraper, repo, _ = _make_scraper({}, {"groups": [{"total": 1}]})
+    repo.save_report.return_value = False
+    tasks = [ScrapeTask(references=[("skills", Reference(1, "Python", "python"))])]
+
+    total, success = await scraper._run_bounded(tasks, "tx-1", datetime(2025, 1, 1))
+
+    assert (total, success) == (1, 0)
+    repo.save_report.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_async_scrape_writes_through_async_repository():
+    scraper, repo, _ = _make_scraper({"skills": [Reference(1, "Python", "python")]}, {"groups": [{"total": 1}]})
+    async_repo = Mock()
+    async_repo.save_report = AsyncMock(return_value=True)
+    async_repo.commit_transaction = AsyncMock()
+    async_repo.rollback_transaction = AsyncMock()
+    scraper.async_repository = async_repo
+
+    result = await scraper.scrape(ScrapingConfig(reference_types=["skills"]))
+
+    assert result is True
+    async_repo.save_report.assert_awaited_once()
+    async_repo.commit_transaction.assert_awaited_once()
+    repo.save_report.assert_not_called()
+    repo.commit_transaction.assert_not_called()
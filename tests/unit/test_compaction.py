@@ -0,0 +1,84 @@
+"""
+Unit tests for cold-tier payload compaction
+"""
+
+import json
+import unittest
+import zlib
+from unittest.mock import MagicMock, Mock, patch
+
+from src.compaction import ReportCompactor
+
+
+def _mock_repository():
+    """Repository whose connections hand out one mock cursor"""
+    repo = Mock()
+    conn = Mock()
+    cursor = Mock()
+    conn.cursor.return_value = cursor
+    repo.get_connection.return_value = MagicMock(__enter__=Mock(return_value=conn))
+    return repo, conn, cursor
+
+
+class TestReportCompactor(unittest.TestCase):
+    """Test payload archiving"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.repo, self.conn, self.cursor = _mock_repository()
+        self.compactor = ReportCompactor(self.repo, retention_days=30, batch_size=2)
+
+    @patch("src.compaction.execute_values")
+    def test_batches_until_nothing_left(self, mock_execute_values):
+        """Payloads are compressed, archived and removed batch by batch"""
+        payload = json.dumps({"groups": [{"name": "junior", "median": 100000}] * 50})
+        self.cursor.fetchall.side_effect = [[("h1", payload), ("h2", payload)], [("h3", payload)], []]
+
+        result = self.compactor.run()
+
+        self.assertEqual(result.archived, 3)
+        self.assertEqual(result.raw_bytes, 3 * len(payload))
+        self.assertLess(result.compressed_bytes, result.raw_bytes)
+        self.assertEqual(self.conn.commit.call_count, 3)
+        archived = mock_execute_values.call_args_list[0].args[2]
+        self.assertEqual(json.loads(zlib.decompress(archived[0][1])), json.loads(payload))
+        statements = [call.args[0] for call in self.cursor.execute.call_args_list]
+        self.assertIn("LOCK TABLE report_payloads", statements[0])
+        self.assertIn("INSERT INTO salary_facts", statements[2])
+        self.assertIn("DELETE FROM report_payloads", statements[3])
+
+    @patch("src.compaction.execute_values")
+    def test_age_from_reports_only(self, _):
+        """A payload created recently (e.g. by the dedup migration) is archived when its reports are old"""
+        self.cursor.fetchall.side_effect = [[("h1", "{}")], []]
+
+        result = self.compactor.run()
+
+        self.assertEqual(result.archived, 1)
+        query, params = self.cursor.execute.call_args_list[1].args
+        self.assertNotIn("created_at", query)
+        self.assertIn("r.fetched_at >= %(cutoff)s", query)
+        self.assertEqual(params["cutoff"], result.cutoff)
+
+    def test_load_payload_from_archive(self):
+        """Archived payloads are decompressed on demand"""
+        data = {"groups": [{"name": "senior"}]}
+        self.cursor.fetchone.return_value = (None, memoryview(zlib.compress(json.dumps(data).encode())))
+
+        self.assertEqual(self.compactor.load_payload(1), data)
+
+    def test_load_payload_prefers_hot_table(self):
+        """Hot payloads are returned as stored"""
+        self.cursor.fetchone.return_value = ({"groups": []}, None)
+
+        self.assertEqual(self.compactor.load_payload(1), {"groups": []})
+
+    def test_load_unknown_report(self):
+        """Unknown report ids give None"""
+        self.cursor.fetchone.return_value = None
+
+        self.assertIsNone(self.compactor.load_payload(42))
+
+
+if __name__ == "__main__":
+    unittest.main()
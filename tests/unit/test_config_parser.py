@@ -5,8 +5,9 @@ Unit tests for config_parser module
 import unittest
 import tempfile
 import os
-from src.config_parser import CsvConfigParser, DefaultConfigParser
-from src.core import ScrapingConfig
+from unittest.mock import Mock
+from src.config_parser import CsvCombinations, CsvConfigParser, DefaultConfigParser, SpecConfigParser
+from src.core import Reference, ScrapingConfig
 
 
 class TestCsvConfigParser(unittest.TestCase):
@@ -95,6 +96,35 @@ class TestCsvConfigParser(unittest.TestCase):
         expected_headers = {'specializations', 'skills', 'regions', 'companies'}
         self.assertEqual(self.parser.VALID_HEADERS, expected_headers)
 
+    def test_stream_returns_lazy_combinations(self):
+        """Streaming mode reads rows on iteration instead of parsing the whole file"""
+        csv_path = self.create_csv_file("skills,regions\nPython,Moscow\nJava,SPB")
+        config = CsvConfigParser(stream=True).parse(csv_path)
+
+        self.assertIsInstance(config.combinations, CsvCombinations)
+        self.assertEqual(sorted(config.reference_types), ["regions", "skills"])
+        rows = [tuple(sorted(c)) for c in config.combinations]
+        self.assertEqual(
+            rows, [(('regions', 'Moscow'), ('skills', 'Python')), (('regions', 'SPB'), ('skills', 'Java'))]
+        )
+        # Re-iterable: a second pass reads the file again
+        self.assertEqual(len(list(config.combinations)), 2)
+
+    def test_stream_deduplicates_rows(self):
+        """Repeated rows are skipped regardless of case and column order"""
+        csv_path = self.create_csv_file("skills,regions\nPython,Moscow\npython,MOSCOW\nJava,SPB\nPython,Moscow")
+        combinations = CsvConfigParser(stream=True).parse(csv_path).combinations
+
+        self.assertEqual(len(list(combinations)), 2)
+        self.assertEqual(combinations.duplicates, 2)
+
+    def test_stream_without_rows(self):
+        """Streaming mode still rejects files with headers only"""
+        csv_path = self.create_csv_file("skills,regions\n")
+
+        with self.assertRaises(ValueError):
+            CsvConfigParser(stream=True).parse(csv_path)
+
 
 class TestDefaultConfigParser(unittest.TestCase):
     """Test default configuration parser"""
@@ -120,5 +150,96 @@ class TestDefaultConfigParser(unittest.TestCase):
         self.assertIsNone(config.combinations)
 
 
+class TestSpecConfigParser(unittest.TestCase):
+    """Test lazy combination spec parser"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.references = {
+            "skills": [Reference(1, "Python", "python"), Reference(2, "Java", "java"), Reference(3, "Go", "go")],
+            "regions": [Reference(10, "Москва", "c_678"), Reference(11, "Казань", "c_698")],
+        }
+        self.repo = Mock()
+        self.repo.get_references.side_effect = lambda ref_type, limit=2000: self.references[ref_type][:limit]
+        self.repo.get_latest_totals.return_value = {}
+        self.repo.get_latest_combination_totals.return_value = {}
+        self.parser = SpecConfigParser(self.repo)
+
+    def aliases(self, config):
+        return [tuple(ref.alias for _, ref in combination) for combination in config.combinations]
+
+    def test_parse_dimensions(self):
+        """Selectors default to all; x, × and * separate dimensions"""
+        self.assertEqual(
+            SpecConfigParser.parse_dimensions("skills[top 200] × regions"), [("skills", "top 200"), ("regions", "all")]
+        )
+        self.assertEqual(
+            SpecConfigParser.parse_dimensions("skills[a, b]*regions[x]"), [("skills", "a, b"), ("regions", "x")]
+        )
+
+    def test_invalid_specs(self):
+        """Unknown types, duplicates and garbage are rejected"""
+        for spec in ["", "vacancies[all]", "skills x skills", "skills[all] regions[all]", "skills[all"]:
+            with self.assertRaises(ValueError, msg=spec):
+                SpecConfigParser.parse_dimensions(spec)
+
+    def test_expand_cartesian_product(self):
+        """Top N and explicit lists select references; rows carry resolved references"""
+        config = self.parser.parse("skills[top 2] x regions[Казань, unknown]")
+
+        self.assertEqual(config.reference_types, ["skills", "regions"])
+        self.assertEqual(self.aliases(config), [("python", "c_698"), ("java", "c_698")])
+        self.assertEqual(config.combinations.__iter__().__next__()[0], ("skills", self.references["skills"][0]))
+
+    def test_expansion_is_lazy(self):
+        """Nothing is loaded until iteration, and the product is generated row by row"""
+        config = self.parser.parse("skills x regions")
+        self.repo.get_references.assert_not_called()
+
+        rows = iter(config.combinations)
+        self.assertEqual(tuple(ref.alias for _, ref in next(rows)), ("python", "c_678"))
+        self.assertNotIsInstance(rows, list)
+
+    def test_prune_zero_vacancy_parents(self):
+        """Children of a reference whose last report had no vacancies are skipped"""
+        self.repo.get_latest_totals.return_value = {1: 0, 2: 15}
+
+        config = self.parser.parse("skills x regions[c_678]")
+
+        self.assertEqual(self.aliases(config), [("java", "c_678"), ("go", "c_678")])
+        self.repo.get_latest_totals.assert_called_once_with("skills")
+
+    def test_prune_checks_each_parent_dimension(self):
+        """With three dimensions every non-last dimension is checked against its own reports"""
+        self.references["companies"] = [Reference(20, "Yandex", "yandex")]
+        self.repo.get_latest_totals.side_effect = lambda ref_type: {"skills": {2: 0}, "regions": {10: 0}}[ref_type]
+
+        config = self.parser.parse("skills[python, java] x regions x companies")
+
+        self.assertEqual(self.aliases(config), [("python", "c_698", "yandex")])
+        self.assertEqual(
+            [call.args for call in self.repo.get_latest_totals.call_args_list], [("skills",), ("regions",)]
+        )
+
+    def test_prune_zero_vacancy_combinations(self):
+        """Children of a combination whose last report had no vacancies are skipped"""
+        self.references["companies"] = [Reference(20, "Yandex", "yandex")]
+        self.repo.get_latest_combination_totals.return_value = {(1, 10): 0, (1, 11): 4}
+
+        config = self.parser.parse("skills[python] x regions x companies")
+
+        self.assertEqual(self.aliases(config), [("python", "c_698", "yandex")])
+        self.repo.get_latest_combination_totals.assert_called_once_with(["skills", "regions"])
+
+    def test_no_prune(self):
+        """Pruning can be disabled"""
+        self.repo.get_latest_totals.return_value = {1: 0}
+        config = SpecConfigParser(self.repo, prune=False).parse("skills x regions[c_678]")
+
+        self.assertEqual(len(self.aliases(config)), 3)
+        self.repo.get_latest_totals.assert_not_called()
+        self.repo.get_latest_combination_totals.assert_not_called()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -45,6 +45,14 @@ class TestSalaryData(unittest.TestCase):
         self.assertEqual(salary_data.data, {})
         self.assertEqual(salary_data.reference_type, "regions")
 
+    def test_reference_ids(self):
+        """Single reports map their own type, combination reports every reference"""
+        single = SalaryData(data={}, reference_id=1, reference_type="skills")
+        combined = SalaryData(data={}, reference_id=1, reference_type="skills", combination={"skills": 1, "regions": 2})
+
+        self.assertEqual(single.reference_ids, {"skills": 1})
+        self.assertEqual(combined.reference_ids, {"skills": 1, "regions": 2})
+
 
 class TestScrapingConfig(unittest.TestCase):
     """Test ScrapingConfig dataclass"""
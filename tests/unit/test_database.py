@@ -5,8 +5,8 @@ Unit tests for database module
 import unittest
 import os
 from unittest.mock import Mock, patch, MagicMock
-from datetime import datetime
-from src.database import PostgresRepository
+from datetime import datetime, timedelta
+from src.database import RUN_FAILED, RUN_PROGRESS, PostgresRepository, deallocate_prepared, execute_prepared
 from src.core import Reference, SalaryData
 
 
@@ -73,6 +73,32 @@ class TestPostgresRepository(unittest.TestCase):
             self.repo.get_references("invalid_table")
         self.assertIn("Invalid table", str(context.exception))
 
+    def test_iter_references_server_side_cursor(self):
+        """References are streamed through a named cursor without a limit"""
+        mock_conn = Mock()
+        mock_cursor = MagicMock()
+        mock_cursor.__iter__.return_value = iter([(1, "Python", "python"), (2, "Java", "java")])
+        mock_conn.cursor.return_value = mock_cursor
+        self.repo._pool = Mock(getconn=Mock(return_value=mock_conn))
+
+        references = self.repo.iter_references("companies", itersize=50)
+        mock_conn.cursor.assert_not_called()  # Nothing runs until iteration starts
+
+        self.assertEqual([ref.alias for ref in references], ["python", "java"])
+        self.assertTrue(mock_conn.cursor.call_args.kwargs["name"].startswith("references_"))
+        self.assertEqual(mock_cursor.itersize, 50)
+        query = mock_cursor.execute.call_args[0][0]
+        self.assertIn("FROM companies", query)
+        self.assertNotIn("LIMIT", query)
+        mock_cursor.close.assert_called_once()
+        mock_conn.rollback.assert_called_once()
+        self.repo._pool.putconn.assert_called_once_with(mock_conn)
+
+    def test_iter_references_invalid_table(self):
+        """Invalid tables are rejected when the iterator is created"""
+        with self.assertRaises(ValueError):
+            self.repo.iter_references("invalid_table")
+
     def test_save_report(self):
         """Test saving report to transaction buffer"""
         transaction_id = "test-transaction-123"
@@ -96,7 +122,7 @@ class TestPostgresRepository(unittest.TestCase):
         self.assertEqual(len(self.repo.transactions[transaction_id]), 3)
 
     @patch('src.database.execute_values')
-    @patch('src.database.SimpleConnectionPool')
+    @patch('src.database.HealthCheckedPool')
     def test_commit_transaction_success(self, mock_pool_class, mock_execute_values):
         """Test successful transaction commit"""
         # Setup mock database
@@ -167,7 +193,7 @@ class TestPostgresRepository(unittest.TestCase):
         self.repo.rollback_transaction("nonexistent-transaction")
 
     @patch('src.database.execute_values')
-    @patch('src.database.SimpleConnectionPool')
+    @patch('src.database.HealthCheckedPool')
     def test_field_mapping(self, mock_pool_class, mock_execute_values):
         """Test field mapping during transaction commit"""
         # Setup mock database
@@ -197,5 +223,400 @@ class TestPostgresRepository(unittest.TestCase):
         mock_conn.commit.assert_called_once()
 
 
+class TestSharedStaging(unittest.TestCase):
+    """Test report_staging mode used by multi-process scraping"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.repo = PostgresRepository({"host": "localhost"}, shared_staging=True)
+        self.mock_conn = MagicMock()
+        self.mock_cursor = MagicMock()
+        self.mock_conn.cursor.return_value = self.mock_cursor
+        self.repo._pool = Mock()
+        self.repo._pool.getconn.return_value = self.mock_conn
+
+    def test_save_report_writes_transaction_id(self):
+        """Rows are staged in report_staging keyed by transaction"""
+        salary_data = SalaryData(data={"groups": []}, reference_id=5, reference_type="regions")
+
+        self.assertTrue(self.repo.save_report(salary_data, "tx-1", datetime(2025, 1, 1)))
+
+        query, params = self.mock_cursor.execute.call_args[0]
+        self.assertIn("INSERT INTO report_staging (transaction_id, region_id", query)
+        self.assertEqual(params[0], "tx-1")
+        self.mock_conn.commit.assert_called_once()
+
+    def test_save_combination_report_sets_all_columns(self):
+        """A combination is staged as one row with every reference column filled"""
+        salary_data = SalaryData(
+            data={"groups": []}, reference_id=1, reference_type="skills", combination={"skills": 1, "regions": 5}
+        )
+
+        self.assertTrue(self.repo.save_report(salary_data, "tx-1", datetime(2025, 1, 1)))
+
+        self.mock_cursor.execute.assert_called_once()
+        query, params = self.mock_cursor.execute.call_args[0]
+        self.assertIn("(transaction_id, skills_1, region_id, data, fetched_at)", query)
+        self.assertEqual(params[:3], ("tx-1", 1, 5))
+
+    def test_commit_moves_only_transaction_rows(self):
+        """Commit copies and deletes rows of its own transaction"""
+        self.mock_cursor.fetchone.return_value = (3,)
+
+        self.repo.commit_transaction("tx-1")
+
+        statements = [call.args for call in self.mock_cursor.execute.call_args_list]
+        self.assertIn("FROM report_staging WHERE transaction_id = %s", statements[3][0])
+        self.assertEqual(statements[3][1], ("tx-1",))
+        self.assertEqual(statements[-1], ("DELETE FROM report_staging WHERE transaction_id = %s", ("tx-1",)))
+        self.mock_conn.commit.assert_called_once()
+
+    def test_commit_stores_payloads_by_hash(self):
+        """Payloads go to report_payloads once per hash, rows only reference them"""
+        self.mock_cursor.fetchone.return_value = (3,)
+
+        self.repo.commit_transaction("tx-1")
+
+        statements = [call.args[0] for call in self.mock_cursor.execute.call_args_list]
+        self.assertEqual(statements[2], "SELECT ensure_report_partitions()")
+        self.assertIn("INSERT INTO report_payloads", statements[3])
+        self.assertIn("ON CONFLICT (hash) DO NOTHING", statements[3])
+        self.assertIn("INSERT INTO report_rows", statements[4])
+        self.assertIn("md5(data::text)::uuid", statements[4])
+
+    def test_commit_skips_replayed_rows(self):
+        """Rows already stored under their natural key are skipped together with their facts"""
+        self.mock_cursor.fetchone.return_value = (3,)
+
+        self.repo.commit_transaction("tx-1")
+
+        rows_statement = self.mock_cursor.execute.call_args_list[4].args[0]
+        self.assertIn("ON CONFLICT (fetched_at, COALESCE(specialization_id, 0)", rows_statement)
+        self.assertLess(rows_statement.index("DO NOTHING"), rows_statement.index("INSERT INTO salary_facts"))
+
+    def test_rollback_deletes_rows(self):
+        """Rollback removes staged rows"""
+        self.repo.rollback_transaction("tx-1")
+
+        self.mock_cursor.execute.assert_any_call("DELETE FROM report_staging WHERE transaction_id = %s", ("tx-1",))
+        self.mock_cursor.execute.assert_called_with(RUN_FAILED, ("tx-1",))
+
+
+class TestChunkedCommits(unittest.TestCase):
+    """Test rolling commits of a scrape run"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.mock_conn = MagicMock()
+        self.mock_cursor = MagicMock()
+        self.mock_conn.cursor.return_value = self.mock_cursor
+        self.pool = Mock()
+        self.pool.getconn.return_value = self.mock_conn
+
+    def _repo(self, **kwargs) -> PostgresRepository:
+        repo = PostgresRepository({"host": "localhost"}, prepare_statements=False, **kwargs)
+        repo._pool = self.pool
+        return repo
+
+    def _statements(self):
+        return [call.args for call in self.mock_cursor.execute.call_args_list]
+
+    def test_chunk_committed_every_chunk_rows(self):
+        """Every chunk_rows staged rows are moved as a running chunk; staging stays open"""
+        repo = self._repo(chunk_rows=2)
+        self.mock_cursor.fetchone.return_value = (2,)
+
+        for i in range(3):
+            self.assertTrue(repo.save_report(SalaryData(data={}, reference_id=i, reference_type="skills"), "tx-1"))
+
+        statements = self._statements()
+        self.assertEqual(statements[3], ("SELECT COUNT(*) FROM temp_scraping_tx_1",))
+        self.assertEqual(statements[4], (RUN_PROGRESS, ("tx-1", "running", 1, 2, "running")))
+        self.assertIn("INSERT INTO report_rows", statements[7][0])
+        self.assertIn("current_setting('scraper.run_id', true)", statements[7][0])
+        self.assertEqual(statements[9], ("TRUNCATE temp_scraping_tx_1",))
+        self.assertEqual(repo._staged_rows, {"tx-1": 1})
+        self.assertTrue(repo.transaction_exists("tx-1"))
+        self.pool.putconn.assert_not_called()
+
+    def test_shared_chunk_claims_rows(self):
+        """Shared staging rows are moved with DELETE ... RETURNING, so concurrent inserts are kept"""
+        repo = self._repo(shared_staging=True)
+        self.mock_cursor.rowcount = 5
+
+        self.assertEqual(repo.commit_chunk("tx-1"), 5)
+
+        statements = self._statements()
+        self.assertIn("CREATE TEMPORARY TABLE report_chunk ON COMMIT DROP", statements[0][0])
+        self.assertIn("DELETE FROM report_staging WHERE transaction_id = %s", statements[1][0])
+        self.assertIn("INSERT INTO report_chunk", statements[1][0])
+        self.assertEqual(statements[2], (RUN_PROGRESS, ("tx-1", "running", 1, 5, "running")))
+        self.assertIn("FROM report_chunk", statements[4][0])
+        self.mock_conn.commit.assert_called_once()
+
+    def test_final_commit_completes_run(self):
+        """The last commit marks the run complete even when chunks already moved every row"""
+        repo = self._repo(chunk_rows=100)
+        repo.save_report(SalaryData(data={}, reference_id=1, reference_type="skills"), "tx-1")
+        self.mock_cursor.reset_mock()
+        self.mock_cursor.fetchone.return_value = (0,)
+
+        repo.commit_transaction("tx-1")
+
+        statements = self._statements()
+        self.assertEqual(statements[1], (RUN_PROGRESS, ("tx-1", "complete", 0, 0, "complete")))
+        self.assertEqual(statements[2], ("DROP TABLE IF EXISTS temp_scraping_tx_1",))
+        self.assertEqual(repo._staged_rows, {})
+
+    def test_failed_chunk_keeps_rows_staged(self):
+        """A failing chunk is logged; the report itself is saved and rows wait for the next attempt"""
+        repo = self._repo(chunk_rows=1)
+        self.mock_cursor.fetchone.side_effect = Exception("lock timeout")
+
+        with self.assertLogs(level="ERROR"):
+            self.assertTrue(repo.save_report(SalaryData(data={}, reference_id=1, reference_type="skills"), "tx-1"))
+
+        self.mock_conn.rollback.assert_called_once()
+        self.assertEqual(repo._staged_rows, {"tx-1": 1})
+
+    def test_chunk_without_staging(self):
+        """Nothing to move before the first save"""
+        self.assertEqual(self._repo().commit_chunk("tx-1"), 0)
+        self.pool.getconn.assert_not_called()
+
+
+class TestSalaryFacts(unittest.TestCase):
+    """Test salary_facts population"""
+
+    repository_class = PostgresRepository  # Overridden to run the suite against other backends
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.repo = self.repository_class({"host": "localhost"})
+        self.mock_conn = MagicMock()
+        self.mock_cursor = MagicMock()
+        self.mock_conn.cursor.return_value = self.mock_cursor
+        self.repo._pool = Mock()
+        self.repo._pool.getconn.return_value = self.mock_conn
+
+    def test_backfill_commits_each_id_range(self):
+        """Historical rows are exploded in committed, resumable id batches"""
+        self.mock_cursor.fetchone.return_value = (1, 25)
+        self.mock_cursor.rowcount = 4
+
+        inserted = self.repo.backfill_salary_facts(batch_size=10)
+
+        batches = [call.args[1] for call in self.mock_cursor.execute.call_args_list[1:]]
+        self.assertEqual(batches, [(0, 10), (10, 20), (20, 30)])
+        self.assertIn("ON CONFLICT DO NOTHING", self.mock_cursor.execute.call_args[0][0])
+        self.assertEqual(inserted, 12)
+        self.assertEqual(self.mock_conn.commit.call_count, 4)
+
+    def test_refresh_rollups_rereads_lookback_window(self):
+        """Rollups are recomputed from facts newer than watermark minus lookback"""
+        self.mock_cursor.fetchone.side_effect = [(datetime(2025, 3, 3, 12),), (datetime(2025, 3, 4, 9),)]
+
+        watermark = self.repo.refresh_salary_rollups(timedelta(hours=2))
+
+        statements = self.mock_cursor.execute.call_args_list
+        self.assertIn("FOR UPDATE", statements[0].args[0])
+        self.assertIn("s.status = 'running'", statements[1].args[0])
+        self.assertIn("CREATE TEMPORARY TABLE affected_rollups", statements[2].args[0])
+        self.assertIn("FROM completed_salary_facts f", statements[2].args[0])
+        self.assertEqual(statements[2].args[1], (datetime(2025, 3, 3, 10),))
+        self.assertIn(
+            "ON CONFLICT (dimension, reference_id, level, period, period_start) DO UPDATE", statements[3].args[0]
+        )
+        self.assertEqual(statements[3].args[1], (datetime(2025, 2, 24, 10),))
+        self.assertEqual(statements[-1].args[1], (datetime(2025, 3, 4, 9),))
+        self.assertEqual(watermark, datetime(2025, 3, 4, 9))
+        self.mock_conn.commit.assert_called_once()
+
+    def test_refresh_rollups_without_facts(self):
+        """Nothing is aggregated before the first facts exist"""
+        self.mock_cursor.fetchone.side_effect = [(datetime.min,), (None,)]
+
+        self.assertEqual(self.repo.refresh_salary_rollups(), datetime.min)
+        self.assertEqual(self.mock_cursor.execute.call_count, 2)
+
+    def test_backfill_empty_table(self):
+        """Nothing to do without report rows"""
+        self.mock_cursor.fetchone.return_value = (None, None)
+
+        self.assertEqual(self.repo.backfill_salary_facts(), 0)
+        self.mock_cursor.execute.assert_called_once()
+
+
+class TestReferenceLookups(unittest.TestCase):
+    """Test batched reference resolution"""
+
+    repository_class = PostgresRepository  # Overridden to run the suite against other backends
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.repo = self.repository_class({"host": "localhost"})
+        self.mock_conn = MagicMock()
+        self.mock_cursor = MagicMock()
+        self.mock_conn.cursor.return_value = self.mock_cursor
+        self.repo._pool = Mock()
+        self.repo._pool.getconn.return_value = self.mock_conn
+
+    def test_resolve_references_single_query(self):
+        """All values are resolved with one ANY() query, alias matches first"""
+        self.mock_cursor.fetchall.return_value = [(1, "Python", "python"), (2, "Go", "golang"), (3, "Golang", "go")]
+
+        resolved = self.repo.resolve_references("skills", ["Python", " GO ", "python", "rust"])
+
+        query, params = self.mock_cursor.execute.call_args[0]
+        self.assertIn("lower(alias) = ANY(%s) OR lower(title) = ANY(%s)", query)
+        self.assertEqual(params, (["go", "python", "rust"], ["go", "python", "rust"]))
+        self.assertEqual(self.mock_cursor.execute.call_count, 1)
+        self.assertEqual({key: ref.id for key, ref in resolved.items()}, {"python": 1, "go": 3})
+
+    def test_latest_combination_totals(self):
+        """Totals come from salary_facts of the latest report with exactly these references"""
+        self.mock_cursor.fetchall.return_value = [(1, 10, 0), (2, 10, 7), (3, 10, None)]
+
+        totals = self.repo.get_latest_combination_totals(["skills", "regions"])
+
+        query = self.mock_cursor.execute.call_args[0][0]
+        self.assertIn("MAX(f.total) FROM salary_facts f", query)
+        self.assertIn("r.specialization_id IS NULL", query)
+        self.assertIn("r.run_id IS NULL OR s.status = 'complete'", query)
+        self.assertEqual(totals, {(1, 10): 0, (2, 10): 7})
+        with self.assertRaises(ValueError):
+            self.repo.get_latest_combination_totals(["skills", "reports"])
+
+    def test_resolve_references_invalid_table(self):
+        """Table names are validated before building SQL"""
+        with self.assertRaises(ValueError):
+            self.repo.resolve_references("reports", ["x"])
+
+
+class TestConnectionFailures(unittest.TestCase):
+    """Test pool init backoff and retries of lost connections"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.repo = PostgresRepository({"host": "localhost"}, shared_staging=True, connect_retries=0, retry_delay=0)
+        self.mock_conn = MagicMock(closed=0)
+        self.mock_cursor = MagicMock()
+        self.mock_conn.cursor.return_value = self.mock_cursor
+
+    @patch('src.db_pool.psycopg2.connect')
+    def test_failed_pool_init_fails_fast(self, mock_connect):
+        """After a failed init calls fail without connecting until pool_retry_after passed"""
+        import psycopg2
+
+        mock_connect.side_effect = psycopg2.OperationalError("refused")
+        salary_data = SalaryData(data={}, reference_id=1, reference_type="skills")
+
+        for _ in range(3):
+            self.assertFalse(self.repo.save_report(salary_data, "tx-1"))
+        mock_connect.assert_called_once()
+
+        self.repo.pool_retry_after = 0
+        mock_connect.side_effect = None
+        mock_connect.return_value = self.mock_conn
+        self.assertTrue(self.repo.save_report(salary_data, "tx-1"))
+        self.assertEqual(mock_connect.call_count, 2)
+
+    def test_lost_connection_retried_once(self):
+        """A save whose connection dropped is written again on a new connection"""
+        import psycopg2
+
+        broken = MagicMock(closed=2)
+        broken.cursor.return_value.execute.side_effect = psycopg2.OperationalError("server closed the connection")
+        self.repo._pool = Mock()
+        self.repo._pool.getconn.side_effect = [broken, self.mock_conn]
+        salary_data = SalaryData(data={}, reference_id=1, reference_type="skills")
+
+        self.assertTrue(self.repo.save_report(salary_data, "tx-1"))
+
+        self.mock_conn.commit.assert_called_once()
+        self.repo._pool.putconn.assert_any_call(broken)  # The pool drops closed connections
+
+    def test_statement_errors_not_retried(self):
+        """Errors on a live connection are not retried"""
+        import psycopg2
+
+        self.mock_cursor.execute.side_effect = psycopg2.OperationalError("canceling statement due to timeout")
+        self.repo._pool = Mock()
+        self.repo._pool.getconn.return_value = self.mock_conn
+
+        with self.assertRaises(psycopg2.OperationalError):
+            self.repo.get_references("skills")
+        self.repo._pool.getconn.assert_called_once()
+
+
+class TestPreparedStatements(unittest.TestCase):
+    """Test server-side prepared statements"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.conn = Mock(prepared=set())
+        self.cursor = Mock(connection=self.conn)
+
+    def test_prepared_once_then_executed(self):
+        """PREPARE with numbered placeholders runs only on first use per connection"""
+        query = "SELECT id FROM skills WHERE alias = %s AND title LIKE '%%x' LIMIT %s"
+
+        execute_prepared(self.cursor, "lookup", query, ("python", 5))
+        execute_prepared(self.cursor, "lookup", query, ("go", 1))
+
+        statements = [call.args for call in self.cursor.execute.call_args_list]
+        self.assertEqual(
+            statements[0], ("PREPARE lookup AS SELECT id FROM skills WHERE alias = $1 AND title LIKE '%x' LIMIT $2",)
+        )
+        self.assertEqual(statements[1], ("EXECUTE lookup (%s, %s)", ("python", 5)))
+        self.assertEqual(statements[2], ("EXECUTE lookup (%s, %s)", ("go", 1)))
+        self.assertEqual(self.conn.prepared, {"lookup"})
+
+    def test_plain_connection_falls_back(self):
+        """Connections without a prepared set run the query as is"""
+        cursor = Mock(connection=Mock(spec=[]))
+
+        execute_prepared(cursor, "lookup", "SELECT %s", (1,))
+
+        cursor.execute.assert_called_once_with("SELECT %s", (1,))
+
+    def test_deallocate_by_prefix(self):
+        """Only statements of the dropped staging table are deallocated"""
+        self.conn.prepared.update({"temp_scraping_a_2", "temp_scraping_a_6", "resolve_skills"})
+
+        deallocate_prepared(self.cursor, "temp_scraping_a_")
+
+        self.assertEqual(
+            [call.args[0] for call in self.cursor.execute.call_args_list],
+            ["DEALLOCATE temp_scraping_a_2", "DEALLOCATE temp_scraping_a_6"],
+        )
+        self.assertEqual(self.conn.prepared, {"resolve_skills"})
+
+    def test_staging_insert_prepared_per_column_set(self):
+        """save_report prepares one statement per reference column combination"""
+        repo = PostgresRepository({"host": "localhost"}, shared_staging=True)
+        mock_conn = MagicMock(prepared=set())
+        mock_conn.cursor.return_value.connection = mock_conn
+        repo._pool = Mock(getconn=Mock(return_value=mock_conn))
+        single = SalaryData(data={}, reference_id=5, reference_type="regions")
+        combination = SalaryData(
+            data={}, reference_id=1, reference_type="skills", combination={"skills": 1, "regions": 5}
+        )
+
+        for data in (single, single, combination):
+            self.assertTrue(repo.save_report(data, "tx-1", datetime(2025, 1, 1)))
+
+        self.assertEqual(mock_conn.prepared, {"stage_shared_4", "stage_shared_6"})
+
+    @patch('src.database.HealthCheckedPool')
+    def test_disabled_uses_plain_connections(self, mock_pool_class):
+        """prepare_statements=False keeps the default connection class"""
+        PostgresRepository({"host": "localhost"}, prepare_statements=False).warmup()
+        self.assertNotIn("connection_factory", mock_pool_class.call_args.kwargs)
+
+        PostgresRepository({"host": "localhost"}).warmup()
+        self.assertIn("connection_factory", mock_pool_class.call_args.kwargs)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,139 @@
+"""
+Unit tests for the health-checked connection pool
+"""
+
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+from src.db_pool import HealthCheckedPool
+
+
+def _connection():
+    conn = Mock(closed=0)
+    conn.get_transaction_status.return_value = extensions.TRANSACTION_STATUS_IDLE
+    return conn
+
+
+@patch("src.db_pool.time.sleep")
+@patch("src.db_pool.psycopg2.connect")
+class TestHealthCheckedPool(unittest.TestCase):
+    """Test pool warmup, validation, recycling and metrics"""
+
+    def test_warmup_opens_minconn(self, mock_connect, _):
+        """minconn connections exist before the first checkout"""
+        mock_connect.side_effect = lambda **kwargs: _connection()
+
+        pool = HealthCheckedPool(2, 5, host="db")
+
+        self.assertEqual(mock_connect.call_count, 2)
+        mock_connect.assert_called_with(host="db")
+        stats = pool.stats()
+        self.assertEqual((stats.size, stats.idle, stats.in_use), (2, 2, 0))
+
+    def test_dead_idle_connection_replaced(self, mock_connect, _):
+        """A connection failing the ping is closed and a fresh one handed out"""
+        stale, fresh = _connection(), _connection()
+        stale.cursor.return_value.execute.side_effect = psycopg2.OperationalError("server closed the connection")
+        mock_connect.side_effect = [stale, fresh]
+        pool = HealthCheckedPool(1, 5, ping_after=0)
+
+        conn = pool.getconn()
+
+        self.assertIs(conn, fresh)
+        stale.close.assert_called_once()
+        self.assertEqual(pool.stats().broken, 1)
+        self.assertEqual(pool.stats().size, 1)
+
+    def test_recently_used_connection_not_pinged(self, mock_connect, _):
+        """Connections returned moments ago are reused without a round trip"""
+        conn = _connection()
+        mock_connect.return_value = conn
+        pool = HealthCheckedPool(1, 5, ping_after=60)
+
+        self.assertIs(pool.getconn(), conn)
+        conn.cursor.assert_not_called()
+
+    def test_old_connection_recycled(self, mock_connect, _):
+        """Connections older than max_age are reopened on checkout"""
+        old, new = _connection(), _connection()
+        mock_connect.side_effect = [old, new]
+        pool = HealthCheckedPool(1, 5, max_age=0)
+
+        self.assertIs(pool.getconn(), new)
+        old.close.assert_called_once()
+        self.assertEqual(pool.stats().recycled, 1)
+
+    def test_exhausted_pool_waits_then_fails(self, mock_connect, _):
+        """Checkout waits for a returned connection and raises after the timeout"""
+        mock_connect.side_effect = lambda **kwargs: _connection()
+        pool = HealthCheckedPool(1, 1, timeout=5)
+        held = pool.getconn()
+
+        threading.Timer(0.05, pool.putconn, args=(held,)).start()
+        self.assertIs(pool.getconn(), held)
+        stats = pool.stats()
+        self.assertEqual(stats.waits, 1)
+        self.assertGreater(stats.wait_seconds, 0)
+        self.assertEqual(stats.utilization, 1.0)
+
+        pool.timeout = 0.01
+        with self.assertRaises(PoolError):
+            pool.getconn()
+
+    def test_putconn_resets_transactions_and_drops_closed(self, mock_connect, _):
+        """Open transactions are rolled back; closed connections free their slot"""
+        first, second = _connection(), _connection()
+        mock_connect.side_effect = [first, second]
+        pool = HealthCheckedPool(0, 5)
+
+        conn = pool.getconn()
+        conn.get_transaction_status.return_value = extensions.TRANSACTION_STATUS_INTRANS
+        pool.putconn(conn)
+        conn.rollback.assert_called_once()
+        self.assertEqual(pool.stats().idle, 1)
+
+        conn = pool.getconn()
+        conn.closed = 2
+        pool.putconn(conn)
+        self.assertEqual(pool.stats().size, 0)
+        with self.assertRaises(PoolError):
+            pool.putconn(second)
+
+    def test_connect_retried(self, mock_connect, mock_sleep):
+        """Transient connection errors are retried"""
+        conn = _connection()
+        mock_connect.side_effect = [psycopg2.OperationalError("timeout"), conn]
+
+        pool = HealthCheckedPool(1, 5, connect_retries=3)
+
+        self.assertIs(pool.getconn(), conn)
+        self.assertEqual(pool.stats().connect_failures, 1)
+        mock_sleep.assert_called_once()
+
+    def test_connect_gives_up(self, mock_connect, _):
+        """The last connection error is raised and the slot is released"""
+        mock_connect.side_effect = psycopg2.OperationalError("refused")
+        pool = HealthCheckedPool(0, 5, connect_retries=2)
+
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.getconn()
+        self.assertEqual((pool.stats().size, pool.stats().in_use), (0, 0))
+        self.assertEqual(mock_connect.call_count, 3)
+
+    def test_connect_without_retries(self, mock_connect, mock_sleep):
+        """connect_retries=0 makes a single attempt"""
+        mock_connect.side_effect = psycopg2.OperationalError("refused")
+
+        with self.assertRaises(psycopg2.OperationalError):
+            HealthCheckedPool(1, 5, connect_retries=0)
+        mock_connect.assert_called_once()
+        mock_sleep.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
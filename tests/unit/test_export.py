@@ -0,0 +1,121 @@
+"""
+Unit tests for the Parquet exporter
+"""
+
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock, Mock
+
+import pyarrow.parquet as pq
+
+from src.core import Reference
+from src.export import ParquetExporter, resolve_filters
+
+
+def _fact(report_id: int, fetched_at: datetime) -> tuple:
+    return (report_id, 1, None, 7, None, None, "Junior", "Junior", 12, 95000, 60000, 150000, None, None, fetched_at)
+
+
+class TestParquetExporter(unittest.TestCase):
+    """Test month slicing, batching and the written files"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.repo = Mock()
+        self.conn = Mock()
+        self.cursor = Mock()  # MIN/MAX bounds
+        self.named = Mock()  # Server-side cursor of each month
+        self.conn.cursor.side_effect = lambda name=None: self.named if name else self.cursor
+        self.repo.get_connection.return_value = MagicMock(__enter__=Mock(return_value=self.conn))
+        self.exporter = ParquetExporter(self.repo, batch_size=2)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = Path(self.tmp.name)
+
+    def tearDown(self):
+        """Remove written files"""
+        self.tmp.cleanup()
+
+    def test_partitioned_by_month(self):
+        """Each month is read with its own range and written to its own file, a row group per batch"""
+        march, april = datetime(2025, 3, 31, 23), datetime(2025, 4, 2)
+        self.cursor.fetchone.return_value = (march, april)
+        self.named.fetchmany.side_effect = [
+            [_fact(1, march), _fact(2, march)],
+            [_fact(3, march)],
+            [],
+            [_fact(4, april)],
+            [],
+        ]
+
+        result = self.exporter.export("facts", self.out)
+
+        self.assertEqual((result.rows, result.batches), (4, 3))
+        self.assertEqual(
+            result.files, [str(self.out / "month=2025-03/facts.parquet"), str(self.out / "month=2025-04/facts.parquet")]
+        )
+        ranges = [call.args[1][-2:] for call in self.named.execute.call_args_list]
+        self.assertEqual(ranges[0], (march, datetime(2025, 4, 1)))
+        self.assertEqual(ranges[1], (datetime(2025, 4, 1), datetime(2025, 4, 2, 0, 0, 0, 1)))
+        self.assertEqual(self.named.itersize, 2)
+        march_file = pq.ParquetFile(result.files[0])
+        self.assertEqual(march_file.metadata.num_row_groups, 2)
+        table = march_file.read()
+        self.assertEqual(table.column("report_id").to_pylist(), [1, 2, 3])
+        self.assertEqual(str(table.schema.field("median").type), "int32")
+        self.assertEqual(table.column("fetched_at").to_pylist()[0], march)
+        self.conn.rollback.assert_called_once()
+
+    def test_single_file_with_filters(self):
+        """Explicit ranges are narrowed to the data; reference filters become ANY() conditions"""
+        self.cursor.fetchone.return_value = (datetime(2025, 3, 1, 8), datetime(2025, 3, 1, 9))
+        self.named.fetchmany.side_effect = [[(5, None, 7, None, None, '{"groups": []}', datetime(2025, 3, 1))], []]
+        path = self.out / "reports.parquet"
+
+        result = self.exporter.export(
+            "reports", path, datetime(2025, 3, 1), datetime(2025, 3, 2), {"skills": [7, 8]}, partitioned=False
+        )
+
+        self.assertEqual((result.rows, result.files), (1, [str(path)]))
+        self.assertEqual(self.cursor.execute.call_args.args[1], ([7, 8], datetime(2025, 3, 1), datetime(2025, 3, 2)))
+        query, params = self.named.execute.call_args.args
+        self.assertIn("data::text", query)
+        self.assertIn("skills_1 = ANY(%s)", query)
+        self.assertEqual(params, ([7, 8], datetime(2025, 3, 1, 8), datetime(2025, 3, 1, 9, 0, 0, 1)))
+        self.assertEqual(pq.read_table(path).column("data").to_pylist(), ['{"groups": []}'])
+
+    def test_nothing_to_export(self):
+        """No rows in range: no files"""
+        self.cursor.fetchone.return_value = (None, None)
+
+        result = self.exporter.export("facts", self.out)
+
+        self.assertEqual((result.rows, result.files), (0, []))
+        self.conn.cursor.assert_called_once_with()
+
+    def test_empty_range(self):
+        """since >= until exports nothing without querying"""
+        result = self.exporter.export("facts", self.out, datetime(2025, 3, 2), datetime(2025, 3, 1))
+
+        self.assertEqual(result.rows, 0)
+        self.cursor.execute.assert_not_called()
+
+    def test_invalid_arguments(self):
+        """Unknown datasets and filter tables are rejected"""
+        with self.assertRaises(ValueError):
+            self.exporter.export("users", self.out)
+        with self.assertRaises(ValueError):
+            self.exporter.export("facts", self.out, references={"users": [1]})
+
+    def test_resolve_filters(self):
+        """Aliases and titles resolve to ids, unknown values are reported"""
+        self.repo.resolve_references.return_value = {"python": Reference(id=7, title="Python", alias="python")}
+
+        self.assertEqual(resolve_filters(self.repo, {"skills": ["Python", " "]}), {"skills": [7]})
+        with self.assertRaisesRegex(ValueError, "Unknown skills: go"):
+            resolve_filters(self.repo, {"skills": ["python", "go"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Unit tests for pipelined scraper
+"""
+
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+from src.core import Reference, ScrapingConfig
+from src.pipeline import PipelinedSalaryScraper, StageStats
+
+
+class TestPipelinedSalaryScraper(unittest.TestCase):
+    """Test staged fetch/transform/persist scraper"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.mock_repo = Mock()
+        self.mock_api = Mock()
+        self.scraper = PipelinedSalaryScraper(self.mock_repo, self.mock_api, queue_size=2, fetch_workers=2)
+
+    def test_scrape_individual_references(self):
+        """All fetched payloads are persisted and committed once"""
+        self.mock_repo.get_references.return_value = [Reference(i, f"Item{i}", f"item{i}") for i in range(5)]
+        self.mock_api.fetch_salary_data.return_value = {"groups": [{"total": 1}]}
+
+        result = self.scraper.scrape(ScrapingConfig(reference_types=["skills"]))
+
+        self.assertTrue(result)
+        self.assertEqual(self.mock_repo.save_report.call_count, 5)
+        self.mock_repo.commit_transaction.assert_called_once()
+        self.assertEqual(self.scraper.stats["fetch"].processed, 5)
+        self.assertEqual(self.scraper.stats["persist"].processed, 5)
+
+    def test_invalid_payloads_are_not_persisted(self):
+        """Transform stage drops empty or malformed payloads"""
+        self.mock_repo.get_references.return_value = [Reference(i, f"Item{i}", f"item{i}") for i in range(3)]
+        self.mock_api.fetch_salary_data.side_effect = [{"groups": [{"total": 1}]}, None, {"groups": "broken"}]
+        self.scraper.fetch_workers = 1
+
+        result = self.scraper.scrape(ScrapingConfig(reference_types=["skills"]))
+
+        self.assertTrue(result)
+        self.assertEqual(self.mock_repo.save_report.call_count, 1)
+        self.assertEqual(self.scraper.stats["transform"].failed, 1)
+
+    def test_combination_saves_each_reference(self):
+        """Combination rows are resolved before the pipeline starts"""
+        self.mock_repo.get_references.side_effect = lambda ref_type: {
+            "skills": [Reference(1, "Python", "python")],
+            "regions": [Reference(2, "Москва", "c_678")],
+        }[ref_type]
+        self.mock_api.fetch_salary_data.return_value = {"groups": [{"total": 1}]}
+        config = ScrapingConfig(
+            reference_types=["skills", "regions"], combinations=[(("skills", "python"), ("regions", "c_678"))]
+        )
+
+        result = self.scraper.scrape(config)
+
+        self.assertTrue(result)
+        self.mock_api.fetch_salary_data.assert_called_once_with(skill_aliases=["python"], region_alias="c_678")
+        self.mock_repo.save_report.assert_called_once()
+        self.assertEqual(self.mock_repo.save_report.call_args[0][0].reference_ids, {"skills": 1, "regions": 2})
+
+    def test_slow_persist_applies_backpressure(self):
+        """Fetching runs ahead of a slow DB by at most the queue capacity"""
+        self.mock_repo.get_references.return_value = [Reference(i, f"Item{i}", f"item{i}") for i in range(12)]
+        self.mock_api.fetch_salary_data.return_value = {"groups": [{"total": 1}]}
+        in_flight = []
+        lock = threading.Lock()
+        counters = {"fetched": 0, "saved": 0}
+
+        def fetch(**params):
+            with lock:
+                counters["fetched"] += 1
+                in_flight.append(counters["fetched"] - counters["saved"])
+            return {"groups": [{"total": 1}]}
+
+        def save(*args):
+            time.sleep(0.01)
+            with lock:
+                counters["saved"] += 1
+            return True
+
+        self.mock_api.fetch_salary_data.side_effect = fetch
+        self.mock_repo.save_report.side_effect = save
+
+        self.assertTrue(self.scraper.scrape(ScrapingConfig(reference_types=["skills"])))
+        # 3 queues of size 2 plus one item held by each stage thread
+        self.assertLessEqual(max(in_flight), 3 * 2 + 4)
+
+    def test_plan_error_rolls_back(self):
+        """Errors before the pipeline starts roll back the transaction"""
+        self.mock_repo.get_references.side_effect = Exception("Database error")
+
+        result = self.scraper.scrape(ScrapingConfig(reference_types=["skills"]))
+
+        self.assertFalse(result)
+        self.mock_repo.rollback_transaction.assert_called_once()
+
+    def test_stage_stats_throughput(self):
+        """Throughput is items per busy second"""
+        stats = StageStats("fetch", processed=10, busy_seconds=2.0)
+        self.assertEqual(stats.throughput, 5.0)
+        self.assertEqual(StageStats("idle").throughput, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Unit tests for CSV config pre-flight resolution
+"""
+
+import unittest
+from unittest.mock import Mock
+
+from src.core import Reference, ScrapingConfig
+from src.preflight import preflight
+
+
+class TestPreflight(unittest.TestCase):
+    """Test batched resolution and validation of CSV rows"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tables = {
+            "skills": {"python": Reference(1, "Python", "python"), "java": Reference(2, "Java", "java")},
+            "regions": {"москва": Reference(10, "Москва", "c_678")},
+        }
+        self.repo = Mock()
+        self.repo.resolve_references.side_effect = lambda ref_type, values: {
+            value: self.tables[ref_type][value] for value in values if value in self.tables[ref_type]
+        }
+
+    def test_resolves_rows_with_one_call_per_table(self):
+        """Distinct values are resolved in batches and rows carry references"""
+        rows = [(("skills", "Python"), ("regions", "Москва")), (("skills", "java"), ("regions", "москва"))]
+
+        report = preflight(ScrapingConfig(["skills", "regions"], combinations=rows), self.repo)
+
+        self.assertTrue(report.ok)
+        self.assertEqual(self.repo.resolve_references.call_count, 2)
+        self.repo.resolve_references.assert_any_call("regions", {"москва"})
+        self.assertEqual(
+            report.config.combinations,
+            [
+                (("skills", self.tables["skills"]["python"]), ("regions", self.tables["regions"]["москва"])),
+                (("skills", self.tables["skills"]["java"]), ("regions", self.tables["regions"]["москва"])),
+            ],
+        )
+
+    def test_reports_unresolved_and_duplicates(self):
+        """Rows with unknown values are dropped, repeated rows kept once"""
+        rows = [(("skills", "python"),), (("skills", "PYTHON"),), (("skills", "cobol"),), (("skills", "java"),)]
+
+        report = preflight(ScrapingConfig(["skills"], combinations=rows), self.repo)
+
+        self.assertFalse(report.ok)
+        self.assertEqual(report.unresolved, {"skills": ["cobol"]})
+        self.assertEqual(report.duplicate_rows, [(("skills", "python"),)])
+        self.assertEqual(report.summary()["resolved_rows"], 2)
+        self.assertEqual(len(report.config.combinations), 2)
+
+    def test_nothing_resolved_is_an_error(self):
+        """An empty plan must not fall back to a full scrape"""
+        with self.assertRaises(ValueError):
+            preflight(ScrapingConfig(["skills"], combinations=[(("skills", "cobol"),)]), self.repo)
+
+    def test_configs_without_rows_are_unchanged(self):
+        """Full scrapes skip pre-flight"""
+        config = ScrapingConfig(["skills"])
+
+        self.assertIs(preflight(config, self.repo).config, config)
+        self.repo.resolve_references.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,257 @@
+"""
+Unit tests for the psycopg 3 repository
+"""
+
+import os
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, Mock, patch
+
+from psycopg import DataError, pq
+
+import tests.unit.test_database as base
+from src.core import SalaryData
+from src.database import RUN_PROGRESS, PostgresRepository
+from src.psycopg3_database import Psycopg3Repository, _InfTimestampLoader, _Psycopg3Pool
+from src.settings import ApiSettings, DatabaseSettings, Settings
+
+
+class TestPsycopg3SalaryFacts(base.TestSalaryFacts):
+    """salary_facts maintenance through the psycopg 3 repository"""
+
+    repository_class = Psycopg3Repository
+
+
+class TestPsycopg3ReferenceLookups(base.TestReferenceLookups):
+    """Reference resolution through the psycopg 3 repository"""
+
+    repository_class = Psycopg3Repository
+
+
+class TestPsycopg3Staging(unittest.TestCase):
+    """Test COPY batching, the pipelined commit and rollback"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.repo = Psycopg3Repository({"host": "localhost"}, batch_size=2)
+        self.mock_conn = MagicMock(closed=False)
+        self.mock_cursor = MagicMock()
+        self.mock_conn.cursor.return_value.__enter__.return_value = self.mock_cursor
+        self.copy = self.mock_cursor.copy.return_value.__enter__.return_value
+        self.repo._pool = Mock()
+        self.repo._pool.getconn.return_value = self.mock_conn
+
+    def _save(self, transaction_id: str, count: int, start: int = 1) -> None:
+        for i in range(start, start + count):
+            data = SalaryData(data={"groups": [{"median": i}]}, reference_id=i, reference_type="skills")
+            self.assertTrue(self.repo.save_report(data, transaction_id, datetime(2025, 3, 1)))
+
+    def test_rows_buffered_until_batch_is_full(self):
+        """Nothing reaches the database before batch_size rows are buffered"""
+        self._save("tx-1", 1)
+
+        self.repo._pool.getconn.assert_not_called()
+        self.assertTrue(self.repo.transaction_exists("tx-1"))
+
+        self._save("tx-1", 1, start=2)
+
+        self.mock_cursor.copy.assert_called_once()
+        statement = self.mock_cursor.copy.call_args[0][0]
+        self.assertIn("COPY temp_scraping_tx_1 (specialization_id, skills_1, region_id, company_id", statement)
+        self.assertIn("FORMAT BINARY", statement)
+        self.copy.set_types.assert_called_once_with(["int4", "int4", "int4", "int4", "jsonb", "timestamp"])
+        rows = [call.args[0] for call in self.copy.write_row.call_args_list]
+        self.assertEqual([row[:4] for row in rows], [(None, 1, None, None), (None, 2, None, None)])
+        self.assertEqual(rows[0][5], datetime(2025, 3, 1))
+        self.assertEqual(self.repo._buffers, {})
+
+    def test_failed_copy_keeps_rows(self):
+        """If the COPY fails, rows saved earlier stay buffered, the rejected report does not"""
+        self.mock_cursor.copy.side_effect = Exception("connection lost")
+        self._save("tx-1", 1)
+
+        data = SalaryData(data={}, reference_id=9, reference_type="skills")
+        self.assertFalse(self.repo.save_report(data, "tx-1"))
+
+        self.assertEqual([row[1] for row in self.repo._buffers["tx-1"]], [1])
+        self.mock_conn.rollback.assert_called()
+
+    def test_bad_rows_isolated(self):
+        """Rows the server rejects are dropped, the rest of the batch is copied"""
+        self.repo.batch_size = 4
+        copied = []
+
+        def copy(conn, transaction_id, rows):
+            if any(row[1] in (2, 9) for row in rows):
+                raise DataError("unsupported Unicode escape sequence")
+            copied.extend(row[1] for row in rows)
+
+        self.repo._copy = Mock(side_effect=copy)
+        self._save("tx-1", 1)
+        self.assertTrue(self.repo.save_report(SalaryData(data={}, reference_id=2, reference_type="skills"), "tx-1"))
+        self._save("tx-1", 1, start=3)
+
+        self.assertFalse(self.repo.save_report(SalaryData(data={}, reference_id=9, reference_type="skills"), "tx-1"))
+
+        self.assertEqual(sorted(copied), [1, 3])
+        self.assertEqual(self.repo._buffers, {})
+        self.assertEqual(self.repo._staged_rows["tx-1"], 2)
+        self.assertEqual(self.mock_conn.rollback.call_count, 5)  # Whole batch, [1, 2], [2], [3, 9], [9]
+
+    def test_unknown_reference_type_rejected(self):
+        """Reports with unknown reference types are not buffered"""
+        data = SalaryData(data={}, reference_id=1, reference_type="unknown")
+
+        self.assertFalse(self.repo.save_report(data, "tx-1"))
+        self.assertFalse(self.repo.transaction_exists("tx-1"))
+
+    def test_commit_pipelines_statements(self):
+        """Remaining rows are copied, then every commit statement is sent in one pipeline"""
+        self._save("tx-1", 3)
+
+        self.repo.commit_transaction("tx-1")
+
+        self.mock_conn.pipeline.assert_called_once()
+        self.assertEqual(self.mock_cursor.copy.call_count, 2)
+        statements = [call.args for call in self.mock_cursor.execute.call_args_list]
+        self.assertEqual(statements[0], (RUN_PROGRESS, ("tx-1", "complete", 1, 3, "complete")))
+        self.assertEqual(statements[1][0], "SELECT ensure_report_partitions()")
+        self.assertIn("INSERT INTO report_payloads", statements[2][0])
+        self.assertIn("INSERT INTO salary_facts", statements[3][0])
+        self.assertIn("INSERT INTO report_log", statements[4][0])
+        self.assertEqual(statements[4][1][2], 3)
+        self.assertEqual(statements[-1][0], "DROP TABLE IF EXISTS temp_scraping_tx_1")
+        self.assertEqual(self.mock_conn.commit.call_count, 4)  # Temp table, two COPY batches, the move
+        self.repo._pool.putconn.assert_called_once_with(self.mock_conn)
+        self.assertFalse(self.repo.transaction_exists("tx-1"))
+
+    def test_chunk_flushes_buffer_first(self):
+        """Buffered rows are copied before the chunk moves the staged ones"""
+        repo = Psycopg3Repository({"host": "localhost"}, batch_size=10, chunk_rows=3)
+        repo._pool = self.repo._pool
+        self.repo = repo
+        self.mock_conn.cursor.return_value.fetchone.return_value = (1,)
+        self._save("tx-1", 1)
+
+        self.assertEqual(repo.commit_chunk("tx-1"), 1)
+
+        self.mock_cursor.copy.assert_called_once()
+        self.assertEqual(repo._staged_rows, {"tx-1": 0})
+        self.assertEqual(repo._buffers, {})
+
+    def test_commit_error_rolls_back(self):
+        """A failing pipeline rolls back, releases the connection and re-raises"""
+        self._save("tx-1", 2)
+        self.mock_conn.pipeline.side_effect = Exception("Database error")
+
+        with self.assertRaises(Exception):
+            self.repo.commit_transaction("tx-1")
+
+        self.mock_conn.rollback.assert_called_once()
+        self.repo._pool.putconn.assert_called_once_with(self.mock_conn)
+        self.assertFalse(self.repo.transaction_exists("tx-1"))
+
+    def test_commit_nonexistent_transaction(self):
+        """Committing an unknown transaction is a no-op"""
+        self.repo.commit_transaction("missing")
+
+        self.repo._pool.getconn.assert_not_called()
+
+    def test_rollback_buffered_only(self):
+        """Rows that never reached the database are simply discarded"""
+        self._save("tx-1", 1)
+
+        self.repo.rollback_transaction("tx-1")
+
+        self.repo._pool.getconn.assert_not_called()
+        self.assertFalse(self.repo.transaction_exists("tx-1"))
+
+    def test_rollback_drops_staged_rows(self):
+        """Copied rows are dropped with the temp table"""
+        self._save("tx-1", 3)
+
+        self.repo.rollback_transaction("tx-1")
+
+        self.mock_conn.cursor.return_value.execute.assert_any_call("DROP TABLE IF EXISTS temp_scraping_tx_1")
+        self.repo._pool.putconn.assert_called_once_with(self.mock_conn)
+        self.assertFalse(self.repo.transaction_exists("tx-1"))
+
+
+@patch('src.psycopg3_database.ConnectionPool')
+class TestPsycopg3Pool(unittest.TestCase):
+    """Test the psycopg_pool adapter"""
+
+    def test_config_mapped_to_connection_kwargs(self, mock_pool_class):
+        """The database setting is passed as dbname"""
+        _Psycopg3Pool({"host": "db", "database": "scraping_db"}, 1, 5)
+
+        kwargs = mock_pool_class.call_args.kwargs
+        self.assertEqual(kwargs["kwargs"], {"host": "db", "dbname": "scraping_db"})
+        self.assertEqual((kwargs["min_size"], kwargs["max_size"]), (1, 5))
+
+    def test_putconn_resets_transactions(self, mock_pool_class):
+        """Open transactions are rolled back; close=True closes the connection"""
+        pool = _Psycopg3Pool({}, 1, 5)
+        conn = Mock()
+        conn.info.transaction_status = pq.TransactionStatus.INTRANS
+
+        pool.putconn(conn)
+        conn.rollback.assert_called_once()
+
+        pool.putconn(conn, close=True)
+        conn.close.assert_called_once()
+        self.assertEqual(mock_pool_class.return_value.putconn.call_count, 2)
+
+    def test_stats_mapped(self, mock_pool_class):
+        """psycopg_pool counters are reported as PoolStats"""
+        mock_pool_class.return_value.get_stats.return_value = {
+            "pool_size": 4,
+            "pool_available": 1,
+            "requests_num": 20,
+            "requests_queued": 2,
+            "requests_wait_ms": 1500,
+            "connections_lost": 1,
+        }
+
+        stats = _Psycopg3Pool({}, 1, 8).stats()
+
+        self.assertEqual((stats.size, stats.in_use, stats.idle), (4, 3, 1))
+        self.assertEqual((stats.checkouts, stats.waits, stats.wait_seconds), (20, 2, 1.5))
+        self.assertEqual((stats.broken, stats.utilization), (1, 0.375))
+
+    def test_infinite_timestamps(self, _):
+        """-infinity watermarks load as datetime.min, like psycopg2"""
+        loader = _InfTimestampLoader(1114)
+
+        self.assertEqual(loader.load(b"-infinity"), datetime.min)
+        self.assertEqual(loader.load(b"2025-03-01 10:00:00"), datetime(2025, 3, 1, 10))
+
+
+class TestRepositoryBackend(unittest.TestCase):
+    """Test backend selection through settings"""
+
+    def _settings(self, backend: str) -> Settings:
+        return Settings(
+            database=DatabaseSettings(), api=ApiSettings(url="https://test.api.com"), database_backend=backend
+        )
+
+    def test_create_repository(self):
+        """psycopg3 selects Psycopg3Repository, the default stays on psycopg2"""
+        self.assertIs(type(self._settings("psycopg2").create_repository()), PostgresRepository)
+        repo = self._settings("psycopg3").create_repository()
+        self.assertIsInstance(repo, Psycopg3Repository)
+        self.assertEqual(repo.config["database"], "scraping_db")
+
+    def test_invalid_backend(self):
+        """Unknown backends are rejected when settings are built"""
+        with self.assertRaises(ValueError):
+            self._settings("mysql")
+
+    @patch.dict(os.environ, {"DATABASE_HOST": "db", "DATABASE_BACKEND": "psycopg3"})
+    def test_backend_from_env(self):
+        """DATABASE_BACKEND is read with the other database variables"""
+        self.assertEqual(Settings.load(env_file="/nonexistent").database_backend, "psycopg3")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+"""
+Unit tests for rate limiting
+"""
+
+import unittest
+from unittest.mock import patch
+
+from src.rate_limit import RateLimiter, SharedRateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test shared rate limiter"""
+
+    @patch('src.rate_limit.time.sleep')
+    @patch('src.rate_limit.time.monotonic', return_value=100.0)
+    def test_slots_are_spaced(self, mock_monotonic, mock_sleep):
+        """Consecutive callers wait for increasing slots"""
+        limiter = RateLimiter.per_second(2)
+
+        for _ in range(3):
+            limiter.acquire()
+
+        waits = [call.args[0] for call in mock_sleep.call_args_list]
+        self.assertEqual(waits, [0.5, 1.0])
+
+
+class TestSharedRateLimiter(unittest.TestCase):
+    """Test process-shared rate limiter"""
+
+    @patch('src.rate_limit.time.sleep')
+    @patch('src.rate_limit.time.time', return_value=1000.0)
+    def test_slots_are_spaced(self, mock_time, mock_sleep):
+        """Slots are reserved in shared memory"""
+        limiter = SharedRateLimiter.per_second(4)
+
+        limiter.acquire()
+        limiter.acquire()
+
+        mock_sleep.assert_called_once_with(0.25)
+        self.assertEqual(limiter._next_slot.value, 1000.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
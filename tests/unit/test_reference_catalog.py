@@ -0,0 +1,87 @@
+"""
+Unit tests for reference catalog
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+
+from src.core import Reference, ScrapingConfig
+from src.reference_catalog import ReferenceCatalog
+from src.scraper import SalaryScraper
+
+
+class TestReferenceCatalog(unittest.TestCase):
+    """Test indexed reference lookups"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.repo = Mock()
+        self.repo.get_references.return_value = [
+            Reference(1, "Python", "python"),
+            Reference(2, "Москва", "c_678"),
+            Reference(3, "C_678", "other"),
+        ]
+        self.repo.get_reference_version.return_value = (3, "abc")
+        self.catalog = ReferenceCatalog(self.repo, ttl=60)
+
+    def test_find_by_alias_or_title_casefolded(self):
+        """Lookups ignore case and surrounding whitespace"""
+        self.assertEqual(self.catalog.find("skills", "PYTHON").id, 1)
+        self.assertEqual(self.catalog.find("regions", " москва ").id, 2)
+        self.assertIsNone(self.catalog.find("skills", "rust"))
+
+    def test_alias_wins_over_title(self):
+        """Alias matches take precedence over title matches"""
+        self.assertEqual(self.catalog.find("regions", "c_678").id, 2)
+
+    def test_table_loaded_once(self):
+        """Repeated lookups do not hit the repository"""
+        for _ in range(100):
+            self.catalog.find("skills", "python")
+
+        self.repo.get_references.assert_called_once_with("skills")
+
+    def test_unchanged_version_keeps_cache_after_ttl(self):
+        """Expired tables are only reloaded if their fingerprint changed"""
+        with patch("src.reference_catalog.time.monotonic", side_effect=[0, 100, 100, 200, 200]):
+            self.catalog.find("skills", "python")
+            self.catalog.find("skills", "python")
+            self.repo.get_references.assert_called_once()
+
+            self.repo.get_reference_version.return_value = (4, "def")
+            self.catalog.find("skills", "python")
+
+        self.assertEqual(self.repo.get_references.call_count, 2)
+
+    def test_invalidate(self):
+        """Invalidated tables are reloaded on next use"""
+        self.catalog.find("skills", "python")
+        self.catalog.invalidate("skills")
+        self.catalog.find("skills", "python")
+
+        self.assertEqual(self.repo.get_references.call_count, 2)
+
+
+class TestScraperUsesCatalog(unittest.TestCase):
+    """Test combination resolution through the catalog"""
+
+    def test_csv_rows_load_each_table_once(self):
+        """Resolving many CSV rows costs one query per reference table"""
+        repo = Mock()
+        repo.get_references.side_effect = lambda ref_type: {
+            "skills": [Reference(i, f"Skill{i}", f"skill{i}") for i in range(50)],
+            "regions": [Reference(100, "Москва", "c_678")],
+        }[ref_type]
+        api = Mock()
+        api.fetch_salary_data.return_value = {"groups": [{}]}
+        rows = [(("skills", f"skill{i % 50}"), ("regions", "Москва")) for i in range(1000)]
+
+        result = SalaryScraper(repo, api).scrape(ScrapingConfig(["skills", "regions"], combinations=rows))
+
+        self.assertTrue(result)
+        self.assertEqual(api.fetch_salary_data.call_count, 1000)
+        self.assertEqual(repo.get_references.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Unit tests for the bulk reference importer
+"""
+
+import csv
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, Mock
+
+from src.reference_import import ReferenceImporter, read_reference_rows
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - optional dependency
+    openpyxl = None
+
+
+def _write(directory: str, name: str, text: str) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+class TestReadReferenceRows(unittest.TestCase):
+    """Test streaming title/alias pairs from files"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_csv_columns_by_header(self):
+        """Columns are found by name, values are stripped, blank rows marked as None"""
+        path = _write(self.tmp.name, "skills.csv", "Alias,Title\n python , Python \nsql,\n\ngo,Go\n")
+
+        rows = list(read_reference_rows(path))
+
+        self.assertEqual(rows, [("Python", "python"), None, ("Go", "go")])
+
+    def test_missing_columns(self):
+        """A header without title/alias is rejected"""
+        path = _write(self.tmp.name, "skills.csv", "name,alias\nPython,python\n")
+
+        with self.assertRaises(ValueError):
+            list(read_reference_rows(path))
+
+    def test_unsupported_file(self):
+        """Only CSV and XLSX files are accepted"""
+        with self.assertRaises(ValueError):
+            list(read_reference_rows(os.path.join(self.tmp.name, "skills.json")))
+
+    @unittest.skipIf(openpyxl is None, "openpyxl not installed")
+    def test_xlsx(self):
+        """Workbook cells are converted to strings"""
+        path = os.path.join(self.tmp.name, "regions.xlsx")
+        workbook = openpyxl.Workbook()
+        workbook.active.append(["title", "alias"])
+        workbook.active.append(["Москва", "moscow"])
+        workbook.active.append([2024, "year"])
+        workbook.save(path)
+
+        self.assertEqual(list(read_reference_rows(path)), [("Москва", "moscow"), ("2024", "year")])
+
+
+class TestReferenceImporter(unittest.TestCase):
+    """Test the COPY + upsert import"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.repo = Mock()
+        self.conn = Mock()
+        self.cursor = Mock()
+        self.conn.cursor.return_value = self.cursor
+        self.repo.get_connection.return_value = MagicMock(__enter__=Mock(return_value=self.conn))
+        self.copied = []
+        self.cursor.copy_expert.side_effect = lambda sql, stream: self.copied.extend(
+            csv.reader(io.StringIO(stream.read(7) + stream.read()))
+        )
+
+    def test_import_counts(self):
+        """Rows are streamed to COPY and merged in one statement"""
+        path = _write(self.tmp.name, "skills.csv", 'title,alias\nPython,python\n"Go, lang",go\n,empty\nGolang,go\n')
+        # 2 distinct aliases: 1 inserted, 0 updated
+        self.cursor.fetchone.return_value = (2, 1, 0)
+
+        result = ReferenceImporter(self.repo).import_file("skills", path)
+
+        self.assertEqual(self.copied, [["1", "Python", "python"], ["2", "Go, lang", "go"], ["4", "Golang", "go"]])
+        merge = self.cursor.execute.call_args_list[-1].args[0]
+        self.assertIn("INSERT INTO skills", merge)
+        self.assertIn("ON CONFLICT (alias) DO UPDATE", merge)
+        self.assertEqual(
+            (result.rows, result.skipped, result.duplicates, result.inserted, result.updated, result.unchanged),
+            (4, 1, 1, 1, 0, 1),
+        )
+        self.conn.commit.assert_called_once()
+
+    def test_invalid_table(self):
+        """Unknown tables are rejected before connecting"""
+        with self.assertRaises(ValueError):
+            ReferenceImporter(self.repo).import_file("reports", "skills.csv")
+        self.repo.get_connection.assert_not_called()
+
+    def test_rollback_on_error(self):
+        """A failed merge leaves the table untouched"""
+        path = _write(self.tmp.name, "skills.csv", "title,alias\nPython,python\n")
+        self.cursor.fetchone.side_effect = Exception("boom")
+
+        with self.assertRaises(Exception):
+            ReferenceImporter(self.repo).import_file("skills", path)
+
+        self.conn.rollback.assert_called_once()
+        self.conn.commit.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,8 +5,9 @@ Unit tests for scraper module
 import unittest
 from unittest.mock import Mock, patch, MagicMock
 import requests
-from src.scraper import HabrApiClient, SalaryScraper
+from src.scraper import HabrApiClient, SalaryScraper, create_http_session
 from src.core import ScrapingConfig, Reference, SalaryData
+from src.settings import ApiSettings
 
 
 class TestHabrApiClient(unittest.TestCase):
@@ -165,6 +166,22 @@ class TestSalaryScraper(unittest.TestCase):
         self.mock_repo.get_references.assert_any_call("specializations")
         self.mock_repo.get_references.assert_any_call("skills")
 
+    def test_commit_per_reference_type(self):
+        """Each reference type with saved reports is committed as a chunk of the run"""
+        self.mock_repo.get_references.side_effect = [
+            [Reference(1, "Backend", "backend")],
+            [Reference(2, "Python", "python")],
+            [Reference(3, "Moscow", "moscow")],
+        ]
+        self.mock_api.fetch_salary_data.side_effect = [{"groups": [{"data": "test"}]}, None, {"groups": []}]
+        scraper = SalaryScraper(self.mock_repo, self.mock_api, commit_per_type=True)
+
+        config = ScrapingConfig(reference_types=["specializations", "skills", "regions"], combinations=None)
+
+        self.assertTrue(scraper.scrape(config))
+        transaction_id = self.mock_repo.commit_transaction.call_args[0][0]
+        self.assertEqual(self.mock_repo.commit_chunk.call_args_list, [unittest.mock.call(transaction_id)] * 2)
+
     def test_scrape_with_combinations(self):
         """Test scraping with combinations (currently not implemented)"""
         config = ScrapingConfig(reference_types=["skills", "regions"], combinations=[("skills", "regions")])
@@ -239,5 +256,119 @@ class TestSalaryScraper(unittest.TestCase):
             self.assertGreater(len(progress_calls), 0)
 
 
+class TestHabrApiClientSharing(unittest.TestCase):
+    """Test client setup for thread-pool mode"""
+
+    def test_from_settings_single_worker(self):
+        """Single worker keeps plain requests and per-call sleeps"""
+        client = HabrApiClient.from_settings(ApiSettings(url="https://test.api.com"))
+        self.assertIsNone(client.session)
+        self.assertIsNone(client.rate_limiter)
+
+    def test_from_settings_multiple_workers(self):
+        """Several workers share a pooled session and a global rate limiter"""
+        client = HabrApiClient.from_settings(ApiSettings(url="https://test.api.com", requests_per_second=4), 8)
+        self.assertIsNotNone(client.session)
+        self.assertEqual(client.rate_limiter.delay_min, 0.25)
+
+    def test_shared_session_and_limiter_used(self):
+        """Requests go through the session and limiter without extra sleeps"""
+        session = Mock()
+        session.get.return_value = Mock(json=lambda: {"groups": [{"title": "ok"}]}, raise_for_status=Mock())
+        limiter = Mock()
+        client = HabrApiClient("https://test.api.com", session=session, rate_limiter=limiter)
+
+        with patch('src.scraper.time.sleep') as mock_sleep:
+            result = client.fetch_salary_data(spec_alias="backend")
+
+        self.assertIsNotNone(result)
+        session.get.assert_called_once()
+        limiter.acquire.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    def test_create_http_session_pool_size(self):
+        """Session adapters are sized for the worker count"""
+        session = create_http_session(16)
+        self.assertEqual(session.get_adapter("https://career.habr.com")._pool_maxsize, 16)
+
+
+class TestSalaryScraperWorkers(unittest.TestCase):
+    """Test thread-pool execution mode"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.mock_repo = Mock()
+        self.mock_api = Mock()
+        self.scraper = SalaryScraper(self.mock_repo, self.mock_api, workers=4)
+
+    def test_reference_type_fan_out(self):
+        """Every reference is fetched once and successes are aggregated"""
+        references = [Reference(i, f"Item{i}", f"item{i}") for i in range(25)]
+        self.mock_repo.get_references.return_value = references
+        self.mock_api.fetch_salary_data.side_effect = lambda **p: (
+            None if p["skill_aliases"][0] == "item3" else {"groups": [{}]}
+        )
+
+        total, success = self.scraper._scrape_reference_type("skills", "tx", None)
+
+        self.assertEqual(total, 25)
+        self.assertEqual(success, 24)
+        self.assertEqual(self.mock_api.fetch_salary_data.call_count, 25)
+        self.assertEqual(self.mock_repo.save_report.call_count, 24)
+
+    def test_combinations_fan_out(self):
+        """CSV rows are processed on the pool and counted once each"""
+        self.mock_repo.get_references.side_effect = lambda ref_type: {
+            "skills": [Reference(1, "Python", "python"), Reference(2, "Java", "java")],
+            "regions": [Reference(3, "Москва", "moscow")],
+        }[ref_type]
+        self.mock_api.fetch_salary_data.return_value = {"groups": [{}]}
+        config = ScrapingConfig(
+            reference_types=["skills", "regions"],
+            combinations=[
+                (("skills", "python"), ("regions", "moscow")),
+                (("skills", "java"), ("regions", "moscow")),
+                (("skills", "unknown"),),
+            ],
+        )
+
+        with patch('src.scraper.logging.info') as mock_logging:
+            result = self.scraper.scrape(config)
+
+        self.assertTrue(result)
+        self.assertEqual(self.mock_repo.save_report.call_count, 2)
+        self.mock_repo.commit_transaction.assert_called_once()
+        self.assertIn("2/2 successful", str(mock_logging.call_args_list[-1]))
+
+    def test_lazy_combinations_are_pulled_incrementally(self):
+        """Generated plans are consumed a few rows ahead of the workers, not all at once"""
+        self.mock_api.fetch_salary_data.return_value = {"groups": [{}]}
+        pulled = []
+        in_flight = []
+
+        def rows():
+            for i in range(40):
+                pulled.append(i)
+                in_flight.append(len(pulled) - self.mock_api.fetch_salary_data.call_count)
+                yield (("skills", Reference(i, f"S{i}", f"s{i}")),)
+
+        result = self.scraper.scrape(ScrapingConfig(reference_types=["skills"], combinations=rows()))
+
+        self.assertTrue(result)
+        self.assertEqual(self.mock_api.fetch_salary_data.call_count, 40)
+        self.mock_repo.get_references.assert_not_called()  # Rows already carry references
+        self.assertLessEqual(max(in_flight), 2 * 4 + 1)
+
+    def test_worker_exception_rolls_back(self):
+        """Unexpected worker errors abort the run"""
+        self.mock_repo.get_references.return_value = [Reference(1, "Python", "python")]
+        self.mock_api.fetch_salary_data.side_effect = RuntimeError("boom")
+
+        result = self.scraper.scrape(ScrapingConfig(reference_types=["skills"]))
+
+        self.assertFalse(result)
+        self.mock_repo.rollback_transaction.assert_called_once()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,106 @@
+"""
+Unit tests for multi-process sharded scraper
+"""
+
+import unittest
+from concurrent.futures import Future
+from unittest.mock import Mock, patch
+
+from src import sharded
+from src.core import Reference, ScrapingConfig, ScrapeTask
+from src.settings import ApiSettings
+
+
+class InlineExecutor:
+    """Stand-in for ProcessPoolExecutor running initializer and shards in-process"""
+
+    def __init__(self, max_workers=None, mp_context=None, initializer=None, initargs=()):
+        self.initargs = initargs
+        initializer(*initargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class TestSplitShards(unittest.TestCase):
+    """Test plan sharding"""
+
+    def test_split_evenly(self):
+        """Shards cover every task exactly once"""
+        tasks = [ScrapeTask(references=[("skills", Reference(i, str(i), str(i)))]) for i in range(10)]
+
+        shards = sharded.split_shards(tasks, 3)
+
+        self.assertEqual(len(shards), 3)
+        self.assertEqual(sorted(len(s) for s in shards), [3, 3, 4])
+        self.assertEqual(sum(shards, []), tasks[0::3] + tasks[1::3] + tasks[2::3])
+
+    def test_more_shards_than_tasks(self):
+        """No empty shards are produced"""
+        tasks = [ScrapeTask(references=[])] * 2
+        self.assertEqual(len(sharded.split_shards(tasks, 8)), 2)
+
+
+class TestShardedSalaryScraper(unittest.TestCase):
+    """Test sharded scraping orchestration"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.repo = Mock(shared_staging=True, config={"host": "localhost"})
+        self.repo.get_references.return_value = [Reference(i, f"Item{i}", f"item{i}") for i in range(7)]
+        self.worker_repo = Mock()
+        self.worker_client = Mock()
+        self.worker_client.fetch_salary_data.return_value = {"groups": [{"total": 1}]}
+        self.scraper = sharded.ShardedSalaryScraper(self.repo, ApiSettings(url="https://test.api.com"), processes=2)
+
+    def _patched(self):
+        return (
+            patch('src.sharded.ProcessPoolExecutor', InlineExecutor),
+            patch('src.sharded.PostgresRepository', return_value=self.worker_repo),
+            patch('src.sharded.HabrApiClient', return_value=self.worker_client),
+        )
+
+    def test_requires_shared_staging(self):
+        """Temp-table staging is invisible to other processes"""
+        with self.assertRaises(ValueError):
+            sharded.ShardedSalaryScraper(Mock(shared_staging=False), ApiSettings(url="https://test.api.com"))
+
+    def test_scrape_commits_once_in_parent(self):
+        """Workers stage under the parent's transaction, parent commits once"""
+        executor_patch, repo_patch, client_patch = self._patched()
+        with executor_patch, repo_patch as repo_class, client_patch as client_class:
+            result = self.scraper.scrape(ScrapingConfig(reference_types=["skills"]))
+
+        self.assertTrue(result)
+        repo_class.assert_called_once_with({"host": "localhost"}, shared_staging=True)
+        self.assertIsInstance(client_class.call_args.kwargs["rate_limiter"], sharded.SharedRateLimiter)
+        self.assertEqual(self.worker_repo.save_report.call_count, 7)
+        transaction_ids = {call.args[1] for call in self.worker_repo.save_report.call_args_list}
+        self.repo.commit_transaction.assert_called_once_with(transaction_ids.pop())
+        self.worker_repo.commit_transaction.assert_not_called()
+
+    def test_shard_failure_rolls_back(self):
+        """A crashed shard aborts the whole run"""
+        self.worker_client.fetch_salary_data.side_effect = RuntimeError("boom")
+        executor_patch, repo_patch, client_patch = self._patched()
+        with executor_patch, repo_patch, client_patch:
+            result = self.scraper.scrape(ScrapingConfig(reference_types=["skills"]))
+
+        self.assertFalse(result)
+        self.repo.rollback_transaction.assert_called_once()
+        self.repo.commit_transaction.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,284 @@
+"""
+Unit tests for the SQLite permanent repository and its sync to PostgreSQL
+"""
+
+import json
+import os
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, Mock, patch
+
+from src.core import Reference, SalaryData
+from src.database import RUN_PROGRESS
+from src.settings import ApiSettings, DatabaseSettings, Settings
+from src.sqlite_repository import SQLiteRepository, _salary_int, sync_to_postgres
+
+PAYLOAD = {
+    "groups": [
+        {"name": "Junior", "title": "Junior", "total": 12, "median": "95000.5", "salary": {"value": 90000}},
+        {"name": "Senior", "total": "n/a", "max": 300000, "salary": {"bonus": True}},
+    ]
+}
+
+
+class TestSQLiteRepository(unittest.TestCase):
+    """Test references, commits and salary_facts in a SQLite file"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.repo = SQLiteRepository(":memory:")
+        self.repo.import_reference_rows("skills", [("Python", "python"), ("Go", "go"), None])
+        self.timestamp = datetime(2025, 3, 1, 10)
+
+    def tearDown(self):
+        """Close the database"""
+        self.repo.close()
+
+    def _save(self, transaction_id: str, *skill_ids: int, data=PAYLOAD) -> None:
+        for skill_id in skill_ids:
+            report = SalaryData(data=data, reference_id=skill_id, reference_type="skills")
+            self.assertTrue(self.repo.save_report(report, transaction_id, self.timestamp))
+
+    def _count(self, table: str) -> int:
+        return self.repo._query(f"SELECT COUNT(*) FROM {table}")[0][0]
+
+    def test_references(self):
+        """Imported references are listed, resolved by alias or title and versioned"""
+        version = self.repo.get_reference_version("skills")
+
+        self.assertEqual([ref.alias for ref in self.repo.get_references("skills")], ["python", "go"])
+        self.assertEqual(len(self.repo.get_references("skills", limit=1)), 1)
+        resolved = self.repo.resolve_references("skills", ["PYTHON", " Go", "rust"])
+        self.assertEqual(sorted(resolved), ["go", "python"])
+        self.assertEqual(self.repo.get_reference_version("skills"), version)
+
+        self.assertEqual(self.repo.import_reference_rows("skills", [("Golang", "go"), ("Python", "python")]), 1)
+        self.assertEqual(self.repo.resolve_references("skills", ["golang"])["golang"].id, 2)
+        self.assertNotEqual(self.repo.get_reference_version("skills"), version)
+
+    def test_copy_references_keeps_ids(self):
+        """Snapshots keep the source ids and replace rows with a clashing alias"""
+        self.repo.copy_references("skills", [Reference(id=40, title="Python 3", alias="python")])
+
+        self.assertEqual(
+            self.repo.get_references("skills"),
+            [Reference(id=2, title="Go", alias="go"), Reference(id=40, title="Python 3", alias="python")],
+        )
+
+    def test_invalid_table(self):
+        """Only the four reference tables are accepted"""
+        with self.assertRaises(ValueError):
+            self.repo.get_references("users")
+
+    def test_unknown_reference_type_rejected(self):
+        """Reports with unknown reference types are not staged"""
+        data = SalaryData(data={}, reference_id=1, reference_type="unknown")
+
+        self.assertFalse(self.repo.save_report(data, "tx-1"))
+        self.assertFalse(self.repo.transaction_exists("tx-1"))
+
+    def test_commit_moves_reports_and_facts(self):
+        """Commit stores each payload once, one row per report and its typed facts"""
+        self._save("tx-1", 1, 2)
+        self.assertTrue(self.repo.transaction_exists("tx-1"))
+
+        self.repo.commit_transaction("tx-1")
+
+        self.assertFalse(self.repo.transaction_exists("tx-1"))
+        self.assertEqual((self._count("report_payloads"), self._count("report_rows")), (1, 2))
+        rows = self.repo._query("SELECT skills_1, data, fetched_at FROM reports ORDER BY id")
+        self.assertEqual(json.loads(rows[0][1]), PAYLOAD)
+        self.assertEqual(rows[1][0], 2)
+        self.assertEqual(rows[0][2], "2025-03-01T10:00:00")
+        facts = self.repo._query(
+            "SELECT group_index, skills_1, level, total, median, max_salary, salary_value, salary_bonus "
+            "FROM salary_facts WHERE report_id = 1 ORDER BY group_index"
+        )
+        self.assertEqual(
+            facts, [(1, 1, "Junior", 12, 95001, None, 90000, None), (2, 1, "Senior", None, None, 300000, None, None)]
+        )
+        self.assertEqual(self.repo._query("SELECT report_type, success_count FROM report_log"), [("batch_import", 2)])
+
+    def test_replayed_rows_skipped(self):
+        """Rows already stored under the natural key are skipped with their facts"""
+        self._save("tx-1", 1)
+        self.repo.commit_transaction("tx-1")
+        self._save("tx-2", 1, 2, data={"groups": [{"name": "Middle", "total": 1}]})
+
+        self.repo.commit_transaction("tx-2")
+
+        self.assertEqual(self._count("report_rows"), 2)
+        self.assertEqual(self._count("salary_facts"), 3)
+
+    def test_rows_without_groups_have_no_facts(self):
+        """Payloads without a groups array are stored without facts"""
+        self._save("tx-1", 1, data={"groups": {"name": "Junior"}})
+
+        self.repo.commit_transaction("tx-1")
+
+        self.assertEqual((self._count("report_rows"), self._count("salary_facts")), (1, 0))
+
+    def test_chunk_and_rollback(self):
+        """Chunks stay committed, rollback discards only rows staged after them"""
+        self._save("tx-1", 1)
+        self.assertEqual(self.repo.commit_chunk("tx-1"), 1)
+        self._save("tx-1", 2)
+
+        self.repo.rollback_transaction("tx-1")
+
+        self.assertEqual(self._count("report_rows"), 1)
+        self.assertFalse(self.repo.transaction_exists("tx-1"))
+        self.assertEqual(self.repo.commit_chunk("tx-1"), 0)
+
+    def test_latest_totals(self):
+        """Largest group total of the latest single-reference report per reference"""
+        self._save("tx-1", 1)
+        self.repo.commit_transaction("tx-1")
+        self.timestamp = datetime(2025, 4, 1)
+        self._save("tx-2", 1, data={"groups": [{"total": 0}]})
+        self.repo.commit_transaction("tx-2")
+
+        self.assertEqual(self.repo.get_latest_totals("skills"), {1: 0})
+
+    def test_latest_combination_totals(self):
+        """Combination totals are keyed by reference ids and ignore single-reference reports"""
+        self.repo.import_reference_rows("regions", [("Москва", "c_678")])
+        self._save("tx-1", 1)
+        combination = SalaryData(
+            data={"groups": [{"total": 0}]},
+            reference_id=1,
+            reference_type="regions",
+            combination={"skills": 2, "regions": 1},
+        )
+        self.assertTrue(self.repo.save_report(combination, "tx-1", self.timestamp))
+        self.repo.commit_transaction("tx-1")
+
+        self.assertEqual(self.repo.get_latest_combination_totals(["skills", "regions"]), {(2, 1): 0})
+        self.assertEqual(self.repo.get_latest_totals("skills"), {1: 12})
+
+    def test_salary_int(self):
+        """Numbers and numeric strings are rounded half away from zero, anything else is NULL"""
+        self.assertEqual(_salary_int("real", 2.5), 3)
+        self.assertEqual(_salary_int("text", "-2.5"), -3)
+        self.assertEqual(_salary_int("integer", 7), 7)
+        self.assertIsNone(_salary_int("text", "7k"))
+        self.assertIsNone(_salary_int("true", 1))
+        self.assertIsNone(_salary_int(None, None))
+
+
+class TestSyncToPostgres(unittest.TestCase):
+    """Test pushing report rows to PostgreSQL"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.source = SQLiteRepository(":memory:")
+        self.source.import_reference_rows("skills", [("Python", "python"), ("Go", "go"), ("Offline", "offline")])
+        for skill_id in (1, 2, 3):
+            report = SalaryData(data={"groups": []}, reference_id=skill_id, reference_type="skills")
+            self.source.save_report(report, "tx-1", datetime(2025, 3, 1))
+        self.source.commit_transaction("tx-1")
+
+        self.target = Mock()
+        self.target.config = {"host": "db", "port": 5432, "database": "scraping_db"}
+        self.target.resolve_references.return_value = {
+            "python": Reference(id=10, title="Python", alias="python"),
+            "go": Reference(id=20, title="Go", alias="go"),
+        }
+        self.conn = Mock()
+        self.cursor = self.conn.cursor.return_value
+        self.target.get_connection.return_value = MagicMock(__enter__=Mock(return_value=self.conn))
+
+    def tearDown(self):
+        """Close the database"""
+        self.source.close()
+
+    @patch("src.sqlite_repository.execute_values")
+    def test_rows_pushed_in_batches(self, mock_execute_values):
+        """References are translated by alias, the sync stops at an unknown one, one run across the batches"""
+        result = sync_to_postgres(self.source, self.target, batch_size=2)
+
+        self.assertEqual((result.rows, result.pushed, result.pending, result.batches), (3, 2, 1, 2))
+        self.assertEqual(result.target, "db:5432/scraping_db")
+        self.assertEqual(self.target.resolve_references.call_count, 2)  # Only ids not mapped yet
+        pushed = mock_execute_values.call_args_list[0].args[2]
+        self.assertEqual([row[:4] for row in pushed], [(None, 10, None, None), (None, 20, None, None)])
+        self.assertEqual(pushed[0][5], "2025-03-01T00:00:00")
+        progress = [call.args[1] for call in self.cursor.execute.call_args_list if call.args[0] == RUN_PROGRESS]
+        self.assertEqual([params[1:4] for params in progress], [("running", 1, 2), ("complete", 0, 0)])
+        self.assertEqual(progress[0][0], progress[1][0])
+        self.assertEqual(self.conn.commit.call_count, 2)
+        self.assertEqual(self.source._query("SELECT last_report_id FROM sync_state"), [(2,)])
+
+    @patch("src.sqlite_repository.execute_values")
+    def test_unknown_reference_retried_later(self, mock_execute_values):
+        """Rows from the first unknown reference on are pushed once PostgreSQL knows it"""
+        report = SalaryData(data={"groups": []}, reference_id=1, reference_type="skills")
+        self.source.save_report(report, "tx-2", datetime(2025, 4, 1))
+        self.source.commit_transaction("tx-2")
+
+        result = sync_to_postgres(self.source, self.target)
+
+        self.assertEqual((result.rows, result.pushed, result.pending), (4, 2, 2))
+        self.assertEqual(self.source._query("SELECT last_report_id FROM sync_state"), [(2,)])
+
+        self.target.resolve_references.return_value["offline"] = Reference(id=30, title="Offline", alias="offline")
+        result = sync_to_postgres(self.source, self.target)
+
+        self.assertEqual((result.rows, result.pushed, result.pending), (2, 2, 0))
+        pushed = mock_execute_values.call_args_list[-1].args[2]
+        self.assertEqual([row[1] for row in pushed], [30, 10])
+        self.assertEqual(self.source._query("SELECT last_report_id FROM sync_state"), [(4,)])
+
+    @patch("src.sqlite_repository.execute_values")
+    def test_resumes_after_last_pushed_row(self, mock_execute_values):
+        """A second sync only pushes rows committed since the first one"""
+        self.target.resolve_references.return_value["offline"] = Reference(id=30, title="Offline", alias="offline")
+        sync_to_postgres(self.source, self.target)
+        report = SalaryData(data={"groups": []}, reference_id=2, reference_type="skills")
+        self.source.save_report(report, "tx-2", datetime(2025, 4, 1))
+        self.source.commit_transaction("tx-2")
+
+        result = sync_to_postgres(self.source, self.target)
+
+        self.assertEqual((result.rows, result.pushed), (1, 1))
+        self.assertEqual(sync_to_postgres(self.source, self.target).batches, 0)
+
+    @patch("src.sqlite_repository.execute_values")
+    def test_failed_batch_not_marked(self, mock_execute_values):
+        """A batch PostgreSQL rejected is rolled back and pushed again next time"""
+        mock_execute_values.side_effect = Exception("connection lost")
+
+        with self.assertRaises(Exception):
+            sync_to_postgres(self.source, self.target)
+
+        self.conn.rollback.assert_called_once()
+        self.assertEqual(self.source._query("SELECT COUNT(*) FROM sync_state"), [(0,)])
+
+
+class TestSQLiteBackend(unittest.TestCase):
+    """Test backend selection through settings"""
+
+    def test_create_repository(self):
+        """The sqlite backend opens sqlite_path"""
+        settings = Settings(
+            database=DatabaseSettings(),
+            api=ApiSettings(url="https://test.api.com"),
+            database_backend="sqlite",
+            sqlite_path=":memory:",
+        )
+
+        repo = settings.create_repository()
+
+        self.assertIsInstance(repo, SQLiteRepository)
+        repo.close()
+
+    @patch.dict(os.environ, {"DATABASE_HOST": "db", "DATABASE_BACKEND": "sqlite", "SQLITE_PATH": "runs/laptop.db"})
+    def test_path_from_env(self):
+        """SQLITE_PATH is read with the other database variables"""
+        settings = Settings.load(env_file="/nonexistent")
+
+        self.assertEqual((settings.database_backend, settings.sqlite_path), ("sqlite", "runs/laptop.db"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Unit tests for Postgres-backed task queue
+"""
+
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, Mock
+
+from src.core import Reference, ScrapeTask
+from src.task_queue import (
+    ClaimedTask,
+    PostgresTaskQueue,
+    QueueWorker,
+    ScrapeRun,
+    task_from_payload,
+    task_to_payload,
+)
+
+
+def _mock_repository():
+    """Shared-staging repository whose connections hand out one mock cursor"""
+    repo = Mock(shared_staging=True)
+    conn = Mock()
+    cursor = Mock()
+    conn.cursor.return_value = cursor
+    repo.get_connection.return_value = MagicMock(__enter__=Mock(return_value=conn))
+    return repo, conn, cursor
+
+
+class TestPayload(unittest.TestCase):
+    """Test task serialization"""
+
+    def test_round_trip(self):
+        """Combination tasks survive the JSONB payload"""
+        task = ScrapeTask(
+            references=[("skills", Reference(1, "Python", "python")), ("regions", Reference(2, "Москва", "c_678"))]
+        )
+
+        self.assertEqual(task_from_payload(task_to_payload(task)), task)
+
+
+class TestPostgresTaskQueue(unittest.TestCase):
+    """Test queue SQL orchestration"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.repo, self.conn, self.cursor = _mock_repository()
+        self.queue = PostgresTaskQueue(self.repo, lease_seconds=60, max_attempts=3)
+
+    def test_requires_shared_staging(self):
+        """Workers on other nodes cannot see temp-table staging"""
+        with self.assertRaises(ValueError):
+            PostgresTaskQueue(Mock(shared_staging=False))
+
+    def test_claim_uses_skip_locked(self):
+        """Claimed rows are leased to the worker and deserialized"""
+        payload = [{"ref_type": "skills", "id": 1, "title": "Python", "alias": "python"}]
+        self.cursor.fetchall.return_value = [(7, payload)]
+
+        claimed = self.queue.claim("run-1", "worker-1", batch_size=5)
+
+        sql, params = self.cursor.execute.call_args[0]
+        self.assertIn("FOR UPDATE SKIP LOCKED", sql)
+        self.assertEqual(params, ("worker-1", 60, "run-1", 3, 5))
+        self.assertEqual(
+            claimed, [ClaimedTask(7, ScrapeTask(references=[("skills", Reference(1, "Python", "python"))]))]
+        )
+        self.conn.commit.assert_called_once()
+
+    def test_finalize_commits_when_all_tasks_done(self):
+        """Staging is committed and the run completed once nothing is pending or leased"""
+        self.cursor.rowcount = 0
+        self.cursor.fetchone.side_effect = [("running",), None]
+
+        self.assertTrue(self.queue.try_finalize("run-1"))
+        self.repo.finish_transaction.assert_called_once_with(self.cursor, "run-1")
+
+    def test_failed_finalize_rolls_back_status(self):
+        """Staging move and run status share one transaction: a failed move completes nothing"""
+        self.cursor.rowcount = 0
+        self.cursor.fetchone.side_effect = [("running",), None]
+        self.repo.finish_transaction.side_effect = RuntimeError("connection lost")
+
+        with self.assertRaises(RuntimeError):
+            self.queue.try_finalize("run-1")
+
+        statements = [call.args[0] for call in self.cursor.execute.call_args_list]
+        self.assertFalse(any("status = 'completed'" in statement for statement in statements))
+        self.conn.rollback.assert_called_once()
+
+    def test_finalize_waits_for_leased_tasks(self):
+        """Runs with outstanding tasks are not committed"""
+        self.cursor.rowcount = 0
+        self.cursor.fetchone.side_effect = [("running",), (1,)]
+
+        self.assertFalse(self.queue.try_finalize("run-1"))
+        self.repo.finish_transaction.assert_not_called()
+
+    def test_finalize_is_noop_for_completed_run(self):
+        """A second finalizer does not commit again"""
+        self.cursor.rowcount = 0
+        self.cursor.fetchone.side_effect = [("completed",)]
+
+        self.assertFalse(self.queue.try_finalize("run-1"))
+        self.repo.finish_transaction.assert_not_called()
+
+
+class TestQueueWorker(unittest.TestCase):
+    """Test worker claim loop"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.queue = Mock(lease_seconds=60)
+        self.api = Mock()
+        self.timestamp = datetime(2024, 1, 1)
+        self.queue.get_run.return_value = ScrapeRun("run-1", "running", self.timestamp, 2)
+        self.worker = QueueWorker(self.queue, self.api, worker_id="w1", poll_interval=0)
+
+    def test_processes_claimed_tasks_and_finalizes(self):
+        """Every claimed task is saved with the run timestamp and completed"""
+        tasks = [ClaimedTask(i, ScrapeTask(references=[("skills", Reference(i, f"S{i}", f"s{i}"))])) for i in (1, 2)]
+        self.queue.claim.side_effect = [tasks, []]
+        self.queue.try_finalize.return_value = True
+        self.api.fetch_salary_data.side_effect = [{"groups": [{"total": 1}]}, None]
+
+        self.worker.run("run-1")
+
+        self.queue.repository.save_report.assert_called_once()
+        self.assertEqual(self.queue.repository.save_report.call_args[0][1:], ("run-1", self.timestamp))
+        self.queue.complete.assert_any_call(1, "w1", True)
+        self.queue.complete.assert_any_call(2, "w1", False)
+        self.queue.try_finalize.assert_called_once_with("run-1")
+
+    def test_waits_for_other_workers(self):
+        """Worker polls until the run is finalized by itself or another node"""
+        self.queue.claim.return_value = []
+        self.queue.try_finalize.return_value = False
+        self.queue.get_run.side_effect = [
+            ScrapeRun("run-1", "running", self.timestamp, 2),
+            ScrapeRun("run-1", "running", self.timestamp, 2),
+            ScrapeRun("run-1", "completed", self.timestamp, 2),
+            ScrapeRun("run-1", "completed", self.timestamp, 2),
+        ]
+
+        self.assertTrue(self.worker.run("run-1"))
+        self.assertEqual(self.queue.try_finalize.call_count, 2)
+
+    def test_unknown_run(self):
+        """Joining a missing run is an error"""
+        self.queue.get_run.return_value = None
+        with self.assertRaises(ValueError):
+            self.worker.run("missing")
+
+
+if __name__ == "__main__":
+    unittest.main()